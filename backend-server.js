@@ -4,6 +4,7 @@ const bodyParser = require('body-parser');
 const fs = require('fs-extra');
 const path = require('path');
 const { spawn } = require('child_process');
+const net = require('net');
 
 const app = express();
 const PORT = process.env.PORT || 3000;
@@ -24,6 +25,10 @@ const DATA_DIR = path.join(__dirname, 'data');
 const SRC_DIR = path.join(__dirname, 'src');
 const RUN_PY_PATH = path.join(SRC_DIR, 'run.py');
 
+// Long-lived Python solver service (src/service.py)
+const SOLVER_SERVICE_HOST = process.env.SOLVER_SERVICE_HOST || '127.0.0.1';
+const SOLVER_SERVICE_PORT = parseInt(process.env.SOLVER_SERVICE_PORT || '8765', 10);
+
 // Ensure data directory exists
 fs.ensureDirSync(DATA_DIR);
 
@@ -185,6 +190,254 @@ app.post('/api/run-schedule-generator', async (req, res) => {
     }
 });
 
+// Send one request to the solver service and resolve with its response.
+// The service speaks newline-delimited JSON: one request line, one response line.
+function callSolverService(request) {
+    return new Promise((resolve, reject) => {
+        const socket = net.createConnection({ host: SOLVER_SERVICE_HOST, port: SOLVER_SERVICE_PORT });
+        let buffer = '';
+        socket.setEncoding('utf8');
+        socket.setTimeout(10000);
+        socket.on('connect', () => {
+            socket.write(JSON.stringify(request) + '\n');
+        });
+        socket.on('data', (chunk) => {
+            buffer += chunk;
+            const newline = buffer.indexOf('\n');
+            if (newline !== -1) {
+                socket.end();
+                try {
+                    resolve(JSON.parse(buffer.slice(0, newline)));
+                } catch (error) {
+                    reject(error);
+                }
+            }
+        });
+        socket.on('timeout', () => {
+            socket.destroy();
+            reject(new Error('Solver service did not respond in time'));
+        });
+        socket.on('error', reject);
+    });
+}
+
+// Translate an answer of the solver service into an HTTP response
+function sendSolverServiceResponse(res, response) {
+    if (response.success) {
+        return res.json(response);
+    }
+    const statusCodes = { unknown_job: 404, queue_full: 429, not_finished: 409 };
+    res.status(statusCodes[response.code] || 400).json(response);
+}
+
+function sendSolverServiceError(res, error) {
+    console.error('Error talking to solver service:', error);
+    res.status(503).json({
+        success: false,
+        error: error.code === 'ECONNREFUSED'
+            ? 'Solver service is not running. Start it with: python src/service.py'
+            : 'Solver service error: ' + error.message
+    });
+}
+
+// Forward a request to the solver service and translate its answer into an HTTP response
+async function forwardToSolverService(res, request) {
+    let response;
+    try {
+        response = await callSolverService(request);
+    } catch (error) {
+        return sendSolverServiceError(res, error);
+    }
+    sendSolverServiceResponse(res, response);
+}
+
+// Submit a schedule generation job to the solver service
+app.post('/api/jobs', (req, res) => {
+    // With inputs (the files of /api/save-json-files), the job solves exactly those, whatever is saved in the meantime
+    forwardToSolverService(res, { op: 'submit', options: req.body.options || {}, inputs: req.body.inputs });
+});
+
+// Poll the status of a job
+app.get('/api/jobs/:id', (req, res) => {
+    forwardToSolverService(res, { op: 'status', job_id: req.params.id });
+});
+
+// Fetch the generated schedule of a finished job
+app.get('/api/jobs/:id/result', (req, res) => {
+    forwardToSolverService(res, { op: 'result', job_id: req.params.id });
+});
+
+// Phase timings, model size and search statistics of a finished job
+app.get('/api/jobs/:id/metrics', (req, res) => {
+    forwardToSolverService(res, { op: 'metrics', job_id: req.params.id });
+});
+
+// Metrics of the latest run, written by src/run.py next to generated.json
+app.get('/api/metrics', async (req, res) => {
+    const metricsPath = path.join(DATA_DIR, 'out', 'metrics.json');
+    if (!await fs.pathExists(metricsPath)) {
+        return res.status(404).json({ success: false, error: 'No metrics found, generate a schedule first' });
+    }
+    res.json({ success: true, metrics: await fs.readJson(metricsPath) });
+});
+
+// Compact schedules written by src/compact.py next to generated.json: the latest run.py schedule in data/out and the
+// schedule of every solver service job in its own output folder. Parsed once per version of the file, the most
+// recently used ones are kept.
+const OUTPUT_DIR = path.join(DATA_DIR, 'out');
+const SCHEDULE_SLICE_COLUMNS = { class: 'class', teacher: 'teacher', room: 'classroom' };
+const COMPACT_SCHEDULE_CACHE_SIZE = 8;
+const compactSchedules = new Map();
+
+async function loadCompactSchedule(folder) {
+    const compactPath = path.join(folder, 'generated.compact.json');
+    const generatedPath = path.join(folder, 'generated.json');
+    if (!await fs.pathExists(compactPath)) {
+        return null;
+    }
+    const { mtimeMs } = await fs.stat(compactPath);
+    // A solve streams its improving solutions to generated.json only, the compact file follows at the end
+    if (await fs.pathExists(generatedPath) && (await fs.stat(generatedPath)).mtimeMs > mtimeMs) {
+        return null;
+    }
+    let cached = compactSchedules.get(compactPath);
+    if (!cached || cached.mtime !== mtimeMs) {
+        cached = { mtime: mtimeMs, data: await fs.readJson(compactPath) };
+    }
+    // Map keeps insertion order: re-inserting makes this the most recently used schedule
+    compactSchedules.delete(compactPath);
+    compactSchedules.set(compactPath, cached);
+    if (compactSchedules.size > COMPACT_SCHEDULE_CACHE_SIZE) {
+        compactSchedules.delete(compactSchedules.keys().next().value);
+    }
+    return cached.data;
+}
+
+// Lesson dicts (like in generated.json) of the value-th entry of the string table of column
+function compactScheduleSlice(compact, column, value) {
+    const { order, offsets } = compact.index[column];
+    const { columns, strings } = compact;
+    return order.slice(offsets[value], offsets[value + 1]).map(row => ({
+        subject: strings.subject[columns.subject[row]],
+        teacher: strings.teacher[columns.teacher[row]],
+        class: strings.class[columns.class[row]],
+        day: strings.day[columns.day[row]],
+        lesson_index: columns.lesson_index[row],
+        classroom: strings.classroom[columns.classroom[row]]
+    }));
+}
+
+// Classes, teachers, rooms and days of a compact schedule, to choose a slice from
+function scheduleIndex(compact) {
+    const { strings } = compact;
+    return {
+        success: true,
+        lessons: compact.lessons,
+        classes: strings.class.filter(name => name !== 'All Classes'),
+        teachers: strings.teacher,
+        rooms: strings.classroom,
+        days: strings.day
+    };
+}
+
+// The lessons of one class, teacher or room of a compact schedule; a class also gets the fixed hours of all classes
+function sendScheduleSlice(res, compact, kind, name) {
+    const column = SCHEDULE_SLICE_COLUMNS[kind];
+    if (!column) {
+        return res.status(400).json({ success: false, error: `Unknown schedule slice ${kind}, expected class, teacher or room` });
+    }
+    // Room numbers are stored as numbers, the URL has them as strings
+    const names = compact.strings[column].map(String);
+    const value = names.indexOf(name);
+    if (value < 0) {
+        return res.status(404).json({ success: false, error: `No ${kind} ${name} in the schedule` });
+    }
+    let lessons = compactScheduleSlice(compact, column, value);
+    const shared = names.indexOf('All Classes');
+    if (column === 'class' && shared >= 0 && shared !== value) {
+        lessons = lessons.concat(compactScheduleSlice(compact, column, shared));
+    }
+    res.json({ success: true, lessons });
+}
+
+// Latest schedule of run.py (or /api/run-schedule-generator) in data/out
+app.get('/api/schedule', async (req, res) => {
+    const compact = await loadCompactSchedule(OUTPUT_DIR);
+    if (!compact) {
+        return res.status(404).json({ success: false, error: 'No schedule found, generate a schedule first' });
+    }
+    res.json(scheduleIndex(compact));
+});
+
+app.get('/api/schedule/:kind/:name', async (req, res) => {
+    const compact = await loadCompactSchedule(OUTPUT_DIR);
+    if (!compact) {
+        return res.status(404).json({ success: false, error: 'No schedule found, generate a schedule first' });
+    }
+    sendScheduleSlice(res, compact, req.params.kind, req.params.name);
+});
+
+// The status of a solver service job with its input and output folders under data/; answers the request itself and
+// returns null when the job is unknown or the service is not running
+async function jobFolders(req, res) {
+    let job;
+    try {
+        job = await callSolverService({ op: 'status', job_id: req.params.id });
+    } catch (error) {
+        sendSolverServiceError(res, error);
+        return null;
+    }
+    if (!job.success) {
+        sendSolverServiceResponse(res, job);
+        return null;
+    }
+    const input = path.resolve(DATA_DIR, job.input_folder);
+    const output = path.resolve(DATA_DIR, job.output_folder);
+    if (!input.startsWith(DATA_DIR + path.sep) || !output.startsWith(DATA_DIR + path.sep)) {
+        res.status(500).json({ success: false, error: 'Job folders are outside the data folder' });
+        return null;
+    }
+    return { job, input, output };
+}
+
+// The compact schedule of a finished job; answers the request itself and returns null when there is none
+async function loadJobSchedule(req, res) {
+    const folders = await jobFolders(req, res);
+    if (!folders) {
+        return null;
+    }
+    const compact = await loadCompactSchedule(folders.output);
+    if (!compact) {
+        const finished = !['queued', 'running'].includes(folders.job.status);
+        res.status(finished ? 404 : 409).json({ success: false, error: finished ? 'Job has no schedule' : 'Job has not finished yet', ...folders.job });
+        return null;
+    }
+    return { ...folders, compact };
+}
+
+// Classes, teachers, rooms and days of the schedule of a job, with the hours of its own common.json for the lesson times
+app.get('/api/jobs/:id/schedule', async (req, res) => {
+    const schedule = await loadJobSchedule(req, res);
+    if (!schedule) {
+        return;
+    }
+    const commonPath = path.join(schedule.input, 'common.json');
+    const common = await fs.pathExists(commonPath) ? await fs.readJson(commonPath) : {};
+    res.json({ ...scheduleIndex(schedule.compact), hours: common.hours || [] });
+});
+
+app.get('/api/jobs/:id/schedule/:kind/:name', async (req, res) => {
+    const schedule = await loadJobSchedule(req, res);
+    if (schedule) {
+        sendScheduleSlice(res, schedule.compact, req.params.kind, req.params.name);
+    }
+});
+
+// Cancel a queued or running job
+app.delete('/api/jobs/:id', (req, res) => {
+    forwardToSolverService(res, { op: 'cancel', job_id: req.params.id });
+});
+
 // Health check endpoint
 app.get('/api/health', (req, res) => {
     res.json({
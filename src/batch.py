@@ -0,0 +1,141 @@
+import sys
+import os
+import glob
+import time
+import argparse
+import contextlib
+import multiprocessing
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+from datastructure import dataFolder
+from loader import DataError, load_profile
+from parameters import split_cores
+from streaming import write_json_atomic
+
+batchFolder = os.path.join(dataFolder, "out", "batch")
+
+# Columns of the summary table: (header, key of the profile result, format)
+SUMMARY_COLUMNS = [
+    ("Profile", "profile", "{}"),
+    ("Status", "status", "{}"),
+    ("Objective", "objective", "{:g}"),
+    ("Bound", "best_bound", "{:g}"),
+    ("Build s", "build_time", "{:.2f}"),
+    ("Solve s", "solve_time", "{:.2f}"),
+    ("Variables", "variables", "{}"),
+    ("Constraints", "constraints", "{}"),
+    ("Lessons", "lessons", "{}"),
+    ("Peak MB", "peak_rss_mb", "{:.0f}"),
+]
+
+def profile_files(paths: list[str]) -> list[str]:
+    # The profile files among paths, a folder stands for every .json file in it
+    files = []
+    for path in paths:
+        files += sorted(glob.glob(os.path.join(path, "*.json"))) if os.path.isdir(path) else [path]
+    return files
+
+def profile_folders(files: list[str], output_folder: str) -> list[str]:
+    # One output folder per profile, named after the file; profiles with the same file name get a suffix
+    folders = []
+    for file in files:
+        name = os.path.splitext(os.path.basename(file))[0]
+        folder, n = os.path.join(output_folder, name), 2
+        while folder in folders:
+            folder, n = os.path.join(output_folder, f'{name}-{n}'), n + 1
+        folders.append(folder)
+    return folders
+
+def solve_files(name: str, files: dict, folder: str, solver_parameters: dict, run_options: dict | None = None) -> dict:
+    # Runs in a pool process: writes the input files to folder and solves them there, so the schedule,
+    # metrics.json and the solver output (run.log) end up next to the input
+    from run import Run
+
+    result = {"profile": name, "folder": folder, "status": None, "error": None}
+    start = time.perf_counter()
+    try:
+        for file_name, data in files.items():
+            write_json_atomic(os.path.join(folder, file_name), data)
+        with open(os.path.join(folder, "run.log"), "w", encoding="utf-8") as log, contextlib.redirect_stdout(log):
+            # No shared cache: every task is a different school, and the pool processes would compete for it
+            run = Run(data_folder=folder, output_file=os.path.join(folder, "generated.json"), solver_parameters=solver_parameters,
+                      verbose=False, cache=None, **(run_options or {}))
+            lessons = run.solve()
+    except DataError as e:
+        result.update(status="INVALID", error=str(e))
+        return result
+    except Exception as e:
+        result.update(status="FAILED", error=f"{type(e).__name__}: {e}")
+        return result
+
+    metrics = run.metrics.to_dict(run)
+    result.update(status=run.status_name, objective=run.objective_value, best_bound=run.best_bound, build_time=run.build_time,
+                  solve_time=run.wall_time, lessons=len(lessons), variables=metrics["model"]["variables"],
+                  constraints=metrics["model"]["constraints"], peak_rss_mb=metrics["process_peak_rss_mb"],
+                  violations=[str(violation) for violation in run.violations], total_time=time.perf_counter() - start)
+    return result
+
+def solve_profile(profile_file: str, folder: str, solver_parameters: dict) -> dict:
+    try:
+        files = load_profile(profile_file)
+    except DataError as e:
+        return {"profile": os.path.basename(profile_file), "folder": folder, "status": "INVALID", "error": str(e)}
+    return solve_files(os.path.basename(profile_file), files, folder, solver_parameters)
+
+def solve_pool(function, tasks: list[tuple], jobs: int) -> list[dict]:
+    # function(*task) for every task, jobs at a time, in the order of tasks. A fresh process per task returns
+    # its memory when it is done, and the process peak memory in its metrics is that of the task alone.
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(jobs, maxtasksperchild=1) as pool:
+        pending = [pool.apply_async(function, task) for task in tasks]
+        results = []
+        for task in pending:
+            results.append(task.get())
+            print(f'{results[-1]["profile"]}: {results[-1]["status"]}', flush=True)
+    return results
+
+def summary_table(results: list[dict]) -> str:
+    rows = [[header for header, _, _ in SUMMARY_COLUMNS]]
+    for result in results:
+        rows.append([form.format(result[key]) if result.get(key) is not None else "-" for _, key, form in SUMMARY_COLUMNS])
+    widths = [max(len(row[i]) for row in rows) for i in range(len(SUMMARY_COLUMNS))]
+    lines = ["  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows]
+    lines.insert(1, "  ".join("-" * width for width in widths))
+    return "\n".join(lines)
+
+def solve_batch(files: list[str], output_folder: str, jobs: int, cores_per_job: int, solver_parameters: dict | None = None) -> list[dict]:
+    # Solves the profiles with jobs processes at a time, each with cores_per_job CP-SAT workers, and writes
+    # summary.json to output_folder
+    solver_parameters = dict(solver_parameters or {}, num_workers=cores_per_job)
+    folders = profile_folders(files, output_folder)
+    results = solve_pool(solve_profile, [(file, folder, solver_parameters) for file, folder in zip(files, folders)], jobs)
+
+    write_json_atomic(os.path.join(output_folder, "summary.json"), {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "settings": {"jobs": jobs, "cores_per_job": cores_per_job, **solver_parameters},
+        "results": results,
+    })
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate schedules for many settings profiles in parallel")
+    parser.add_argument("profiles", nargs="+", help="settings profile files (like dalton_voorbeeld.json) or folders of them")
+    parser.add_argument("--output", default=batchFolder, help="output folder, gets one folder per profile and summary.json (default: data/out/batch)")
+    parser.add_argument("--jobs", type=int, default=None, help="profiles solved at the same time (default: cores / cores per job)")
+    parser.add_argument("--cores-per-job", type=int, default=None,
+                        help="CP-SAT search workers per profile (default: cores / jobs or cores / profiles, at least 4)")
+    parser.add_argument("--time-limit", type=float, default=None, help="solver time limit per profile in seconds")
+    parser.add_argument("--seed", type=int, default=None, help="random seed of the searches")
+    args = parser.parse_args()
+
+    files = profile_files(args.profiles)
+    if not files:
+        print("No profiles found", file=sys.stderr)
+        sys.exit(1)
+    jobs, cores_per_job = split_cores(len(files), args.jobs, args.cores_per_job)
+    print(f'Solving {len(files)} profiles, {jobs} at a time with {cores_per_job} search workers each')
+    results = solve_batch(files, args.output, jobs, cores_per_job, {"time_limit": args.time_limit, "random_seed": args.seed})
+    print(summary_table(results))
+    for result in results:
+        if result["error"] is not None:
+            print(f'{result["profile"]}: {result["error"]}')
+    print(f'Summary written to {os.path.join(args.output, "summary.json")}')
@@ -0,0 +1,161 @@
+import os
+import json
+import hashlib
+import itertools
+import tempfile
+
+import numpy as np
+from google.protobuf.descriptor import FieldDescriptor
+from ortools.sat import cp_model_pb2
+
+from datastructure import *
+from streaming import write_json_atomic
+
+cacheFolder = os.path.join(dataFolder, "cache")
+
+# The six input files that define a schedule, see datastructure.py
+INPUT_FILES = [teachersFile, classesFile, subjectsFile, classroomsFile, fixedHoursFile, commonFile]
+
+def canonical_hash(data) -> str:
+    # Hash of the canonical JSON form: key order and whitespace of the input do not matter
+    return hashlib.sha256(json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def file_hash(file_path: str) -> str | None:
+    if not os.path.exists(file_path):
+        return None
+    with open(file_path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+def input_hash(data_folder: str = dataFolder) -> str:
+    return canonical_hash({os.path.basename(f): load_json_file(os.path.join(data_folder, os.path.basename(f))) for f in INPUT_FILES})
+
+def copy_message(source, target, skip: tuple = ()) -> None:
+    # Field by field copy from a protobuf message into the matching OR-Tools proto wrapper
+    for field, value in source.ListFields():
+        if field.name in skip:
+            continue
+        if field.type != FieldDescriptor.TYPE_MESSAGE:
+            if field.is_repeated:
+                getattr(target, field.name).extend(value)
+            else:
+                setattr(target, field.name, value)
+        elif field.is_repeated:
+            items = getattr(target, field.name)
+            for item in value:
+                copy_message(item, items.add())
+        else:
+            copy_message(value, getattr(target, field.name))
+
+def parse_model(data: bytes, proto) -> None:
+    if hasattr(proto, "ParseFromString"):
+        proto.ParseFromString(data)
+        return
+    # Since OR-Tools 9.12 CpModel.Proto() wraps the C++ proto and has no ParseFromString: the binary proto is decoded
+    # by the Python protobuf module and copied in. The variables, most of them with the same 0/1 domain, are merged
+    # as text, one run of equal domains at a time, which is much faster than adding them one by one. Their names
+    # are not restored, nothing reads them.
+    source = cp_model_pb2.CpModelProto.FromString(data)
+    domains = itertools.groupby(tuple(variable.domain) for variable in source.variables)
+    proto.merge_text_format("".join(f'variables{{domain:{" domain:".join(map(str, domain))}}}' * sum(1 for _ in run) for domain, run in domains))
+    copy_message(source, proto, skip=("variables",))
+
+def write_model(model, file_path: str) -> None:
+    proto = model.Proto()
+    if hasattr(proto, "SerializeToString"):
+        with open(file_path, "wb") as file:
+            file.write(proto.SerializeToString())
+    else:
+        # The proto wrapper of OR-Tools 9.12+ writes its binary form to a file only (text when the name ends in "txt")
+        model.export_to_file(file_path)
+
+class ScheduleCache:
+    # Content-addressed on-disk cache with two levels:
+    # - models/<model key>: the built CpModelProto (binary) and the lesson-variable registry, keyed by the inputs and
+    #   the options that change the model, so a request that only changes solver parameters skips model construction
+    # - results/<result key>: the final schedule, keyed by the model key and the solver parameters
+    # The validated input of loader.load_data is kept next to them in snapshots/, keyed by the hash of the input files.
+    # Entries are evicted least recently used first once the cache is larger than max_bytes.
+    def __init__(self, folder: str = cacheFolder, max_bytes: int = 256 * 1024 * 1024):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(folder, "models"), exist_ok=True)
+        os.makedirs(os.path.join(folder, "results"), exist_ok=True)
+        self.snapshot_folder = os.path.join(folder, "snapshots")
+        os.makedirs(self.snapshot_folder, exist_ok=True)
+
+    def model_key(self, data_folder: str, model_options: dict) -> str:
+        return canonical_hash({"inputs": input_hash(data_folder), "model": model_options})
+
+    def result_key(self, model_key: str, solver_options: dict) -> str:
+        return canonical_hash({"model": model_key, "solver": solver_options})
+
+    def path(self, kind: str, key: str, extension: str) -> str:
+        return os.path.join(self.folder, kind, key + extension)
+
+    def touch(self, *paths: str) -> None:
+        # The modification time is the "last used" time for the LRU eviction
+        for path in paths:
+            os.utime(path)
+
+    def load_result(self, key: str) -> dict | None:
+        path = self.path("results", key, ".json")
+        try:
+            result = load_json_file(path)
+        except (OSError, ValueError):
+            return None
+        self.touch(path)
+        return result
+
+    def store_result(self, key: str, result: dict) -> None:
+        write_json_atomic(self.path("results", key, ".json"), result)
+        self.evict()
+
+    def load_model(self, key: str, run) -> bool:
+        # Restores run.model and its lesson registry from the cache, returns False on a miss
+        model_path, registry_path = self.path("models", key, ".pb"), self.path("models", key, ".npz")
+        try:
+            with open(model_path, "rb") as file:
+                data = file.read()
+            registry = np.load(registry_path)
+        except (OSError, ValueError):
+            return False
+        parse_model(data, run.model.Proto())
+        run.lesson_keys = registry["lesson_keys"]
+        run.lesson_var_index = registry["lesson_var_index"]
+        self.touch(model_path, registry_path)
+        return True
+
+    def store_model(self, key: str, run) -> None:
+        model_path, registry_path = self.path("models", key, ".pb"), self.path("models", key, ".npz")
+        # Write to unique temporary files first, concurrent runs may store the same model
+        model_fd, model_temp = tempfile.mkstemp(dir=os.path.dirname(model_path), suffix=".tmp")
+        registry_fd, registry_temp = tempfile.mkstemp(dir=os.path.dirname(registry_path), suffix=".tmp")
+        os.close(model_fd)
+        write_model(run.model, model_temp)
+        with os.fdopen(registry_fd, "wb") as file:
+            np.savez(file, lesson_keys=run.lesson_keys, lesson_var_index=run.lesson_var_index)
+        os.replace(registry_temp, registry_path)
+        os.replace(model_temp, model_path)
+        self.evict()
+
+    def evict(self) -> None:
+        entries = []
+        for kind in ("models", "results", "snapshots"):
+            folder = os.path.join(self.folder, kind)
+            for name in os.listdir(folder):
+                if name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(folder, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, os.path.join(folder, name)))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
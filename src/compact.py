@@ -0,0 +1,43 @@
+import os
+
+COMPACT_VERSION = 1
+# Columns of a lesson, like the keys of the lesson dicts in generated.json; lesson_index is stored as is,
+# the others as indices into the string table of the column
+COMPACT_COLUMNS = ["subject", "teacher", "class", "day", "lesson_index", "classroom"]
+INDEXED_COLUMNS = ["class", "teacher", "classroom"]
+
+def compact_file(output_file: str) -> str:
+    # data/out/generated.json -> data/out/generated.compact.json
+    root, extension = os.path.splitext(output_file)
+    return f'{root}.compact{extension}'
+
+def compact_schedule(lessons: list[dict]) -> dict:
+    # The lessons in columnar form: one string table and one index array per column, with the lessons sorted by
+    # class, day and hour. "index" holds the lessons of every class, teacher and room in CSR form, the lessons of
+    # the i-th teacher are order[offsets[i]:offsets[i + 1]], so a slice is read without scanning the whole school.
+    strings = {column: {} for column in COMPACT_COLUMNS if column != "lesson_index"}
+    for lesson in lessons:
+        for column, table in strings.items():
+            table.setdefault(lesson[column], len(table))
+    rows = sorted(((strings["class"][lesson["class"]], strings["day"][lesson["day"]], lesson["lesson_index"], lesson) for lesson in lessons),
+                  key=lambda row: row[:3])
+    columns = {column: [lesson[column] if column == "lesson_index" else strings[column][lesson[column]] for *_, lesson in rows]
+               for column in COMPACT_COLUMNS}
+
+    index = {}
+    for column in INDEXED_COLUMNS:
+        groups = [[] for _ in strings[column]]
+        for row, value in enumerate(columns[column]):
+            groups[value].append(row)
+        offsets = [0]
+        for group in groups:
+            offsets.append(offsets[-1] + len(group))
+        index[column] = {"order": [row for group in groups for row in group], "offsets": offsets}
+
+    return {
+        "version": COMPACT_VERSION,
+        "lessons": len(rows),
+        "strings": {column: list(table) for column, table in strings.items()},
+        "columns": columns,
+        "index": index,
+    }
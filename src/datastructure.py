@@ -17,6 +17,9 @@ studentsFile = os.path.join(dataFolder, "students.json")
 classroomsFile = os.path.join(dataFolder, "classrooms.json")
 fixedHoursFile = os.path.join(dataFolder, "fixed_hours.json")
 
+outputFolder = os.path.join(dataFolder, "out")
+generatedFile = os.path.join(outputFolder, "generated.json")
+
 trainingDataFolder = os.path.join(dataFolder, "training")
 trainedDataFolder = os.path.join(dataFolder, "trained")
 trainedModelFolder = os.path.join(dataFolder, "trained_models")
@@ -49,6 +52,7 @@ class ClassroomSpecialties(Enum):
             raise ValueError(f"Unknown specialty: {value}")
 
 class ClassroomDataStructure:
+    __slots__ = ("number", "capacity", "specialties")
     number : int
     capacity : int
     specialties : list[ClassroomSpecialties]
@@ -81,6 +85,7 @@ class ClassroomDataStructure:
             yield instance
 
 class FixedHourDataStructure:
+    __slots__ = ("day", "name", "classroomID", "hour")
     day: str
     name: str
     classroomID: int
@@ -117,11 +122,13 @@ class FixedHourDataStructure:
         return instance
 
 class SubjectDataStructure:
+    __slots__ = ("name", "abbreviation", "requiredHours", "coreSubject", "requiredClassroomParameters", "blockLength")
     name: str
     abbreviation: str
     requiredHours: int
     coreSubject: bool
     requiredClassroomParameters: list[str]
+    blockLength: int # Lesson length in consecutive lesson slots, e.g. 2 for double periods; requiredHours is a multiple of it
 
     def __init__(self):
         self.name = ""
@@ -129,13 +136,20 @@ class SubjectDataStructure:
         self.requiredHours = 0
         self.coreSubject = False
         self.requiredClassroomParameters = []
+        self.blockLength = 1
 
     def from_dict(self, data: dict):
         self.name = data.get("name", "")
         self.abbreviation = data.get("abbreviation", "")
         self.requiredHours = data.get("requiredHours", 0)
         self.coreSubject = data.get("coreSubject", False)
-        self.requiredClassroomParameters = data.get("requiredClassroomParameters", [])
+        # The UI writes "requiredClassroomsParameters", older files use "requiredClassroomParameters"
+        self.requiredClassroomParameters = data.get("requiredClassroomsParameters", data.get("requiredClassroomParameters", []))
+        self.blockLength = data.get("blockLength", 1)
+        if self.blockLength < 1:
+            raise ValueError(f'blockLength must be at least 1, got {self.blockLength}')
+        if self.requiredHours % self.blockLength:
+            raise ValueError(f'requiredHours ({self.requiredHours}) must be a multiple of blockLength ({self.blockLength})')
 
     def to_dict(self) -> dict:
         return {
@@ -143,7 +157,8 @@ class SubjectDataStructure:
             "abbreviation": self.abbreviation,
             "requiredHours": self.requiredHours,
             "coreSubject": self.coreSubject,
-            "requiredClassroomParameters": self.requiredClassroomParameters
+            "requiredClassroomsParameters": self.requiredClassroomParameters,
+            "blockLength": self.blockLength
         }
 
     def to_json(self) -> str:
@@ -164,6 +179,7 @@ class Days(Enum):
     FRIDAY = "friday"
 
 class TeachersDataStructure:
+    __slots__ = ("name", "abbreviation", "availability", "subjects")
     name : str
     abbreviation : str
     availability : dict[Days, int]
@@ -211,6 +227,7 @@ class Profile(Enum):
     CM = "cm"
     
 class StudentDataStructure:
+    __slots__ = ("name", "className", "profile", "studentNumber", "preferredOddHours", "subjects")
     name: str
     className: str
     profile: Profile
@@ -255,34 +272,37 @@ class StudentDataStructure:
         return instance
 
 class ClassDataStructure:
+    __slots__ = ("name", "year", "tutor", "students", "coreSubjects", "size")
     name: str
     year: tuple[Level, int, int] # Level, grade, section(A, B etc.)
     tutor: str # Name of the tutor (the abbreviation)
     students: list[StudentDataStructure] # Populate later when the students have fully loaded from JSON
     coreSubjects: list[str]
+    size: int # Number of students, 0 when unknown (then every room fits)
 
     def __init__(self):
         self.name = ""
         self.year = (Level.MAVO, 1, 1)
         self.tutor = ""
+        self.students = []
         self.coreSubjects = []
+        self.size = 0
 
     def from_dict(self, data: dict):
         self.name = data.get("name", "")
-        self.year = (
-            Level[data.get("year", (Level.MAVO, 1, 1))[0].upper()],
-            data.get("year", (Level.MAVO, 1, 1))[1],
-            data.get("year", (Level.MAVO, 1, 1))[2]
-        )
+        year = data.get("year", (Level.MAVO.value, 1, 1))
+        self.year = (Level[year[0].upper()], year[1], year[2])
         self.tutor = data.get("tutor", "")
         self.coreSubjects = data.get("coreSubjects", [])
+        self.size = data.get("size", 0)
 
     def to_dict(self) -> dict:
         return {
             "name": self.name,
             "year": (self.year[0].value, self.year[1], self.year[2]),
             "tutor": self.tutor,
-            "coreSubjects": self.coreSubjects
+            "coreSubjects": self.coreSubjects,
+            "size": self.size
         }
 
     def to_json(self) -> str:
@@ -310,14 +330,17 @@ def parse_time(time_str: str) -> datetime.time:
     return datetime.time.fromisoformat(time_str)
 
 class CommonDataStructure:
+    __slots__ = ("hours", "preferredOddHoursEnabled", "generationType", "solverParameters")
     hours: list[tuple[HourType, Days, datetime.time, datetime.time]] # List of tuples with hour type, day, start and end time
     preferredOddHoursEnabled : bool
     generationType : Type
+    solverParameters : dict # Optional "solver" section, see parameters.py
 
     def __init__(self):
         self.hours = []
         self.preferredOddHoursEnabled = False
         self.generationType = Type.BALANCED
+        self.solverParameters = {}
 
     def from_dict(self, data: dict):
         self.hours = [
@@ -325,10 +348,11 @@ class CommonDataStructure:
             for hour in data.get("hours", [])
         ]
         self.preferredOddHoursEnabled = data.get("preferredOddHoursEnabled", False)
-        self.generationType = Type[str(data.get("generationType", Type.BALANCED)).upper()]
+        self.generationType = Type[str(data.get("generationType", Type.BALANCED.value)).upper()]
+        self.solverParameters = data.get("solver", {})
 
     def to_dict(self) -> dict:
-        return {
+        data = {
             "hours": [
                 (hour[0].value, hour[1].value, hour[2].isoformat(), hour[3].isoformat())
                 for hour in self.hours
@@ -336,6 +360,9 @@ class CommonDataStructure:
             "preferredOddHoursEnabled": self.preferredOddHoursEnabled,
             "generationType": self.generationType.value
         }
+        if self.solverParameters:
+            data["solver"] = self.solverParameters
+        return data
 
     def to_json(self) -> str:
         return json.dumps(self.to_dict(), indent=4)
@@ -364,7 +391,7 @@ class OutputSubjectDataStructure:
             "subjectName": self.subjectName,
             "teacherName": self.teacherName,
             "classRoomNumber": self.classRoomNumber,
-            "timeSlot": self.timeSlot
+            "timeSlot": (self.timeSlot[0].value, self.timeSlot[1].value, self.timeSlot[2].isoformat(), self.timeSlot[3].isoformat())
         }
 
     def from_dict(self, data: dict):
@@ -454,11 +481,8 @@ class OutputDataStructure():
         data = json.loads(json_string)
         self.from_dict(data)
 
-def load_all_data():
-    teachers = [TeachersDataStructure.from_json(json.dumps(t)) for t in load_json_file(teachersFile)]
-    classes = [ClassDataStructure.from_json(json.dumps(c)) for c in load_json_file(classesFile)]
-    subjects = [SubjectDataStructure.from_json(json.dumps(s)) for s in load_json_file(subjectsFile)]
-    classrooms = [ClassroomDataStructure.from_json(json.dumps(c)) for c in load_json_file(classroomsFile)]
-    fixed_hours = [FixedHourDataStructure.from_json(json.dumps(f)) for f in load_json_file(fixedHoursFile)]
-    common = CommonDataStructure.from_json(json.dumps(load_json_file(commonFile)))
-    return teachers, classes, subjects, classrooms, fixed_hours, common
\ No newline at end of file
+def load_all_data(data_folder: str = dataFolder):
+    # See loader.load_data, which validates the files and keeps a snapshot of the parsed data
+    from loader import load_data
+    data = load_data(data_folder)
+    return data.teachers, data.classes, data.subjects, data.classrooms, data.fixed_hours, data.common
\ No newline at end of file
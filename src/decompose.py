@@ -0,0 +1,229 @@
+import sys
+import os
+import time
+import argparse
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+from datastructure import *
+from instance import ProblemInstance, compile_instance
+from loader import DATA_FILES, DataError, load_data, read_json
+from parameters import split_cores
+from streaming import write_json_atomic
+from compact import compact_file, compact_schedule
+from batch import solve_files, solve_pool, summary_table
+
+import numpy as np
+
+# Statuses of the components, the merged status is the first one in this list that a component has
+MERGED_STATUSES = ["INVALID", "FAILED", "MODEL_INVALID", "INFEASIBLE", "UNKNOWN", "FEASIBLE", "OPTIMAL"]
+
+class Component:
+    # Classes, teachers and rooms (instance IDs) that are solved as one model, and the fixed hours
+    # (indices into fixed_hours.json) that block its rooms
+    classes: list[int]
+    teachers: list[int]
+    rooms: list[int]
+    fixed_hours: list[int]
+
+    def __init__(self, classes: list[int], teachers: list[int], rooms: list[int]):
+        self.classes = classes
+        self.teachers = teachers
+        self.rooms = rooms
+        self.fixed_hours = []
+
+    def to_dict(self, instance: ProblemInstance) -> dict:
+        return {
+            "classes": [instance.class_names[c] for c in self.classes],
+            "teachers": [instance.teacher_names[t] for t in self.teachers],
+            "rooms": [instance.room_numbers[room] for room in self.rooms],
+        }
+
+class UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int) -> None:
+        self.parent[self.find(i)] = self.find(j)
+
+    def groups(self) -> dict[int, list[int]]:
+        groups = {}
+        for i in range(len(self.parent)):
+            groups.setdefault(self.find(i), []).append(i)
+        return groups
+
+def class_teacher_groups(instance: ProblemInstance) -> list[tuple[list[int], list[int]]]:
+    # Connected components of the graph of classes and the teachers qualified for one of their core subjects,
+    # as (classes, teachers); teachers without such a class teach nothing and are left out
+    classes = len(instance.class_names)
+    graph = UnionFind(classes + len(instance.teacher_names))
+    for c, s in np.argwhere(instance.class_subject).tolist():
+        for t in np.flatnonzero(instance.teacher_subject[:, s]).tolist():
+            graph.union(c, classes + t)
+    groups = []
+    for members in graph.groups().values():
+        group_classes = [i for i in members if i < classes]
+        if group_classes:
+            groups.append((group_classes, [i - classes for i in members if i >= classes]))
+    return groups
+
+def share_rooms(instance: ProblemInstance, groups: list[tuple[list[int], list[int]]]) -> list[list[int]] | None:
+    # Splits the rooms over the groups so that every lesson of a group has, in every slot, at least as many free
+    # compatible rooms of its group as the group can have lessons at the same time (its classes or teachers, whichever
+    # is fewer). Any lessons of the group in a slot then find distinct rooms, so the rooms never restrict a group and
+    # the groups are independent. Rooms compatible with one group go to it, a shared room to the group that lacks
+    # the most rooms for one of its lessons, and a shared room that no group lacks is not used. None when the
+    # rooms do not suffice for that.
+    free = ~instance.room_slot_blocked
+    lessons = [np.argwhere(instance.class_subject[classes]) for classes, _ in groups]
+    lessons = [(np.asarray(classes)[pairs[:, 0]], pairs[:, 1]) for (classes, _), pairs in zip(groups, lessons)]
+    parallel = [min(len(classes), len(teachers)) for classes, teachers in groups]
+    counts = [np.zeros((len(lesson_classes), len(instance.slots)), dtype=np.int32) for lesson_classes, _ in lessons]
+    rooms = [[] for _ in groups]
+
+    def compatible(k: int, room: int) -> np.ndarray:
+        lesson_classes, lesson_subjects = lessons[k]
+        return instance.room_compatible[lesson_classes, lesson_subjects, room]
+
+    def lack(k: int, room: int) -> int:
+        return int((parallel[k] - counts[k][compatible(k, room)]).max(initial=0))
+
+    room_groups = [[k for k in range(len(groups)) if compatible(k, room).any()] for room in range(len(instance.room_numbers))]
+    for room in sorted(range(len(room_groups)), key=lambda room: len(room_groups[room])):
+        if not room_groups[room]:
+            continue
+        k = max(room_groups[room], key=lambda k: lack(k, room))
+        if len(room_groups[room]) > 1 and lack(k, room) <= 0:
+            continue
+        rooms[k].append(room)
+        counts[k][compatible(k, room)] += free[room]
+    if any((count < parallel[k]).any() for k, count in enumerate(counts)):
+        return None
+    return rooms
+
+def decompose(instance: ProblemInstance) -> list[Component]:
+    # Independent parts of the school, the largest first: classes that share no teachers, directly or through
+    # other classes, and get disjoint rooms. When the rooms are too scarce to split, groups that can use the same
+    # room stay together, each with every room it can use.
+    groups = class_teacher_groups(instance)
+    rooms = share_rooms(instance, groups) if len(groups) > 1 else None
+    if rooms is None:
+        graph = UnionFind(len(groups))
+        for room in range(len(instance.room_numbers)):
+            users = [k for k, (classes, _) in enumerate(groups) if (instance.room_compatible[classes, :, room] & instance.class_subject[classes]).any()]
+            for k in users[1:]:
+                graph.union(users[0], k)
+        groups = [(sorted(c for k in members for c in groups[k][0]), sorted(t for k in members for t in groups[k][1]))
+                  for members in graph.groups().values()]
+        rooms = [np.flatnonzero((instance.room_compatible[classes] & instance.class_subject[classes][:, :, None]).any(axis=(0, 1))).tolist()
+                 for classes, _ in groups]
+    components = sorted((Component(sorted(classes), sorted(teachers), sorted(group_rooms)) for (classes, teachers), group_rooms in zip(groups, rooms)),
+                        key=lambda component: (-len(component.classes), component.classes))
+
+    # A fixed hour goes with the component of its room, or with the largest one when no component uses the room
+    room_component = {room: i for i, component in enumerate(components) for room in component.rooms}
+    for i, (_, _, fixed_classroom) in enumerate(instance.fixed_hours):
+        components[room_component.get(instance.room_ids.get(fixed_classroom), 0)].fixed_hours.append(i)
+    return components
+
+def component_files(files: dict, component: Component) -> dict:
+    # The input files of one component: its teachers, classes, rooms and fixed hours, every subject and common.json.
+    # compile_instance keeps the order of the files, so instance IDs are indices into their lists.
+    return dict(files, **{
+        "teachers.json": [files["teachers.json"][t] for t in component.teachers],
+        "classes.json": [files["classes.json"][c] for c in component.classes],
+        "classrooms.json": [files["classrooms.json"][room] for room in component.rooms],
+        "fixed_hours.json": [files["fixed_hours.json"][i] for i in component.fixed_hours],
+    })
+
+def component_schedule(result: dict) -> list[dict]:
+    # The schedule a component wrote to its folder, also on an infeasible solve (its fixed hours); nothing when it failed
+    output_file = os.path.join(result["folder"], "generated.json")
+    return load_json_file(output_file) if result["status"] not in ("INVALID", "FAILED") and os.path.exists(output_file) else []
+
+def merge_results(results: list[dict]) -> dict:
+    # Every objective is a sum over classes or teachers, so the objective and bound of the school are the sums over
+    # its components; the lessons are concatenated, the fixed hours are in exactly one component
+    statuses = [result["status"] for result in results]
+    status = next((status for status in MERGED_STATUSES if status in statuses), None)
+    def total(key: str):
+        values = [result.get(key) for result in results]
+        return sum(values) if values and None not in values else None
+    return {
+        "status": status,
+        "objective": total("objective"),
+        "best_bound": total("best_bound"),
+        "lessons": [lesson for result in results for lesson in component_schedule(result)],
+    }
+
+def solve_decomposed(data_folder: str, output_file: str, jobs: int | None = None, cores_per_job: int | None = None,
+                     run_options: dict | None = None, solver_parameters: dict | None = None) -> dict:
+    # Solves every component of the school in data_folder as its own model, jobs at a time with cores_per_job
+    # CP-SAT workers each, and writes the merged schedule to output_file and the results per component to
+    # components/summary.json next to it. The wall time is about that of the largest component.
+    start = time.perf_counter()
+    data = load_data(data_folder, snapshot=False)
+    instance = compile_instance(data.teachers, data.classes, data.subjects, data.classrooms, data.fixed_hours, data.common)
+    components = decompose(instance)
+    files = {name: read_json(os.path.join(data_folder, name), name) for name in DATA_FILES}
+
+    jobs, cores_per_job = split_cores(len(components), jobs, cores_per_job)
+    solver_parameters = dict(solver_parameters or {}, num_workers=cores_per_job)
+    output_folder = os.path.join(os.path.dirname(output_file), "components")
+    print(f'{len(components)} independent components, solving {jobs} at a time with {cores_per_job} search workers each')
+    for i, component in enumerate(components):
+        print(f' - component {i + 1}: {len(component.classes)} classes, {len(component.teachers)} teachers, {len(component.rooms)} rooms')
+
+    results = solve_pool(solve_files, [(f'component {i + 1}', component_files(files, component), os.path.join(output_folder, str(i + 1)),
+                                        solver_parameters, run_options) for i, component in enumerate(components)], jobs)
+
+    merged = merge_results(results)
+    write_json_atomic(output_file, merged["lessons"])
+    write_json_atomic(compact_file(output_file), compact_schedule(merged["lessons"]), indent=None)
+    wall_time = time.perf_counter() - start
+    write_json_atomic(os.path.join(output_folder, "summary.json"), {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "settings": {"jobs": jobs, "cores_per_job": cores_per_job, **(run_options or {}), **solver_parameters},
+        "status": merged["status"],
+        "objective": merged["objective"],
+        "best_bound": merged["best_bound"],
+        "wall_time": wall_time,
+        "components": [dict(component.to_dict(instance), **result) for component, result in zip(components, results)],
+    })
+    merged["results"] = results
+    merged["wall_time"] = wall_time
+    return merged
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a school schedule by solving its independent parts in parallel")
+    parser.add_argument("--data-folder", default=dataFolder, help="folder with the input files (default: data)")
+    parser.add_argument("--output", default=generatedFile, help="schedule file to write (default: data/out/generated.json)")
+    parser.add_argument("--jobs", type=int, default=None, help="components solved at the same time (default: cores / cores per job)")
+    parser.add_argument("--cores-per-job", type=int, default=None,
+                        help="CP-SAT search workers per component (default: cores / jobs or cores / components, at least 4)")
+    parser.add_argument("--time-limit", type=float, default=None, help="solver time limit per component in seconds")
+    parser.add_argument("--seed", type=int, default=None, help="random seed of the searches")
+    parser.add_argument("--room-pools", action="store_true", help="model interchangeable classrooms as capacity pools")
+    parser.add_argument("--formulation", default="linear", help="formulation of the exclusivity constraints, see run.py")
+    parser.add_argument("--no-symmetry-breaking", action="store_true", help="do not order interchangeable classes and teachers")
+    args = parser.parse_args()
+
+    try:
+        merged = solve_decomposed(args.data_folder, args.output, args.jobs, args.cores_per_job,
+                                  {"room_pools": args.room_pools, "formulation": args.formulation, "symmetry_breaking": not args.no_symmetry_breaking},
+                                  {"time_limit": args.time_limit, "random_seed": args.seed})
+    except DataError as e:
+        print(f'Invalid input: {e}', file=sys.stderr)
+        sys.exit(1)
+    print(summary_table(merged["results"]))
+    for result in merged["results"]:
+        if result["error"] is not None:
+            print(f'{result["profile"]}: {result["error"]}')
+    print(f'Solver status: {merged["status"]}')
+    if merged["objective"] is not None:
+        print(f'Objective: {merged["objective"]:g}')
+    print(f'Generated {len(merged["lessons"])} lessons in {merged["wall_time"]:.2f} seconds')
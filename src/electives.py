@@ -0,0 +1,161 @@
+import os
+
+import numpy as np
+
+from datastructure import *
+from instance import ProblemInstance
+from loader import load_file
+
+# Group size for subjects without a compatible room to take the size from
+DEFAULT_GROUP_SIZE = 30
+
+class StudentCluster:
+    # Students with the same set of elective subjects; they are scheduled together, so the model grows
+    # with the number of distinct subject combinations instead of with the number of students
+    subjects: frozenset[int] # Elective subjects: subjects of the student that are not core subjects of their class
+    students: list[StudentDataStructure]
+    classes: set[int] # Classes the students are in
+
+    def __init__(self, subjects: frozenset[int]):
+        self.subjects = subjects
+        self.students = []
+        self.classes = set()
+
+    @property
+    def size(self) -> int:
+        return len(self.students)
+
+class ElectiveGroup:
+    # One lesson group of an elective subject, scheduled like a class of its own
+    name: str
+    subject: int
+    members: list[tuple[int, int, int]] # (cluster, first, end): students[first:end] of the cluster are in this group
+    classes: set[int] # Classes with students in this group
+    conflicts: set[tuple[int, int]] # (class, cluster) of the students in this group, see Electives.class_conflicts
+    size: int
+
+    def __init__(self, name: str, subject: int):
+        self.name = name
+        self.subject = subject
+        self.members = []
+        self.classes = set()
+        self.conflicts = set()
+        self.size = 0
+
+def load_students(file_path: str) -> list[StudentDataStructure]:
+    return load_file(file_path, "students.json")
+
+def student_schedules_file(output_file: str) -> str:
+    # data/out/generated.json -> data/out/students.json
+    return os.path.join(os.path.dirname(output_file), "students.json")
+
+def cluster_students(students: list[StudentDataStructure], instance: ProblemInstance) -> list[StudentCluster]:
+    # Subjects are matched by name; subjects that do not exist and students without electives are left out
+    clusters = {}
+    for student in students:
+        c = instance.class_ids.get(student.className)
+        electives = frozenset(instance.subject_ids[name] for name in student.subjects
+                              if name in instance.subject_ids and not (c is not None and instance.class_subject[c, instance.subject_ids[name]]))
+        if not electives:
+            continue
+        if electives not in clusters:
+            clusters[electives] = StudentCluster(electives)
+        clusters[electives].students.append(student)
+        if c is not None:
+            clusters[electives].classes.add(c)
+    # Largest clusters first, so they are kept together when the groups are filled
+    return sorted(clusters.values(), key=lambda cluster: (-cluster.size, sorted(cluster.subjects)))
+
+def subject_group_size(instance: ProblemInstance, s: int) -> int:
+    # Capacity of the largest room with every specialty the subject needs
+    rooms = ~(instance.subject_specialty[s][None, :] & ~instance.room_specialty).any(axis=1)
+    capacities = instance.room_capacity[rooms]
+    return int(capacities.max()) if capacities.size and capacities.max() > 0 else DEFAULT_GROUP_SIZE
+
+def build_elective_groups(clusters: list[StudentCluster], instance: ProblemInstance) -> list[ElectiveGroup]:
+    # Per elective subject, the clusters taking it are packed first-fit into as few groups as the largest
+    # compatible room allows. A cluster is only split over groups when it does not fit in one.
+    groups = []
+    for s in range(len(instance.subject_names)):
+        capacity = subject_group_size(instance, s)
+        subject_groups = []
+        for k, cluster in enumerate(clusters):
+            if s not in cluster.subjects:
+                continue
+            first = 0
+            while first < cluster.size:
+                group = next((g for g in subject_groups if g.size + cluster.size - first <= capacity), None)
+                if group is None:
+                    group = ElectiveGroup(f'{instance.subject_names[s]} group {len(subject_groups) + 1}', s)
+                    subject_groups.append(group)
+                end = min(cluster.size, first + capacity - group.size)
+                group.members.append((k, first, end))
+                group.classes |= {instance.class_ids[student.className] for student in cluster.students[first:end] if student.className in instance.class_ids}
+                group.conflicts |= {(instance.class_ids.get(student.className, -1), k) for student in cluster.students[first:end]}
+                group.size += end - first
+                first = end
+        groups += subject_groups
+    return groups
+
+class Electives:
+    # Elective mode: students with the same electives are clustered and every elective subject is taught to
+    # groups of clusters. The groups are extra "classes" of the model (class IDs from len(instance.class_names)).
+    # Students of one class in one cluster have the same lessons, so a (class, cluster) has one lesson at a time:
+    # its class lessons and its group lessons. Two groups only conflict when they share such students.
+    def __init__(self, students: list[StudentDataStructure], instance: ProblemInstance):
+        self.instance = instance
+        self.students = students
+        self.clusters = cluster_students(students, instance)
+        self.groups = build_elective_groups(self.clusters, instance)
+
+    def class_conflicts(self, c: int) -> list[tuple[int, int]]:
+        # The (class, cluster) of the students of class c that take electives
+        return [(c, k) for k, cluster in enumerate(self.clusters) if c in cluster.classes]
+
+    def conflict_name(self, conflict: tuple[int, int]) -> str:
+        c, k = conflict
+        subjects = ", ".join(sorted(self.instance.subject_names[s] for s in self.clusters[k].subjects))
+        return f'{self.instance.class_names[c] if c >= 0 else "Students without a class"} taking {subjects}'
+
+    @property
+    def group_names(self) -> list[str]:
+        return [group.name for group in self.groups]
+
+    @property
+    def group_ids(self) -> dict[str, int]:
+        # Model class ID of every group by name, as the groups appear in generated.json
+        return {group.name: len(self.instance.class_names) + g for g, group in enumerate(self.groups)}
+
+    def group_room_compatible(self) -> np.ndarray:
+        # bool[group, room]: the room has the specialties of the group's subject and fits the group
+        instance = self.instance
+        compatible = np.zeros((len(self.groups), len(instance.room_numbers)), dtype=bool)
+        for g, group in enumerate(self.groups):
+            specialties = ~(instance.subject_specialty[group.subject][None, :] & ~instance.room_specialty).any(axis=1)
+            compatible[g] = specialties & (instance.room_capacity >= group.size)
+        return compatible
+
+    def student_schedules(self, lessons: list[dict]) -> list[OutputStudentScheduleStructure]:
+        # The lessons of every student: those of their class, of their elective groups and the fixed hours
+        instance = self.instance
+        day_ids = {day.value: i for i, day in enumerate(instance.days)}
+        student_groups = {}
+        for group in self.groups:
+            for k, first, end in group.members:
+                for student in self.clusters[k].students[first:end]:
+                    student_groups.setdefault(id(student), set()).add(group.name)
+
+        by_class = {}
+        for lesson in lessons:
+            by_class.setdefault(lesson["class"], []).append(lesson)
+        schedules = []
+        for student in self.students:
+            attended = by_class.get(student.className, []) + by_class.get("All Classes", [])
+            for name in sorted(student_groups.get(id(student), ())):
+                attended += by_class.get(name, [])
+            schedule = []
+            for lesson in sorted(attended, key=lambda l: (day_ids[l["day"]], l["lesson_index"])):
+                slot = instance.day_slots[day_ids[lesson["day"]]][lesson["lesson_index"]]
+                schedule.append(OutputSubjectDataStructure(lesson["subject"], lesson["teacher"], lesson["classroom"], instance.slots[slot]))
+            schedules.append(OutputStudentScheduleStructure(student.name, schedule))
+        return schedules
@@ -0,0 +1,170 @@
+import time
+
+import numpy as np
+
+from ortools.sat.python import cp_model
+
+from datastructure import *
+from feasibility import lesson_demands
+from rooms import build_room_pools
+
+class Assumption:
+    # One guarded constraint group of the explanation model; a conflict is a set of them that cannot all hold
+    kind: str # teacher_availability, required_hours, fixed_hour or room_exclusivity
+    message: str
+    entities: dict[str, list]
+
+    def __init__(self, kind: str, message: str, entities: dict[str, list]):
+        self.kind = kind
+        self.message = message
+        self.entities = entities
+
+    def __str__(self) -> str:
+        return self.message
+
+    def to_dict(self) -> dict:
+        return {"kind": self.kind, "message": self.message, "entities": self.entities}
+
+class ConflictExplainer:
+    # Explains an infeasible Run: a copy of its formulation in which every constraint group an admin can change is
+    # only enforced by an assumption literal - the availability of every teacher, the required hours of every class
+    # and subject, every fixed hour and the room exclusivity of every room pool. The solver returns a subset of the
+    # assumptions that is infeasible on its own, which shrink() reduces to a minimal one. Qualifications, room
+    # specialties and sizes and one lesson at a time per teacher and class stay hard constraints.
+    def __init__(self, run):
+        self.run = run
+        self.model = cp_model.CpModel()
+        self.assumptions = {} # Index of the assumption literal -> Assumption
+        self.literals = {} # Index of the assumption literal -> literal
+        self.solver = None
+        self.stopped = False
+        self.minimal = False # The last conflict is proven minimal: without any one of its assumptions the rest is feasible
+        self.status = None # Status of the explanation model with every assumption, see explain()
+        self.build_model()
+
+    def assume(self, assumption: Assumption):
+        literal = self.model.NewBoolVar(f'assume_{len(self.assumptions)}')
+        self.assumptions[literal.Index()] = assumption
+        self.literals[literal.Index()] = literal
+        return literal
+
+    def build_model(self) -> None:
+        run, instance, model = self.run, self.run.instance, self.model
+        demands = lesson_demands(instance, run.electives)
+        pools = build_room_pools(instance)
+        pool_ids = {room: p for p, pool in enumerate(pools) for room in pool.room_ids}
+        all_slots = range(len(instance.slots))
+
+        unavailable = {} # teacher -> lesson variables outside their availability
+        hours = {} # demand -> lesson variables
+        teacher_slot_vars = {}
+        class_slot_vars = {}
+        pool_slot_vars = {}
+        for d, demand in enumerate(demands):
+            # Room pools are interchangeable for every lesson, so a pool is compatible when its first room is
+            compatible = [p for p, pool in enumerate(pools) if demand.rooms[pool.room_ids[0]]]
+            # A lesson of several slots starts where it stays within one run of lesson slots and covers all of them, like in Run.build_model
+            length = int(instance.block_length[demand.subject])
+            starts = np.flatnonzero(instance.block_starts(length)).tolist()
+            for t in np.flatnonzero(instance.teacher_subject[:, demand.subject]).tolist():
+                for slot in starts:
+                    covered = range(slot, slot + length)
+                    for p in compatible:
+                        var = model.NewBoolVar(f'x_{d}_{t}_{slot}_{p}')
+                        hours.setdefault(d, []).append(var)
+                        for covered_slot in covered:
+                            teacher_slot_vars.setdefault((t, covered_slot), []).append(var)
+                            pool_slot_vars.setdefault((p, covered_slot), []).append(var)
+                            # A class or group of students with the same electives has one lesson at a time
+                            for key in demand.conflicts:
+                                class_slot_vars.setdefault((key, covered_slot), []).append(var)
+                        if not instance.teacher_slot[t, slot:slot + length].all():
+                            unavailable.setdefault(t, []).append(var)
+
+        for d, demand in enumerate(demands):
+            subject = instance.subject_names[demand.subject]
+            literal = self.assume(Assumption("required_hours", f'{demand.name} has {demand.hours} {"hour" if demand.hours == 1 else "hours"} of {subject}',
+                                             {"classes": [demand.name], "subjects": [subject]}))
+            model.Add(cp_model.LinearExpr.Sum(hours.get(d, [])) == demand.hours // int(instance.block_length[demand.subject])).OnlyEnforceIf(literal)
+
+        for t, lesson_vars in unavailable.items():
+            name = instance.teacher_names[t]
+            literal = self.assume(Assumption("teacher_availability", f'{name} only teaches in their available hours', {"teachers": [name]}))
+            model.AddBoolAnd([var.Not() for var in lesson_vars]).OnlyEnforceIf(literal)
+
+        for lesson_vars in list(teacher_slot_vars.values()) + list(class_slot_vars.values()):
+            if len(lesson_vars) > 1:
+                model.AddAtMostOne(lesson_vars)
+
+        # A fixed hour takes its room out of the room's pool in its slot
+        blocked = {}
+        for fixed_hour, slot, room_number in instance.fixed_hours:
+            room = instance.room_ids.get(room_number)
+            if slot < 0 or room is None:
+                continue
+            day, lesson_index = instance.slot_name(slot)
+            literal = self.assume(Assumption("fixed_hour", f'Fixed hour {fixed_hour.name} reserves room {room_number} on {day} hour {lesson_index + 1}',
+                                             {"fixed_hours": [fixed_hour.name], "rooms": [room_number]}))
+            blocked.setdefault((pool_ids[room], slot), []).append(literal)
+        for p, pool in enumerate(pools):
+            numbers = [instance.room_numbers[room] for room in pool.room_ids]
+            literal = self.assume(Assumption("room_exclusivity", f'Rooms {", ".join(map(str, numbers))} hold one lesson at a time', {"rooms": numbers}))
+            for slot in all_slots:
+                lesson_vars = pool_slot_vars.get((p, slot), [])
+                if lesson_vars:
+                    model.Add(cp_model.LinearExpr.Sum(lesson_vars + blocked.get((p, slot), [])) <= len(pool.room_ids)).OnlyEnforceIf(literal)
+
+    def stop(self) -> None:
+        self.stopped = True
+        if self.solver is not None:
+            self.solver.StopSearch()
+
+    def infeasible_subset(self, assumed: list[int], time_limit: float) -> tuple[list[int] | None, cp_model.CpSolverStatus]:
+        # The indices of assumptions that are infeasible together, a subset of assumed; None when assumed
+        # is feasible or the solver did not decide within time_limit
+        self.model.ClearAssumptions()
+        self.model.AddAssumptions([self.literals[index] for index in assumed])
+        self.solver = cp_model.CpSolver()
+        self.solver.parameters.max_time_in_seconds = max(0.01, time_limit)
+        self.solver.parameters.num_workers = self.run.parameters.effective_num_workers()
+        self.solver.parameters.random_seed = self.run.parameters.random_seed
+        status = self.solver.Solve(self.model)
+        if status != cp_model.INFEASIBLE:
+            return None, status
+        return list(self.solver.SufficientAssumptionsForInfeasibility()), status
+
+    def explain(self, time_limit: float, minimal: bool = False) -> list[Assumption] | None:
+        # A conflicting set of assumptions, optionally shrunk to a minimal one within the remaining time;
+        # None when the explanation model is not proven infeasible
+        start = time.perf_counter()
+        core, self.status = self.infeasible_subset(list(self.assumptions), time_limit)
+        if core is None:
+            return None
+        self.minimal = False
+        if minimal:
+            core = self.shrink(core, start + time_limit)
+        return [self.assumptions[index] for index in core]
+
+    def shrink(self, core: list[int], deadline: float) -> list[int]:
+        # Deletion-based: drop one assumption at a time and keep the subset the solver returns if the rest is
+        # still infeasible. The core is minimal when every remaining assumption was proven to be needed.
+        checked = set()
+        proven = True
+        while not self.stopped:
+            index = next((index for index in core if index not in checked), None)
+            if index is None:
+                break
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                proven = False
+                break
+            candidate = [other for other in core if other != index]
+            subset, status = self.infeasible_subset(candidate, remaining)
+            if subset is not None:
+                kept = set(subset)
+                core = [other for other in candidate if other in kept]
+            else:
+                checked.add(index)
+                proven = proven and status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+        self.minimal = proven and not self.stopped
+        return core
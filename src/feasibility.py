@@ -0,0 +1,240 @@
+import numpy as np
+
+from ortools.graph.python import max_flow
+
+from datastructure import *
+from instance import ProblemInstance
+
+class Violation:
+    # A necessary condition for a schedule that the input does not meet, with the entities involved
+    check: str # rooms, teachers, blocks, class_hours or slots; fixed_hours for warnings
+    message: str
+    entities: dict[str, list] # e.g. {"subjects": ["Math"], "teachers": ["Smith"]}
+
+    def __init__(self, check: str, message: str, entities: dict[str, list]):
+        self.check = check
+        self.message = message
+        self.entities = entities
+
+    def __str__(self) -> str:
+        return self.message
+
+    def to_dict(self) -> dict:
+        return {"check": self.check, "message": self.message, "entities": self.entities}
+
+class LessonDemand:
+    # The lessons of one subject for one class or elective group
+    name: str # Class or elective group
+    subject: int
+    hours: int
+    conflicts: list[str] # Classes and groups of students that have one lesson at a time and take these lessons
+    rooms: np.ndarray # bool[room]: compatible rooms
+    size: int # Number of students
+
+    def __init__(self, name: str, subject: int, hours: int, conflicts: list[str], rooms: np.ndarray, size: int):
+        self.name = name
+        self.subject = subject
+        self.hours = hours
+        self.conflicts = conflicts
+        self.rooms = rooms
+        self.size = size
+
+class FlowNetwork:
+    # SimpleMaxFlow with nodes identified by arbitrary keys
+    def __init__(self):
+        self.flow = max_flow.SimpleMaxFlow()
+        self.nodes = {"source": 0, "sink": 1}
+
+    def node(self, key) -> int:
+        return self.nodes.setdefault(key, len(self.nodes))
+
+    def arc(self, tail, head, capacity: int) -> None:
+        if capacity > 0:
+            self.flow.add_arc_with_capacity(self.node(tail), self.node(head), int(capacity))
+
+    def solve(self) -> int:
+        if self.flow.solve(0, 1) != self.flow.OPTIMAL:
+            return 0
+        return self.flow.optimal_flow()
+
+    def source_side(self, kind: str) -> list:
+        # IDs of the (kind, ID) nodes on the source side of a minimum cut: the demands that cannot be met
+        # and the supplies that are exhausted by them
+        keys = list(self.nodes)
+        return sorted(keys[node][1] for node in self.flow.get_source_side_min_cut() if isinstance(keys[node], tuple) and keys[node][0] == kind)
+
+def lesson_demands(instance: ProblemInstance, electives=None) -> list[LessonDemand]:
+    # Every (class, subject) to schedule and, in elective mode, every elective group, like Run.build_model: the lessons
+    # of a class conflict with each other and with the groups of its students, two groups only when they share students
+    demands = []
+    for c, class_name in enumerate(instance.class_names):
+        conflicts = [class_name] + ([electives.conflict_name(conflict) for conflict in electives.class_conflicts(c)] if electives is not None else [])
+        for s in np.flatnonzero(instance.class_subject[c]).tolist():
+            demands.append(LessonDemand(class_name, s, int(instance.required_hours[s]), conflicts, instance.room_compatible[c, s], int(instance.class_size[c])))
+    if electives is not None:
+        for group, rooms in zip(electives.groups, electives.group_room_compatible()):
+            conflicts = [group.name] + [electives.conflict_name(conflict) for conflict in sorted(group.conflicts)]
+            demands.append(LessonDemand(group.name, group.subject, int(instance.required_hours[group.subject]), conflicts, rooms, group.size))
+    return [demand for demand in demands if demand.hours > 0]
+
+def slot_names(instance: ProblemInstance, slots) -> list[str]:
+    return [f'{day} {lesson_index + 1}' for day, lesson_index in map(instance.slot_name, slots)]
+
+def check_fixed_hours(instance: ProblemInstance) -> list[Violation]:
+    # Warnings, not violations: the solver ignores a fixed hour that is not on a lesson slot, so it does not stop the run
+    violations = []
+    for fixed_hour, slot, _ in instance.fixed_hours:
+        if slot < 0:
+            violations.append(Violation("fixed_hours", f'Fixed hour {fixed_hour.name} on {fixed_hour.day} hour {fixed_hour.hour} is not a lesson slot',
+                                        {"fixed_hours": [fixed_hour.name]}))
+    return violations
+
+def check_rooms(instance: ProblemInstance, demands: list[LessonDemand]) -> list[Violation]:
+    # Every lesson needs a compatible room that is free in its slot: lessons -> compatible rooms -> free slots of the room
+    violations = []
+    free_slots = (~instance.room_slot_blocked).sum(axis=1)
+    network = FlowNetwork()
+    for d, demand in enumerate(demands):
+        rooms = np.flatnonzero(demand.rooms)
+        if not rooms.size:
+            needs = [specialty.value for specialty, needed in zip(instance.specialties, instance.subject_specialty[demand.subject]) if needed]
+            violations.append(Violation("rooms", f'No room for {instance.subject_names[demand.subject]} of {demand.name}'
+                                        f' (specialties: {", ".join(needs) or "none"}, students: {demand.size})',
+                                        {"classes": [demand.name], "subjects": [instance.subject_names[demand.subject]]}))
+            continue
+        network.arc("source", ("lesson", d), demand.hours)
+        for room in rooms.tolist():
+            network.arc(("lesson", d), ("room", room), demand.hours)
+    for room, slots in enumerate(free_slots.tolist()):
+        network.arc(("room", room), "sink", slots)
+
+    needed = sum(demand.hours for demand in demands if demand.rooms.any())
+    if network.solve() < needed:
+        lessons = [demands[d] for d in network.source_side("lesson")]
+        rooms = network.source_side("room")
+        subjects = sorted({instance.subject_names[demand.subject] for demand in lessons})
+        violations.append(Violation("rooms", f'{", ".join(subjects)} need {sum(demand.hours for demand in lessons)} lessons in rooms '
+                                    f'{", ".join(str(instance.room_numbers[room]) for room in rooms)}, which have {int(free_slots[rooms].sum())} free slots',
+                                    {"subjects": subjects, "classes": sorted({demand.name for demand in lessons}),
+                                     "rooms": [instance.room_numbers[room] for room in rooms]}))
+    return violations
+
+def check_teachers(instance: ProblemInstance, demands: list[LessonDemand]) -> list[Violation]:
+    # Every lesson needs a qualified teacher, who teaches at most one lesson per available slot:
+    # subject demand -> qualified teachers -> available slots of the teacher
+    violations = []
+    subject_hours = np.zeros(len(instance.subject_names), dtype=np.int64)
+    for demand in demands:
+        subject_hours[demand.subject] += demand.hours
+    available = instance.teacher_slot.sum(axis=1)
+    network = FlowNetwork()
+    for s, hours in enumerate(subject_hours.tolist()):
+        network.arc("source", ("subject", s), hours)
+        for t in np.flatnonzero(instance.teacher_subject[:, s]).tolist():
+            network.arc(("subject", s), ("teacher", t), hours)
+    for t, slots in enumerate(available.tolist()):
+        network.arc(("teacher", t), "sink", slots)
+
+    if network.solve() < subject_hours.sum():
+        subjects = network.source_side("subject")
+        teachers = network.source_side("teacher")
+        subject_names = [instance.subject_names[s] for s in subjects]
+        teacher_names = [instance.teacher_names[t] for t in teachers]
+        if teachers:
+            supply = f'their qualified teachers ({", ".join(teacher_names)}) are available for {int(available[teachers].sum())} of them'
+        else:
+            supply = 'no teacher is qualified to teach them'
+        violations.append(Violation("teachers", f'{", ".join(subject_names)} need {int(subject_hours[subjects].sum())} lessons, {supply}',
+                                    {"subjects": subject_names, "teachers": teacher_names}))
+    return violations
+
+def usable_slots(instance: ProblemInstance, demand: LessonDemand) -> np.ndarray:
+    # bool[slot]: a qualified teacher is available and a compatible room is free
+    teachers = instance.teacher_slot[instance.teacher_subject[:, demand.subject]].any(axis=0)
+    rooms = (~instance.room_slot_blocked[demand.rooms]).any(axis=0)
+    return teachers & rooms
+
+def check_blocks(instance: ProblemInstance, demands: list[LessonDemand], usable: list[np.ndarray]) -> list[Violation]:
+    # A lesson of several slots needs that many consecutive usable slots without a recess or day boundary in between.
+    # Usable slots in the same segment with the same slot - rank are one run, and a run of n slots holds n // length lessons.
+    violations = []
+    for demand, slots in zip(demands, usable):
+        length = int(instance.block_length[demand.subject])
+        if length == 1:
+            continue
+        slots = np.flatnonzero(slots)
+        runs = {}
+        for run in zip(instance.slot_segment[slots].tolist(), (slots - np.arange(len(slots))).tolist()):
+            runs[run] = runs.get(run, 0) + 1
+        fits = sum(n // length for n in runs.values())
+        lessons = demand.hours // length
+        if fits < lessons:
+            subject = instance.subject_names[demand.subject]
+            violations.append(Violation("blocks", f'{demand.name} needs {lessons} {"lesson" if lessons == 1 else "lessons"} of {length} hours of {subject}, but only {fits} '
+                                        f'fit in consecutive slots with a qualified teacher and a free room',
+                                        {"classes": [demand.name], "subjects": [subject]}))
+    return violations
+
+def check_class_hours(instance: ProblemInstance, demands: list[LessonDemand], usable: list[np.ndarray]) -> list[Violation]:
+    # A class, and every group of its students with the same electives, has at most one lesson per slot:
+    # per class or group of students, its lessons -> slots they can use -> one lesson per slot
+    violations = []
+    for class_name in dict.fromkeys(name for demand in demands for name in demand.conflicts):
+        network = FlowNetwork()
+        needed = 0
+        for d, demand in enumerate(demands):
+            if class_name not in demand.conflicts:
+                continue
+            needed += demand.hours
+            network.arc("source", ("lesson", d), demand.hours)
+            for slot in np.flatnonzero(usable[d]).tolist():
+                network.arc(("lesson", d), ("slot", slot), 1)
+        for slot in range(len(instance.slots)):
+            network.arc(("slot", slot), "sink", 1)
+        if not needed or network.solve() >= needed:
+            continue
+        lessons = [demands[d] for d in network.source_side("lesson")]
+        slots = network.source_side("slot")
+        subjects = sorted({instance.subject_names[demand.subject] for demand in lessons})
+        violations.append(Violation("class_hours", f'{class_name} needs {sum(demand.hours for demand in lessons)} lessons of {", ".join(subjects)}, '
+                                    f'but only {len(slots)} slots have a qualified teacher and a free room for them',
+                                    {"classes": [class_name], "subjects": subjects, "slots": slot_names(instance, slots)}))
+    return violations
+
+def check_slots(instance: ProblemInstance, demands: list[LessonDemand], usable: list[np.ndarray]) -> list[Violation]:
+    # In every slot there are at most as many lessons as free rooms and available teachers:
+    # lessons -> (class, slot), one lesson each -> slot, at most min(free rooms, available teachers)
+    supply = np.minimum((~instance.room_slot_blocked).sum(axis=0), instance.teacher_slot.sum(axis=0))
+    network = FlowNetwork()
+    class_slots = set()
+    for d, demand in enumerate(demands):
+        network.arc("source", ("lesson", d), demand.hours)
+        for slot in np.flatnonzero(usable[d]).tolist():
+            network.arc(("lesson", d), ("class_slot", demand.name, slot), 1)
+            class_slots.add((demand.name, slot))
+    for name, slot in class_slots:
+        network.arc(("class_slot", name, slot), ("slot", slot), 1)
+    for slot, lessons in enumerate(supply.tolist()):
+        network.arc(("slot", slot), "sink", lessons)
+
+    needed = sum(demand.hours for demand in demands)
+    placed = network.solve()
+    if placed >= needed:
+        return []
+    slots = network.source_side("slot")
+    names = sorted({demands[d].name for d in network.source_side("lesson")})
+    return [Violation("slots", f'{needed - placed} of {needed} lessons do not fit: slots {", ".join(slot_names(instance, slots))} '
+                      f'have too few free rooms and available teachers for the lessons of {", ".join(names)}',
+                      {"classes": names, "slots": slot_names(instance, slots)})]
+
+def check_feasibility(instance: ProblemInstance, electives=None) -> list[Violation]:
+    # Necessary conditions for a schedule, checked in milliseconds before the model is built. An empty list does
+    # not prove that a schedule exists, but every violation proves that none does.
+    demands = lesson_demands(instance, electives)
+    violations = check_rooms(instance, demands) + check_teachers(instance, demands)
+    usable = [usable_slots(instance, demand) for demand in demands]
+    violations += check_blocks(instance, demands, usable) + check_class_hours(instance, demands, usable)
+    # Combines the conditions above, so it only adds something when they all hold
+    if not violations:
+        violations += check_slots(instance, demands, usable)
+    return violations
@@ -0,0 +1,106 @@
+import numpy as np
+
+from ortools.sat.python import cp_model
+
+from instance import ProblemInstance
+
+class LessonIntervals:
+    # Interval formulation: one optional interval per lesson variable over the slots of the lesson (one, or the
+    # block length of its subject), present when the lesson is scheduled and shared by every NoOverlap and
+    # cumulative constraint the lesson is in
+    def __init__(self, model: cp_model.CpModel, lesson_keys: np.ndarray, lesson_var_index: np.ndarray, block_length: np.ndarray):
+        self.model = model
+        self.spans = {index: (slot, int(block_length[s])) for (_, s, _, slot, _), index in zip(lesson_keys.tolist(), lesson_var_index.tolist())}
+        self.intervals = {}
+
+    def get(self, var):
+        index = var.Index()
+        if index not in self.intervals:
+            start, length = self.spans[index]
+            self.intervals[index] = self.model.NewOptionalFixedSizeIntervalVar(start, length, var, f'lesson_{index}')
+        return self.intervals[index]
+
+    def of(self, lesson_vars: list) -> list:
+        # A lesson of several slots is in the lesson variables of every slot it covers, but is one interval
+        return list({var.Index(): self.get(var) for var in lesson_vars}.values())
+
+def add_required_hours(model: cp_model.CpModel, lesson_vars: list, lessons: int, formulation: str) -> None:
+    if formulation != "linear" and lessons == 1:
+        model.AddExactlyOne(lesson_vars)
+    else:
+        model.Add(cp_model.LinearExpr.Sum(lesson_vars) == lessons)
+
+def add_one_at_a_time(model: cp_model.CpModel, slot_vars: dict, formulation: str, intervals: LessonIntervals | None) -> None:
+    # At most one lesson per (entity, slot): a teacher, class or student cluster has one lesson at a time
+    if formulation == "interval":
+        entity_vars = {}
+        for (entity, slot), lesson_vars in slot_vars.items():
+            entity_vars.setdefault(entity, []).extend(lesson_vars)
+        for lesson_vars in entity_vars.values():
+            lessons = intervals.of(lesson_vars)
+            if len(lessons) > 1:
+                model.AddNoOverlap(lessons)
+        return
+    for lesson_vars in slot_vars.values():
+        if len(lesson_vars) > 1:
+            if formulation == "boolean":
+                model.AddAtMostOne(lesson_vars)
+            else:
+                model.Add(sum(lesson_vars) <= 1)
+
+def add_room_capacity(model: cp_model.CpModel, room_slot_vars: dict, room_slot_capacity: np.ndarray, formulation: str,
+                      intervals: LessonIntervals | None) -> None:
+    # At most room_slot_capacity[room, slot] lessons per room (pool) and slot
+    if formulation == "interval":
+        room_vars = {}
+        room_slots = {}
+        for (room, slot), lesson_vars in room_slot_vars.items():
+            room_vars.setdefault(room, []).extend(lesson_vars)
+            room_slots.setdefault(room, []).append(slot)
+        for room, lesson_vars in room_vars.items():
+            lessons = intervals.of(lesson_vars)
+            if len(lessons) <= 1:
+                continue
+            slots = sorted(room_slots[room])
+            capacity = int(room_slot_capacity[room, slots].max())
+            if capacity == 1:
+                model.AddNoOverlap(lessons)
+                continue
+            # A pool with fewer free rooms in some slots: a fixed interval takes the missing rooms in those slots
+            blocked = [(model.NewFixedSizeIntervalVar(slot, 1, f'blocked_{room}_{slot}'), capacity - int(room_slot_capacity[room, slot]))
+                       for slot in slots if room_slot_capacity[room, slot] < capacity]
+            model.AddCumulative(lessons + [interval for interval, _ in blocked], [1] * len(lessons) + [demand for _, demand in blocked], capacity)
+        return
+    for (room, slot), lesson_vars in room_slot_vars.items():
+        capacity = int(room_slot_capacity[room, slot])
+        if len(lesson_vars) <= capacity:
+            continue
+        if formulation == "boolean" and capacity == 1:
+            model.AddAtMostOne(lesson_vars)
+        else:
+            model.Add(sum(lesson_vars) <= capacity)
+
+def add_implied_bounds(model: cp_model.CpModel, instance: ProblemInstance, teacher_slot_vars: dict, room_slot_vars: dict,
+                       room_slot_capacity: np.ndarray) -> None:
+    # Redundant with the constraints above, but stated over whole days and slots they propagate earlier:
+    # - a teacher teaches at most as many lessons on a day as they have slots with a possible lesson
+    # - a slot holds at most as many lessons as there are teachers available and free rooms (pool capacity)
+    for t in range(len(instance.teacher_names)):
+        for day_slots in instance.day_slots:
+            cells = [teacher_slot_vars[(t, slot)] for slot in day_slots if teacher_slot_vars.get((t, slot))]
+            lesson_vars = [var for cell in cells for var in cell]
+            if len(lesson_vars) > len(cells) > 0:
+                model.Add(cp_model.LinearExpr.Sum(lesson_vars) <= len(cells))
+
+    slot_vars = {}
+    teachers = {}
+    rooms = {}
+    for (t, slot), lesson_vars in teacher_slot_vars.items():
+        slot_vars.setdefault(slot, []).extend(lesson_vars)
+        teachers[slot] = teachers.get(slot, 0) + 1
+    for (room, slot), lesson_vars in room_slot_vars.items():
+        rooms[slot] = rooms.get(slot, 0) + int(room_slot_capacity[room, slot])
+    for slot, lesson_vars in slot_vars.items():
+        bound = min(teachers[slot], rooms.get(slot, 0))
+        if len(lesson_vars) > bound:
+            model.Add(cp_model.LinearExpr.Sum(lesson_vars) <= bound)
@@ -0,0 +1,170 @@
+import numpy as np
+
+from datastructure import *
+
+class ProblemInstance:
+    # Compiled, integer-indexed view of the input data that the model builder works on.
+    # Teachers, classes, subjects, slots and rooms get dense IDs (their position in the lists below),
+    # every lookup the model needs is a table or boolean matrix indexed by those IDs.
+    teacher_names: list[str]
+    class_names: list[str]
+    class_years: list[tuple[Level, int]] # class -> year group (level, grade)
+    subject_names: list[str]
+    room_numbers: list[int]
+    slots: list[tuple[HourType, Days, datetime.time, datetime.time]] # Lesson slots only, in common.hours order
+    days: list[Days]
+    specialties: list[ClassroomSpecialties]
+
+    teacher_ids: dict[str, int]
+    class_ids: dict[str, int]
+    subject_ids: dict[str, int]
+    room_ids: dict[int, int]
+
+    slot_day: np.ndarray # slot -> day ID
+    slot_lesson_index: np.ndarray # slot -> 0-based lesson index within its day
+    day_slots: list[list[int]] # day ID -> slots of that day, in order
+    slot_segment: np.ndarray # slot -> ID of its run of consecutive lesson slots; a recess or a new day starts a new run
+
+    required_hours: np.ndarray # subject -> required hours per class
+    block_length: np.ndarray # subject -> lesson length in slots: a lesson of length k takes k consecutive slots of one run
+    teacher_subject: np.ndarray # bool[teacher, subject]: teacher is qualified for subject
+    teacher_slot: np.ndarray # bool[teacher, slot]: teacher is available in slot
+    class_subject: np.ndarray # bool[class, subject]: subject is a core subject of class
+    room_specialty: np.ndarray # bool[room, specialty]
+    room_capacity: np.ndarray # room -> capacity
+    room_slot_blocked: np.ndarray # bool[room, slot]: room is reserved by a fixed hour
+    class_size: np.ndarray # class -> number of students, 0 when unknown
+    subject_specialty: np.ndarray # bool[subject, specialty]: subject needs a room with the specialty
+    room_compatible: np.ndarray # bool[class, subject, room]: room has every specialty of the subject and fits the class
+
+    fixed_hours: list[tuple[FixedHourDataStructure, int, int]] # (fixed hour, slot or -1 when it matches no slot, classroom number)
+
+    def __init__(self):
+        self.teacher_names = []
+        self.class_names = []
+        self.class_years = []
+        self.subject_names = []
+        self.room_numbers = []
+        self.slots = []
+        self.days = list(Days)
+        self.specialties = list(ClassroomSpecialties)
+        self.fixed_hours = []
+
+    @property
+    def teacher_slots(self) -> list[np.ndarray]:
+        # teacher -> slots the teacher is available in
+        return [np.flatnonzero(row) for row in self.teacher_slot]
+
+    @property
+    def subject_teachers(self) -> list[np.ndarray]:
+        # subject -> teachers qualified for it
+        return [np.flatnonzero(column) for column in self.teacher_subject.T]
+
+    def block_starts(self, length: int) -> np.ndarray:
+        # bool[slot]: a lesson of length slots that starts in slot stays within one run, so it never crosses a recess or a day
+        starts = np.zeros(len(self.slots), dtype=bool)
+        if 0 < length <= len(self.slots):
+            last = np.arange(len(self.slots) - length + 1) + length - 1
+            starts[:len(last)] = self.slot_segment[:len(last)] == self.slot_segment[last]
+        return starts
+
+    def slot_name(self, slot: int) -> tuple[str, int]:
+        return self.days[self.slot_day[slot]].value, int(self.slot_lesson_index[slot])
+
+def compile_instance(teachers: list[TeachersDataStructure], classes: list[ClassDataStructure], subjects: list[SubjectDataStructure],
+                     classrooms: list[ClassroomDataStructure], fixed_hours: list[FixedHourDataStructure], common: CommonDataStructure) -> ProblemInstance:
+    instance = ProblemInstance()
+
+    instance.teacher_names = [t.name for t in teachers]
+    instance.class_names = [c.name for c in classes]
+    instance.class_years = [(c.year[0], c.year[1]) for c in classes]
+    instance.subject_names = [s.name for s in subjects]
+    instance.room_numbers = [cr.number for cr in classrooms]
+    instance.teacher_ids = {name: i for i, name in enumerate(instance.teacher_names)}
+    instance.class_ids = {name: i for i, name in enumerate(instance.class_names)}
+    instance.subject_ids = {name: i for i, name in enumerate(instance.subject_names)}
+    instance.room_ids = {number: i for i, number in enumerate(instance.room_numbers)}
+
+    # Only use lesson slots
+    instance.slots = [t for t in common.hours if t[0] == HourType.LESSON]
+    # Runs of lesson slots without a recess in between, in common.hours order
+    segments = []
+    segment = -1
+    previous_day = None # Day of the previous hour when it was a lesson
+    for hour in common.hours:
+        if hour[0] != HourType.LESSON:
+            previous_day = None
+            continue
+        if hour[1] != previous_day:
+            segment += 1
+        segments.append(segment)
+        previous_day = hour[1]
+    instance.slot_segment = np.array(segments, dtype=np.int32)
+    day_ids = {day: i for i, day in enumerate(instance.days)}
+    instance.day_slots = [[] for _ in instance.days]
+    instance.slot_day = np.zeros(len(instance.slots), dtype=np.int32)
+    instance.slot_lesson_index = np.zeros(len(instance.slots), dtype=np.int32)
+    for slot, time in enumerate(instance.slots):
+        day = day_ids[time[1]]
+        instance.slot_day[slot] = day
+        instance.slot_lesson_index[slot] = len(instance.day_slots[day])
+        instance.day_slots[day].append(slot)
+
+    instance.required_hours = np.array([s.requiredHours for s in subjects], dtype=np.int32)
+    instance.block_length = np.array([s.blockLength for s in subjects], dtype=np.int32)
+
+    instance.teacher_subject = np.zeros((len(teachers), len(subjects)), dtype=bool)
+    instance.teacher_slot = np.zeros((len(teachers), len(instance.slots)), dtype=bool)
+    for t, teacher in enumerate(teachers):
+        for subject in teacher.subjects:
+            if subject in instance.subject_ids:
+                instance.teacher_subject[t, instance.subject_ids[subject]] = True
+        for day, day_slots in zip(instance.days, instance.day_slots):
+            if day.value not in teacher.availability:
+                # Teacher not available at all on this day
+                continue
+            available_hours = teacher.availability[day.value]
+            if not isinstance(available_hours, list):
+                available_hours = [available_hours]
+            for hour in available_hours:
+                # Availability is given as 1-based lesson numbers per day
+                if 1 <= hour <= len(day_slots):
+                    instance.teacher_slot[t, day_slots[hour - 1]] = True
+
+    instance.class_subject = np.zeros((len(classes), len(subjects)), dtype=bool)
+    for c, class_obj in enumerate(classes):
+        for subject in class_obj.coreSubjects:
+            if subject in instance.subject_ids:
+                instance.class_subject[c, instance.subject_ids[subject]] = True
+
+    specialty_ids = {specialty: i for i, specialty in enumerate(instance.specialties)}
+    instance.room_specialty = np.zeros((len(classrooms), len(instance.specialties)), dtype=bool)
+    instance.room_capacity = np.array([cr.capacity for cr in classrooms], dtype=np.int32)
+    for r, classroom in enumerate(classrooms):
+        for specialty in classroom.specialties:
+            instance.room_specialty[r, specialty_ids[specialty]] = True
+
+    # Compatibility index: a subject can only be taught in rooms with all of its required specialties,
+    # and a class only fits in rooms with enough capacity
+    instance.subject_specialty = np.zeros((len(subjects), len(instance.specialties)), dtype=bool)
+    for s, subject in enumerate(subjects):
+        for specialty in subject.requiredClassroomParameters:
+            instance.subject_specialty[s, specialty_ids[ClassroomSpecialties.parse(specialty)]] = True
+    instance.class_size = np.array([c.size for c in classes], dtype=np.int32)
+    # subject_room[s, r]: no required specialty of s is missing in r
+    subject_room = ~(instance.subject_specialty[:, None, :] & ~instance.room_specialty[None, :, :]).any(axis=2)
+    class_room = instance.class_size[:, None] <= instance.room_capacity[None, :]
+    instance.room_compatible = class_room[:, None, :] & subject_room[None, :, :]
+
+    # Fixed Hours: reserve specific classrooms at specific time slots for fixed activities
+    instance.room_slot_blocked = np.zeros((len(classrooms), len(instance.slots)), dtype=bool)
+    for fixed_hour in fixed_hours:
+        day_slots = instance.day_slots[day_ids[Days[fixed_hour.day.upper()]]]
+        fixed_lesson_index = fixed_hour.hour - 1  # Convert 1-based to 0-based index
+        slot = day_slots[fixed_lesson_index] if 0 <= fixed_lesson_index < len(day_slots) else -1
+        fixed_classroom = int(fixed_hour.classroomID) if isinstance(fixed_hour.classroomID, str) else fixed_hour.classroomID
+        if slot >= 0 and fixed_classroom in instance.room_ids:
+            instance.room_slot_blocked[instance.room_ids[fixed_classroom], slot] = True
+        instance.fixed_hours.append((fixed_hour, slot, fixed_classroom))
+
+    return instance
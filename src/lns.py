@@ -0,0 +1,157 @@
+import time
+import random
+
+import numpy as np
+
+from ortools.sat.python import cp_model
+
+from datastructure import *
+from portfolio import SolveResult
+
+class LNSDriver:
+    # Large Neighbourhood Search around the model of a Run: starting from a feasible schedule it repeatedly
+    # frees the lesson variables of one neighbourhood (a day, a year group, a teacher or a room cluster), fixes
+    # all other lesson variables to their current value and re-solves that sub-problem for at most step_time
+    # seconds. Schedules that are at least as good are kept, until time_budget seconds have passed.
+    def __init__(self, run, time_budget: float, step_time: float, seed: int = 0):
+        self.run = run
+        self.time_budget = time_budget
+        self.step_time = step_time
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.solver = None
+        self.stopped = False
+        self.history = [] # (neighbourhood, objective after the step, accepted)
+
+    def stop(self) -> None:
+        self.stopped = True
+        if self.solver is not None:
+            self.solver.StopSearch()
+
+    def room_clusters(self) -> dict:
+        # Rooms (or room pools) with the same specialties, by specialties
+        run, instance = self.run, self.run.instance
+        clusters = {}
+        if run.room_pools is not None:
+            for p, pool in enumerate(run.room_pools):
+                clusters.setdefault(pool.specialties, []).append(p)
+        else:
+            for room in range(len(instance.room_numbers)):
+                specialties = frozenset(s for s, has in zip(instance.specialties, instance.room_specialty[room]) if has)
+                clusters.setdefault(specialties, []).append(room)
+        return clusters
+
+    def neighbourhoods(self) -> dict[str, list[tuple[str, np.ndarray]]]:
+        # Neighbourhood kind -> (name, mask over the lesson variables it frees); masks that free nothing are left out
+        keys, instance = self.run.lesson_keys, self.run.instance
+        kinds = {"day": [], "year": [], "teacher": [], "rooms": []}
+
+        slot_day = instance.slot_day[keys[:, 3]]
+        for d, day in enumerate(instance.days):
+            kinds["day"].append((f'day {day.value}', slot_day == d))
+        years = {}
+        for c, year in enumerate(instance.class_years):
+            years.setdefault(year, []).append(c)
+        # In elective mode a year also frees the elective groups (class IDs from len(class_names)) with students of its classes
+        electives = self.run.electives
+        for (level, grade), classes in years.items():
+            groups = [len(instance.class_names) + g for g, group in enumerate(electives.groups) if group.classes & set(classes)] if electives is not None else []
+            kinds["year"].append((f'year {level.value} {grade}', np.isin(keys[:, 0], classes + groups)))
+        for t, name in enumerate(instance.teacher_names):
+            kinds["teacher"].append((f'teacher {name}', keys[:, 2] == t))
+        for specialties, rooms in self.room_clusters().items():
+            name = "-".join(sorted(s.value for s in specialties)) or "general"
+            kinds["rooms"].append((f'rooms {name}', np.isin(keys[:, 4], rooms)))
+
+        return {kind: [(name, mask) for name, mask in masks if mask.any()] for kind, masks in kinds.items() if any(mask.any() for _, mask in masks)}
+
+    def new_solver(self, time_limit: float, seed: int) -> cp_model.CpSolver:
+        solver = cp_model.CpSolver()
+        self.run.parameters.apply(solver, self.run.common.generationType)
+        solver.parameters.max_time_in_seconds = max(0.01, time_limit)
+        solver.parameters.random_seed = seed
+        return solver
+
+    def initial_solution(self, time_limit: float):
+        # The first feasible schedule, searched without the objective, which is much easier on large instances
+        # (warm-start hints, if any, are used). Its objective comes from a re-solve with every lesson fixed.
+        class FirstSolution(cp_model.CpSolverSolutionCallback):
+            def on_solution_callback(callback) -> None:
+                callback.StopSearch()
+        model = self.run.model.Clone()
+        model.ClearObjective()
+        self.solver = self.new_solver(time_limit, self.seed)
+        status = self.solver.Solve(model, FirstSolution())
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            return status, None, None
+        solution = np.asarray(self.solver.ResponseProto().solution, dtype=np.int64)
+        if not self.run.model.HasObjective():
+            return status, solution, None
+        return self.solve_neighbourhood(np.zeros(len(self.run.lesson_keys), dtype=bool), solution, time_limit, self.seed)
+
+    def solve_neighbourhood(self, free: np.ndarray, solution: np.ndarray, time_limit: float, seed: int):
+        # Fixes every lesson variable outside free through its domain, so presolve removes them, and
+        # hints the current schedule so the sub-solve starts from a feasible solution
+        run = self.run
+        model = run.model.Clone()
+        model.ClearHints()
+        proto = model.Proto()
+        variables = proto.variables
+        fixed = run.lesson_var_index[~free]
+        for index, value in zip(fixed.tolist(), solution[fixed].tolist()):
+            domain = variables[index].domain
+            domain[0] = value
+            domain[1] = value
+        proto.solution_hint.vars.extend(range(len(solution)))
+        proto.solution_hint.values.extend(solution.tolist())
+
+        self.solver = self.new_solver(time_limit, seed)
+        status = self.solver.Solve(model)
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            return status, None, None
+        return status, np.asarray(self.solver.ResponseProto().solution, dtype=np.int64), self.solver.ObjectiveValue()
+
+    def solve(self, on_solution=None) -> SolveResult:
+        # on_solution(event) is called for the initial and every improved schedule, the search stops when it returns True
+        start = time.perf_counter()
+        result = SolveResult()
+        status, solution, objective = self.initial_solution(self.time_budget)
+        result.status, result.status_name = status, self.solver.StatusName(status)
+        if solution is None or objective is None:
+            result.solution = solution
+            result.wall_time = time.perf_counter() - start
+            return result
+
+        def improved() -> bool:
+            event = {"solution": solution, "objective": objective, "best_bound": None, "wall_time": time.perf_counter() - start}
+            return on_solution is not None and on_solution(event)
+        if improved():
+            self.stopped = True
+
+        neighbourhoods = self.neighbourhoods()
+        kinds = sorted(neighbourhoods)
+        step = 0
+        # Without a lower bound the search only ends early at an objective of 0, the minimum of every generation type
+        while not self.stopped and objective > 0:
+            remaining = self.time_budget - (time.perf_counter() - start)
+            if remaining <= 0:
+                break
+            # Cycle through the kinds, pick a random neighbourhood of each
+            name, free = self.random.choice(neighbourhoods[kinds[step % len(kinds)]])
+            step += 1
+            _, candidate, candidate_objective = self.solve_neighbourhood(free, solution, min(self.step_time, remaining), self.seed + step)
+            accepted = candidate is not None and candidate_objective <= objective
+            self.history.append((name, candidate_objective, accepted))
+            if not accepted:
+                continue
+            better = candidate_objective < objective
+            solution, objective = candidate, candidate_objective
+            if better and improved():
+                self.stopped = True
+
+        result.status = cp_model.OPTIMAL if objective == 0 else cp_model.FEASIBLE
+        result.status_name = "OPTIMAL" if objective == 0 else "FEASIBLE"
+        result.solution = solution
+        result.objective = objective
+        result.wall_time = time.perf_counter() - start
+        return result
@@ -0,0 +1,203 @@
+import os
+import json
+import pickle
+import hashlib
+import tempfile
+
+from datastructure import *
+
+snapshotFolder = os.path.join(dataFolder, "cache", "snapshots")
+
+# Bump when the data structures change, so snapshots pickled by an older version are not reused
+SNAPSHOT_VERSION = 1
+
+class DataError(ValueError):
+    # Malformed input, the message starts with the path of the offending value, e.g. teachers.json[3].subjects[0]
+    pass
+
+# Validators: check(value, path) raises a DataError when value is malformed
+
+def of_type(*types, name: str | None = None):
+    def check(value, path: str) -> None:
+        # bool is a subclass of int, but true is not a number of hours
+        if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+            raise DataError(f"{path}: expected {name or ' or '.join(t.__name__ for t in types)}, got {json.dumps(value)}")
+    return check
+
+def list_of(item_check):
+    is_list = of_type(list, name="a list")
+    def check(value, path: str) -> None:
+        is_list(value, path)
+        for i, item in enumerate(value):
+            item_check(item, f"{path}[{i}]")
+    return check
+
+def tuple_of(*item_checks):
+    def check(value, path: str) -> None:
+        if not isinstance(value, list) or len(value) != len(item_checks):
+            raise DataError(f"{path}: expected a list of {len(item_checks)} values, got {json.dumps(value)}")
+        for i, (item, item_check) in enumerate(zip(value, item_checks)):
+            item_check(item, f"{path}[{i}]")
+    return check
+
+def one_of(enum: type[Enum]):
+    # Enum members are matched by name, case-insensitive, like the from_dict methods do
+    def check(value, path: str) -> None:
+        if not isinstance(value, str) or value.upper() not in enum.__members__:
+            raise DataError(f"{path}: expected one of {', '.join(member.value for member in enum)}, got {json.dumps(value)}")
+    return check
+
+def time_string(value, path: str) -> None:
+    try:
+        parse_time(value)
+    except (TypeError, ValueError):
+        raise DataError(f"{path}: expected a time like \"08:30\", got {json.dumps(value)}") from None
+
+def availability(value, path: str) -> None:
+    of_type(dict, name="an object")(value, path)
+    hours = of_type(int, name="a lesson number")
+    for day, day_hours in value.items():
+        one_of(Days)(day, f"{path}.{day}")
+        if isinstance(day_hours, list):
+            list_of(hours)(day_hours, f"{path}.{day}")
+        else:
+            hours(day_hours, f"{path}.{day}")
+
+string = of_type(str, name="a string")
+integer = of_type(int, name="an integer")
+boolean = of_type(bool, name="true or false")
+
+# Per input file: the record structure and the validators of its fields. A missing field takes the
+# default of the data structure, fields that are not listed are ignored.
+SCHEMAS = {
+    "teachers.json": (TeachersDataStructure, {"name": string, "abbreviation": string, "availability": availability, "subjects": list_of(string)}),
+    "classes.json": (ClassDataStructure, {"name": string, "year": tuple_of(one_of(Level), integer, integer), "tutor": string,
+                                          "coreSubjects": list_of(string), "size": integer}),
+    "subjects.json": (SubjectDataStructure, {"name": string, "abbreviation": string, "requiredHours": integer, "coreSubject": boolean,
+                                             "requiredClassroomsParameters": list_of(one_of(ClassroomSpecialties)),
+                                             "requiredClassroomParameters": list_of(one_of(ClassroomSpecialties)), "blockLength": integer}),
+    "classrooms.json": (ClassroomDataStructure, {"number": integer, "capacity": integer, "specialties": list_of(one_of(ClassroomSpecialties))}),
+    "fixed_hours.json": (FixedHourDataStructure, {"day": one_of(Days), "hour": integer, "classroomID": of_type(int, str, name="a room number"), "name": string}),
+    "students.json": (StudentDataStructure, {"name": string, "className": string, "profile": one_of(Profile), "studentNumber": string,
+                                             "preferredOddHours": list_of(integer), "subjects": list_of(string)}),
+    "common.json": (CommonDataStructure, {"hours": list_of(tuple_of(one_of(HourType), one_of(Days), time_string, time_string)),
+                                          "preferredOddHoursEnabled": boolean, "generationType": one_of(Type), "solver": of_type(dict, name="an object")}),
+}
+
+# The files of a school, in the order of SchoolData
+DATA_FILES = ["teachers.json", "classes.json", "subjects.json", "classrooms.json", "fixed_hours.json", "common.json"]
+
+# Settings profiles exported by the settings page (e.g. dalton_voorbeeld.json) hold the files of a school under
+# "data", by these keys; fixedHours may be left out
+PROFILE_KEYS = {"teachers.json": "teachers", "classes.json": "classes", "subjects.json": "subjects",
+                "classrooms.json": "classrooms", "fixed_hours.json": "fixedHours", "common.json": "common"}
+
+class SchoolData:
+    __slots__ = ("teachers", "classes", "subjects", "classrooms", "fixed_hours", "common")
+    teachers: list[TeachersDataStructure]
+    classes: list[ClassDataStructure]
+    subjects: list[SubjectDataStructure]
+    classrooms: list[ClassroomDataStructure]
+    fixed_hours: list[FixedHourDataStructure]
+    common: CommonDataStructure
+
+def read_json(file_path: str, name: str):
+    try:
+        with open(file_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        raise DataError(f"{name}: file not found ({file_path})") from None
+    except json.JSONDecodeError as e:
+        raise DataError(f"{name}:{e.lineno}:{e.colno}: invalid JSON, {e.msg}") from None
+
+def parse_record(structure, fields: dict, data, path: str):
+    of_type(dict, name="an object")(data, path)
+    for field, check in fields.items():
+        if field in data:
+            check(data[field], f"{path}.{field}")
+    record = structure()
+    try:
+        record.from_dict(data)
+    except (KeyError, ValueError, TypeError, AttributeError, IndexError) as e:
+        raise DataError(f"{path}: {type(e).__name__}: {e}") from None
+    return record
+
+def parse_file(data, name: str, schema: str):
+    # The validated records of one file: a list of records, or one record for common.json
+    structure, fields = SCHEMAS[schema]
+    if structure is CommonDataStructure:
+        return parse_record(structure, fields, data, name)
+    of_type(list, name="a list")(data, name)
+    return [parse_record(structure, fields, item, f"{name}[{i}]") for i, item in enumerate(data)]
+
+def load_file(file_path: str, schema: str | None = None):
+    # schema: the SCHEMAS entry to validate against, by default the one of the file name
+    name = os.path.basename(file_path)
+    return parse_file(read_json(file_path, name), name, schema or name)
+
+def profile_data(data: dict, name: str) -> dict:
+    # The validated input files in the "data" of a settings profile (or a job submitted to the solver service), by file name
+    of_type(dict, name="an object")(data, name)
+    files = {}
+    for file_name, key in PROFILE_KEYS.items():
+        if key not in data and key != "fixedHours":
+            raise DataError(f'{name}: missing "{key}"')
+        files[file_name] = data.get(key, [])
+        parse_file(files[file_name], f'{name}.{key}', file_name)
+    return files
+
+def load_profile(file_path: str) -> dict:
+    # The validated input files of a settings profile, by file name, as they would be saved to data/
+    name = os.path.basename(file_path)
+    profile = read_json(file_path, name)
+    of_type(dict, name="an object")(profile, name)
+    return profile_data(profile.get("data", profile), f'{name}.data')
+
+def snapshot_key(paths: list[str]) -> str:
+    # Hash of the contents of the input files: job workspaces with identical inputs share one snapshot
+    digest = hashlib.sha256(f"version {SNAPSHOT_VERSION}".encode("utf-8"))
+    for path in paths:
+        with open(path, "rb") as file:
+            digest.update(hashlib.sha256(file.read()).digest())
+    return digest.hexdigest()
+
+def load_snapshot(snapshot_path: str):
+    try:
+        with open(snapshot_path, "rb") as file:
+            data = pickle.load(file)
+        # The modification time is the "last used" time for the LRU eviction of ScheduleCache
+        os.utime(snapshot_path)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    return data
+
+def store_snapshot(snapshot_path: str, data: SchoolData) -> None:
+    os.makedirs(os.path.dirname(snapshot_path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(snapshot_path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as file:
+        pickle.dump(data, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, snapshot_path)
+
+def load_data(data_folder: str = dataFolder, snapshot: bool = True, snapshot_folder: str | None = None) -> SchoolData:
+    # Reads and validates the six input files of data_folder once. With snapshot, the parsed data is pickled to
+    # snapshot_folder (default data/cache/snapshots) under the hash of the file contents and reused for the same files.
+    paths = [os.path.join(data_folder, name) for name in DATA_FILES]
+    snapshot_path = None
+    if snapshot:
+        try:
+            snapshot_path = os.path.join(snapshot_folder or snapshotFolder, snapshot_key(paths) + ".pickle")
+        except OSError:
+            pass # A missing file is reported by load_file below
+    if snapshot_path is not None:
+        data = load_snapshot(snapshot_path)
+        if data is not None:
+            return data
+
+    data = SchoolData()
+    data.teachers, data.classes, data.subjects, data.classrooms, data.fixed_hours, data.common = (load_file(path) for path in paths)
+    if snapshot_path is not None:
+        try:
+            store_snapshot(snapshot_path, data)
+        except OSError:
+            pass # A read-only data folder only costs the snapshot
+    return data
@@ -0,0 +1,132 @@
+import os
+import re
+import math
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None # Windows: no peak memory
+
+from ortools.sat.python import cp_model
+
+# One event of the CP-SAT search log, e.g. "#3       2.41s best:17    next:[4,16]     quick_restart (fixed_bools=0/45411)"
+SEARCH_EVENT = re.compile(r'^#(\d+|Bound|Done|Model)\s+([\d.]+)s(?:\s+best:(\S+)\s+next:\[([^,\]]*),?([^\]]*)\])?\s*(.*)$')
+PRESOLVE_START = re.compile(r'^Starting presolve at ([\d.]+)s')
+SEARCH_START = re.compile(r'^Starting search at ([\d.]+)s')
+
+def metrics_file(output_file: str) -> str:
+    # data/out/generated.json -> data/out/metrics.json
+    return os.path.join(os.path.dirname(output_file), "metrics.json")
+
+def current_rss_mb() -> float | None:
+    # Resident memory of this process now (Linux only)
+    try:
+        with open("/proc/self/statm") as file:
+            pages = int(file.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+
+def process_peak_rss_mb() -> float | None:
+    # High-water mark of the resident memory of the whole process since it started: in the solver service it
+    # includes every earlier and concurrent job, so it is no measure of one run
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def log_number(value: str) -> float | None:
+    try:
+        number = float(value)
+    except ValueError:
+        return None # An empty bound
+    return number if math.isfinite(number) else None
+
+def parse_search_log(lines: list[str]) -> dict:
+    # Presolve and search times, the objective / bound timeline and the number of solutions of a CP-SAT log
+    search = {"presolve_time": None, "search_time": None, "solutions": 0, "timeline": [], "summary": {}}
+    presolve_start = search_start = None
+    in_summary = False
+    # A log message can span several lines
+    for line in (line.strip() for message in lines for line in message.splitlines()):
+        if match := PRESOLVE_START.match(line):
+            presolve_start = float(match.group(1))
+        elif match := SEARCH_START.match(line):
+            search_start = float(match.group(1))
+        elif match := SEARCH_EVENT.match(line):
+            event, wall_time, best, lower, upper, info = match.groups()
+            if event.isdigit():
+                search["solutions"] += 1
+            if best is not None:
+                search["timeline"].append({"event": "solution" if event.isdigit() else event.lower(), "wall_time": float(wall_time),
+                                           "objective": log_number(best), "best_bound": log_number(lower), "info": info or None})
+        elif line == "CpSolverResponse summary:":
+            in_summary = True
+        elif in_summary and ": " in line:
+            name, value = line.split(": ", 1)
+            search["summary"][name] = value
+    if presolve_start is not None and search_start is not None:
+        search["presolve_time"] = round(search_start - presolve_start, 3)
+    if search_start is not None and "walltime" in search["summary"]:
+        search["search_time"] = round(float(search["summary"]["walltime"]) - search_start, 3)
+    return search
+
+class RunMetrics:
+    # Instrumentation of one Run: wall time and resident memory growth per phase, the variables and constraints every
+    # model phase adds and the search statistics, written to data/out/metrics.json next to the schedule
+    def __init__(self):
+        self.phases = []
+        self.log_lines = [] # CP-SAT search log of a single solve
+        self.timeline = [] # Improving solutions of a portfolio or LNS solve
+
+    @contextmanager
+    def phase(self, name: str, model: cp_model.CpModel | None = None):
+        # With model, also counts the variables and constraints added during the phase
+        # The memory of a phase is the resident memory it adds, from before to after the phase. Concurrent jobs of the
+        # solver service share the process, so their phases can still overlap.
+        start = time.perf_counter()
+        rss_before = current_rss_mb()
+        before = (len(model.Proto().variables), len(model.Proto().constraints)) if model is not None else None
+        try:
+            yield
+        finally:
+            rss_after = current_rss_mb()
+            entry = {"name": name, "wall_time": round(time.perf_counter() - start, 4), "rss_mb": rss_after,
+                     "rss_added_mb": round(rss_after - rss_before, 1) if rss_after is not None and rss_before is not None else None}
+            if model is not None:
+                entry["variables"] = len(model.Proto().variables) - before[0]
+                entry["constraints"] = len(model.Proto().constraints) - before[1]
+            self.phases.append(entry)
+
+    def capture_log(self, solver: cp_model.CpSolver) -> None:
+        # The search log goes to log_lines instead of stdout
+        self.log_lines = []
+        solver.parameters.log_search_progress = True
+        solver.parameters.log_to_stdout = False
+        solver.log_callback = self.log_lines.append
+
+    def solution(self, event: dict) -> None:
+        self.timeline.append({"event": "solution", "wall_time": round(event["wall_time"], 3), "objective": event["objective"],
+                              "best_bound": event["best_bound"], "info": f'portfolio search {event["worker"] + 1}' if "worker" in event else None})
+
+    def to_dict(self, run) -> dict:
+        if self.log_lines:
+            search = parse_search_log(self.log_lines)
+        else:
+            search = {"presolve_time": None, "search_time": None, "solutions": len(self.timeline), "timeline": self.timeline, "summary": {}}
+        model = run.model.Proto()
+        return {
+            "status": getattr(run, "status_name", None),
+            "objective": getattr(run, "objective_value", None),
+            "best_bound": getattr(run, "best_bound", None),
+            "total_time": round(sum(phase["wall_time"] for phase in self.phases), 4),
+            "rss_added_mb": round(sum(phase["rss_added_mb"] for phase in self.phases), 1) if all(phase["rss_added_mb"] is not None for phase in self.phases) else None,
+            "process_peak_rss_mb": process_peak_rss_mb(),
+            "model": {"variables": len(model.variables), "constraints": len(model.constraints)},
+            "phases": self.phases,
+            "search": search,
+        }
@@ -0,0 +1,85 @@
+from ortools.sat.python import cp_model
+
+from datastructure import *
+from instance import ProblemInstance
+
+class DaySpan:
+    # Linear-size encoding of one class's or teacher's day. For the slots of the day that can hold a lesson:
+    # - has[i] is 1 when there is a lesson in the slot at position i of the day
+    # - start <= first lesson, end >= last lesson and, when the day has any lesson, span >= end - start + 1
+    # Each of them is bounded from one side only, minimising span, end or -start makes the bound tight,
+    # so idle = span - count is the number of free slots between the first and the last lesson.
+    def __init__(self, model: cp_model.CpModel, positions: list[tuple[int, list]], day_length: int, name: str):
+        self.day_length = day_length
+        self.has = []
+        for i, lesson_vars in positions:
+            if len(lesson_vars) == 1:
+                has = lesson_vars[0]
+            else:
+                # At most one of lesson_vars is 1, see the class / teacher constraints in Run.build_model
+                has = model.NewBoolVar(f'has_{name}_{i}')
+                model.Add(has == cp_model.LinearExpr.Sum(lesson_vars))
+            self.has.append((i, has))
+
+        self.any = model.NewBoolVar(f'any_{name}')
+        self.start = model.NewIntVar(0, day_length - 1, f'start_{name}')
+        self.end = model.NewIntVar(0, day_length - 1, f'end_{name}')
+        self.span = model.NewIntVar(0, day_length, f'span_{name}')
+        for i, has in self.has:
+            model.AddImplication(has, self.any)
+            model.Add(self.start <= i).OnlyEnforceIf(has)
+            model.Add(self.end >= i).OnlyEnforceIf(has)
+        model.AddBoolOr([has for _, has in self.has]).OnlyEnforceIf(self.any)
+        model.Add(self.span >= self.end - self.start + 1).OnlyEnforceIf(self.any)
+        model.Add(self.span == 0).OnlyEnforceIf(self.any.Not())
+        # Redundant, but keeps the LP relaxation from counting negative idle hours
+        model.Add(self.span >= self.count)
+
+    @property
+    def count(self):
+        return cp_model.LinearExpr.Sum([has for _, has in self.has])
+
+    @property
+    def idle(self):
+        return self.span - self.count
+
+def day_spans(model: cp_model.CpModel, instance: ProblemInstance, slot_vars: dict, entities: int, name: str, min_positions: int = 1) -> list[DaySpan]:
+    # One DaySpan per (entity, day) with at least min_positions slots that can hold a lesson of the entity;
+    # slot_vars[(entity, slot)] are the lesson variables of the entity in that slot
+    spans = []
+    for e in range(entities):
+        for day, day_slots in zip(instance.days, instance.day_slots):
+            positions = [(i, slot_vars[(e, slot)]) for i, slot in enumerate(day_slots) if slot_vars.get((e, slot))]
+            if len(positions) >= min_positions:
+                spans.append(DaySpan(model, positions, len(day_slots), f'{name}_{e}_{day.value}'))
+    return spans
+
+def daily_load_spread(model: cp_model.CpModel, instance: ProblemInstance, class_slot_vars: dict) -> list:
+    # Per class: the difference between its busiest and its quietest day (of the days that have lesson slots)
+    terms = []
+    days = [day_slots for day_slots in instance.day_slots if day_slots]
+    for c in range(len(instance.class_names)):
+        loads = [cp_model.LinearExpr.Sum([var for slot in day_slots for var in class_slot_vars.get((c, slot), [])]) for day_slots in days]
+        most = model.NewIntVar(0, max(map(len, days), default=0), f'max_load_{c}')
+        least = model.NewIntVar(0, max(map(len, days), default=0), f'min_load_{c}')
+        for load in loads:
+            model.Add(most >= load)
+            model.Add(least <= load)
+        terms.append(most - least)
+    return terms
+
+def objective_terms(model: cp_model.CpModel, instance: ProblemInstance, generation_type: Type, class_slot_vars: dict, teacher_slot_vars: dict) -> list:
+    # Terms of the objective of a generation type, to be minimised together
+    if generation_type == Type.LEAST_ODD_HOURS_STUDENTS:
+        # Idle hours can only occur on days with at least three possible lesson slots
+        return [span.idle for span in day_spans(model, instance, class_slot_vars, len(instance.class_names), 'class', 3)]
+    if generation_type == Type.LEAST_ODD_HOURS_TEACHERS:
+        return [span.idle for span in day_spans(model, instance, teacher_slot_vars, len(instance.teacher_names), 'teacher', 3)]
+    if generation_type == Type.EARLY_START_EARLY_END:
+        # Finish every class's day as early as possible, without idle hours in between
+        return [span.end + span.idle for span in day_spans(model, instance, class_slot_vars, len(instance.class_names), 'class')]
+    if generation_type == Type.LATE_START_LATE_END:
+        return [(span.day_length - 1 - span.start) + span.idle for span in day_spans(model, instance, class_slot_vars, len(instance.class_names), 'class')]
+    if generation_type == Type.BALANCED:
+        return daily_load_spread(model, instance, class_slot_vars)
+    return []
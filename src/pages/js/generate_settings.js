@@ -82,6 +82,10 @@ function addSubject() {
                 <label>Required Hours per Week:</label>
                 <input type="number" id="subject-hours-${index}" min="1" max="10" value="2" required>
             </div>
+            <div class="form-group">
+                <label>Lesson Length (periods):</label>
+                <input type="number" id="subject-block-${index}" min="1" max="4" value="1" required>
+            </div>
             <div class="form-group">
                 <label>
                     <input type="checkbox" id="subject-core-${index}"> Core Subject
@@ -416,6 +420,7 @@ function collectFormData() {
         const abbreviation = document.getElementById(`subject-abbr-${index}`).value;
         const requiredHours = parseInt(document.getElementById(`subject-hours-${index}`).value);
         const coreSubject = document.getElementById(`subject-core-${index}`).checked;
+        const blockLength = parseInt(document.getElementById(`subject-block-${index}`).value) || 1;
         
         if (name && abbreviation) {
             subjects.push({
@@ -423,7 +428,8 @@ function collectFormData() {
                 abbreviation,
                 requiredHours,
                 coreSubject,
-                requiredClassroomsParameters: []
+                requiredClassroomsParameters: [],
+                blockLength
             });
         }
     });
@@ -614,14 +620,17 @@ async function generateSchedule() {
         
         statusDiv.innerHTML = '<div class="status-info">Running schedule generator...</div>';
         
-        // Run the Python script
-        await runPythonScript();
+        // Run the generator on the solver service, or spawn the Python script when the service is not running
+        const jobId = await runScheduleJob(statusDiv, data);
+        if (!jobId) {
+            await runPythonScript();
+        }
         
         statusDiv.innerHTML = '<div class="status-success">✅ Schedule generated successfully!</div>';
         
-        // Redirect to generated schedule page after a delay
+        // Redirect to generated schedule page after a delay, the schedule of this job rather than the latest one in data/out
         setTimeout(() => {
-            window.location.href = 'schedule';
+            window.location.href = jobId ? `schedule?job=${encodeURIComponent(jobId)}` : 'schedule';
         }, 1000);
         
     } catch (error) {
@@ -673,6 +682,57 @@ async function saveJSONFiles(data) {
     }
 }
 
+// Run the schedule generator as a job on the solver service, on its own copy of the settings.
+// Returns the job ID, or null when the service is not running, so the caller can fall back to runPythonScript.
+async function runScheduleJob(statusDiv, data) {
+    const submitResponse = await fetch('/api/jobs', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            options: {},
+            inputs: {
+                subjects: data.subjects,
+                teachers: data.teachers,
+                classrooms: data.classrooms,
+                classes: data.classes,
+                common: data.common,
+                fixedHours: data.fixedHours
+            }
+        })
+    });
+    if (submitResponse.status === 503) {
+        return null;
+    }
+    const submitted = await submitResponse.json();
+    if (!submitted.success) {
+        throw new Error(submitted.error || 'Failed to submit schedule generation job');
+    }
+
+    // Poll until the job has finished
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        const statusResponse = await fetch(`/api/jobs/${submitted.job_id}`);
+        const job = await statusResponse.json();
+        if (!job.success) {
+            throw new Error(job.error || 'Failed to get job status');
+        }
+        if (job.status === 'queued' || job.status === 'running') {
+            statusDiv.innerHTML = `<div class="status-info">Running schedule generator... (${job.status})</div>`;
+            continue;
+        }
+        if (job.status === 'failed') {
+            throw new Error(job.error || 'Schedule generation failed');
+        }
+        if (job.status === 'cancelled') {
+            throw new Error('Schedule generation was cancelled');
+        }
+        console.log('Schedule generation job finished:', job);
+        return submitted.job_id;
+    }
+}
+
 // Run Python script through backend API
 async function runPythonScript() {
     try {
@@ -946,6 +1006,7 @@ function loadFormData(data) {
             document.getElementById(`subject-abbr-${index}`).value = subject.abbreviation || '';
             document.getElementById(`subject-hours-${index}`).value = subject.requiredHours || 2;
             document.getElementById(`subject-core-${index}`).checked = subject.coreSubject || false;
+            document.getElementById(`subject-block-${index}`).value = subject.blockLength || 1;
         });
     }
     
@@ -1,28 +1,54 @@
 // Global variables to make data accessible to import/export functions
 let currentScheduleData = [];
+let scheduleSlices = false; // Classes are fetched one at a time from <scheduleApi>/class/:name
 let lessonTimes = {};
 
+// schedule?job=<id> shows the schedule of that solver service job, otherwise the latest run.py schedule in data/out
+const scheduleJob = new URLSearchParams(window.location.search).get('job');
+const scheduleApi = scheduleJob ? `/api/jobs/${encodeURIComponent(scheduleJob)}/schedule` : '/api/schedule';
+
+// The whole schedule, in the format of generated.json
+async function fetchWholeSchedule() {
+    if (scheduleJob) {
+        const res = await fetch(`/api/jobs/${encodeURIComponent(scheduleJob)}/result`);
+        if (!res.ok) throw new Error(`Failed to fetch schedule: ${res.status} ${res.statusText}`);
+        return (await res.json()).result;
+    }
+    const res = await fetch('/data/out/generated.json');
+    if (!res.ok) throw new Error(`Failed to fetch schedule: ${res.status} ${res.statusText}`);
+    return res.json();
+}
+
 document.addEventListener("DOMContentLoaded", function() {
     const scheduleContent = document.getElementById("schedule-content");
 
     (async function() {
         try {
-            const res = await fetch('/data/out/generated.json');
-            if (!res.ok) throw new Error(`Failed to fetch schedule: ${res.status} ${res.statusText}`);
-            const scheduleData = await res.json();
-            currentScheduleData = scheduleData;
-            if (!Array.isArray(scheduleData)) {
-                console.warn('Expected schedule JSON to be an array:', scheduleData);
-                return;
-            }
-
-            // Query all the classes used in the schedule data (exclude "All Classes" from dropdown)
-            const classSet = new Set();
-            scheduleData.forEach(item => {
-                if (item.class && item.class !== "All Classes") {
-                    classSet.add(item.class);
+            // Prefer the per-class slices of the backend, so a class only downloads its own lessons;
+            // without the backend (or a compact schedule) fall back to the whole schedule
+            let classSet = new Set();
+            let hours = null; // Lesson hours of the settings the job solved
+            const indexRes = await fetch(scheduleApi).catch(() => null);
+            if (indexRes && indexRes.ok) {
+                const scheduleIndex = await indexRes.json();
+                scheduleSlices = true;
+                classSet = new Set(scheduleIndex.classes);
+                hours = scheduleIndex.hours || null;
+            } else {
+                const scheduleData = await fetchWholeSchedule();
+                currentScheduleData = scheduleData;
+                if (!Array.isArray(scheduleData)) {
+                    console.warn('Expected schedule JSON to be an array:', scheduleData);
+                    return;
                 }
-            });
+
+                // Query all the classes used in the schedule data (exclude "All Classes" from dropdown)
+                scheduleData.forEach(item => {
+                    if (item.class && item.class !== "All Classes") {
+                        classSet.add(item.class);
+                    }
+                });
+            }
 
             // Load the queried classes into the <select> element
             const classSelector = document.getElementById("class-selector");
@@ -33,15 +59,17 @@ document.addEventListener("DOMContentLoaded", function() {
                 classSelector.appendChild(option);
             });
 
-            // Load common.json to map lesson_index -> time
+            // Load common.json to map lesson_index -> time, a job brings the hours of its own settings
             try {
-                const commonRes = await fetch('/data/common.json');
-                if (!commonRes.ok) throw new Error(`Failed to fetch common: ${commonRes.status} ${commonRes.statusText}`);
-                const common = await commonRes.json();
+                if (!hours) {
+                    const commonRes = await fetch('/data/common.json');
+                    if (!commonRes.ok) throw new Error(`Failed to fetch common: ${commonRes.status} ${commonRes.statusText}`);
+                    hours = (await commonRes.json()).hours;
+                }
 
-                if (Array.isArray(common.hours)) {
+                if (Array.isArray(hours)) {
                     let lessonIndex = 0;
-                    common.hours.forEach(hourEntry => {
+                    hours.forEach(hourEntry => {
                         if (Array.isArray(hourEntry) && hourEntry.length >= 4 && hourEntry[0] === 'lesson') {
                             const startTime = hourEntry[2];
                             const endTime = hourEntry[3];
@@ -151,7 +179,13 @@ document.addEventListener("DOMContentLoaded", function() {
             }
 
             // Function to filter schedule by selected class
-            function filterScheduleByClass(selectedClass) {
+            async function filterScheduleByClass(selectedClass) {
+                if (scheduleSlices) {
+                    const res = await fetch(`${scheduleApi}/class/${encodeURIComponent(selectedClass)}`);
+                    if (!res.ok) throw new Error(`Failed to fetch schedule of ${selectedClass}: ${res.status} ${res.statusText}`);
+                    renderSchedule((await res.json()).lessons);
+                    return;
+                }
                 const filteredData = currentScheduleData.filter(item => 
                     item.class === selectedClass || item.class === "All Classes"
                 );
@@ -242,8 +276,9 @@ async function importSchedule() {
                     throw new Error('Invalid schedule format: Items missing required properties (subject, teacher, class, day, lesson_index, classroom)');
                 }
                 
-                // Update the global variable
+                // Update the global variable, the imported schedule replaces the one of the backend
                 currentScheduleData = importedScheduleData;
+                scheduleSlices = false;
                 
                 // Clear and rebuild the class selector
                 const classSelector = document.getElementById("class-selector");
@@ -288,9 +323,7 @@ async function importSchedule() {
 
 async function exportSchedule() {
     try {
-        const res = await fetch('/data/out/generated.json');
-        if (!res.ok) throw new Error(`Failed to fetch schedule: ${res.status} ${res.statusText}`);
-        const scheduleData = await res.json();
+        const scheduleData = await fetchWholeSchedule();
         const dataStr = "data:text/json;charset=utf-8," + encodeURIComponent(JSON.stringify(scheduleData, null, 2));
         const downloadAnchorNode = document.createElement('a');
         downloadAnchorNode.setAttribute("href", dataStr);
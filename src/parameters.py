@@ -0,0 +1,101 @@
+import os
+
+from datastructure import *
+
+# Environment variables that override the "solver" section of common.json
+ENVIRONMENT_VARIABLES = {
+    "time_limit": ("DULEAI_TIME_LIMIT", float),
+    "num_workers": ("DULEAI_WORKERS", int),
+    "random_seed": ("DULEAI_SEED", int),
+    "portfolio": ("DULEAI_PORTFOLIO", int),
+    "lns": ("DULEAI_LNS", lambda value: value.lower() in ("1", "true", "yes")),
+}
+
+# Lower bound of the automatic worker count: with fewer workers CP-SAT runs no LNS or feasibility-jump workers
+# next to the default search, and the optimising generation types then stall even when fewer cores are available
+MIN_AUTO_WORKERS = 4
+
+def available_cores() -> int:
+    # Cores this process may run on (respects CPU affinity / container limits where the OS reports them)
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+def workers_per_process(processes: int) -> int:
+    # Automatic search workers of each of processes solves running at the same time: the available cores split
+    # between them, but never fewer than MIN_AUTO_WORKERS
+    return max(MIN_AUTO_WORKERS, available_cores() // max(1, processes))
+
+def split_cores(tasks: int, jobs: int | None = None, workers: int | None = None) -> tuple[int, int]:
+    # (processes at a time, search workers per process) for tasks solves in a pool: explicit values are kept,
+    # otherwise the available cores are split between the processes, with at least MIN_AUTO_WORKERS per process
+    workers = workers or workers_per_process(jobs or tasks)
+    jobs = jobs or max(1, min(tasks, available_cores() // workers))
+    return jobs, workers
+
+class SolverParameters:
+    time_limit: float | None # Seconds; None: 30, or 45 for the LEAST_ODD_HOURS types
+    num_workers: int | None # CP-SAT search workers per solve; None: all available cores (split over the portfolio), at least MIN_AUTO_WORKERS
+    random_seed: int
+    portfolio: int # Number of differently-seeded solves in separate processes; 0 or 1 disables the portfolio
+    stop_at_optimum: bool # Portfolio: stop all solves as soon as one of them proves optimality or infeasibility
+    lns: bool # Improve a first schedule by re-solving one neighbourhood at a time, see lns.py
+    lns_step_time: float # LNS: time limit of every neighbourhood re-solve, in seconds
+
+    def __init__(self):
+        self.time_limit = None
+        self.num_workers = None
+        self.random_seed = 0
+        self.portfolio = 0
+        self.stop_at_optimum = True
+        self.lns = False
+        self.lns_step_time = 2.0
+
+    def from_dict(self, data: dict):
+        self.time_limit = data.get("time_limit", self.time_limit)
+        self.num_workers = data.get("num_workers", self.num_workers)
+        self.random_seed = data.get("random_seed", self.random_seed)
+        self.portfolio = data.get("portfolio", self.portfolio)
+        self.stop_at_optimum = data.get("stop_at_optimum", self.stop_at_optimum)
+        self.lns = data.get("lns", self.lns)
+        self.lns_step_time = data.get("lns_step_time", self.lns_step_time)
+
+    def to_dict(self) -> dict:
+        return {
+            "time_limit": self.time_limit,
+            "num_workers": self.num_workers,
+            "random_seed": self.random_seed,
+            "portfolio": self.portfolio,
+            "stop_at_optimum": self.stop_at_optimum,
+            "lns": self.lns,
+            "lns_step_time": self.lns_step_time
+        }
+
+    @classmethod
+    def resolve(cls, common: CommonDataStructure, overrides: dict | None = None):
+        # Defaults < "solver" section of common.json < environment variables < overrides (CLI / job options)
+        instance = cls()
+        instance.from_dict(common.solverParameters)
+        for name, (variable, parse) in ENVIRONMENT_VARIABLES.items():
+            if os.environ.get(variable):
+                setattr(instance, name, parse(os.environ[variable]))
+        instance.from_dict({name: value for name, value in (overrides or {}).items() if value is not None})
+        return instance
+
+    def effective_time_limit(self, generation_type: Type) -> float:
+        if self.time_limit is not None:
+            return self.time_limit
+        # For complex optimization, allow slightly more time
+        return 45 if generation_type in (Type.LEAST_ODD_HOURS_STUDENTS, Type.LEAST_ODD_HOURS_TEACHERS) else 30
+
+    def effective_num_workers(self) -> int:
+        if self.num_workers:
+            return self.num_workers
+        return workers_per_process(self.portfolio)
+
+    def apply(self, solver, generation_type: Type) -> None:
+        solver.parameters.max_time_in_seconds = self.effective_time_limit(generation_type)
+        solver.parameters.num_search_workers = self.effective_num_workers()
+        solver.parameters.random_seed = self.random_seed
+        if generation_type in (Type.LEAST_ODD_HOURS_STUDENTS, Type.LEAST_ODD_HOURS_TEACHERS):
+            solver.parameters.cp_model_presolve = True
@@ -0,0 +1,176 @@
+import os
+import time
+import queue
+import tempfile
+import threading
+import multiprocessing
+
+import numpy as np
+
+from ortools.sat.python import cp_model
+
+from datastructure import *
+from parameters import SolverParameters
+
+# Search settings that differ between the solves of a portfolio, on top of a different random seed;
+# solve i uses PORTFOLIO_VARIANTS[i % len(PORTFOLIO_VARIANTS)]
+PORTFOLIO_VARIANTS = [
+    {},
+    {"linearization_level": 2},
+    {"randomize_search": True},
+    {"linearization_level": 0, "randomize_search": True},
+]
+
+class SolveResult:
+    status: cp_model.CpSolverStatus
+    status_name: str
+    objective: float | None
+    best_bound: float | None
+    wall_time: float
+    solution: np.ndarray | None # Values of all model variables of the best solution
+    worker: int | None # Portfolio solve that found the best solution
+
+    def __init__(self):
+        self.status = cp_model.UNKNOWN
+        self.status_name = "UNKNOWN"
+        self.objective = None
+        self.best_bound = None
+        self.wall_time = 0.0
+        self.solution = None
+        self.worker = None
+
+class WorkerCallback(cp_model.CpSolverSolutionCallback):
+    # Sends every improving solution of a portfolio solve to the parent process
+    def __init__(self, worker: int, events, has_objective: bool):
+        super().__init__()
+        self.worker = worker
+        self.events = events
+        self.has_objective = has_objective
+
+    def on_solution_callback(self) -> None:
+        self.events.put({
+            "type": "solution",
+            "worker": self.worker,
+            "objective": self.ObjectiveValue() if self.has_objective else None,
+            "best_bound": self.BestObjectiveBound() if self.has_objective else None,
+            "solution": np.asarray(self.Response().solution, dtype=np.int64),
+        })
+
+def portfolio_worker(model_path: str, worker: int, parameters: dict, generation_type: str, events, stop_event) -> None:
+    # Entry point of one portfolio process: loads the model written by the parent and solves it
+    # with its own seed and search variant until it finishes or the parent sets stop_event
+    model = cp_model.CpModel()
+    with open(model_path, encoding="utf-8") as file:
+        model.Proto().parse_text_format(file.read())
+    solver = cp_model.CpSolver()
+    solver_parameters = SolverParameters()
+    solver_parameters.from_dict(parameters)
+    solver_parameters.apply(solver, Type[generation_type])
+    solver.parameters.random_seed = solver_parameters.random_seed + worker
+    for name, value in PORTFOLIO_VARIANTS[worker % len(PORTFOLIO_VARIANTS)].items():
+        setattr(solver.parameters, name, value)
+
+    finished = threading.Event()
+    def watch_stop() -> None:
+        while not finished.is_set():
+            if stop_event.wait(0.1):
+                solver.StopSearch()
+                return
+    watcher = threading.Thread(target=watch_stop, daemon=True)
+    watcher.start()
+
+    has_objective = model.HasObjective()
+    status = solver.Solve(model, WorkerCallback(worker, events, has_objective))
+    finished.set()
+    watcher.join()
+    found = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    events.put({
+        "type": "done",
+        "worker": worker,
+        "status": solver.StatusName(status),
+        "objective": solver.ObjectiveValue() if found and has_objective else None,
+        "best_bound": solver.BestObjectiveBound() if has_objective and status != cp_model.INFEASIBLE else None,
+        "wall_time": solver.WallTime(),
+    })
+
+class Portfolio:
+    # Solves one model with several differently seeded CP-SAT searches in separate processes and keeps the
+    # best solution. With stop_at_optimum, the first search that proves optimality (or infeasibility) stops
+    # all others. Each process gets parameters.effective_num_workers() search workers.
+    def __init__(self, parameters: SolverParameters, generation_type: Type):
+        self.parameters = parameters
+        self.generation_type = generation_type
+        self.context = multiprocessing.get_context("spawn")
+        self.stop_event = self.context.Event() # Also set by stop() before or while solving
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    def solve(self, model: cp_model.CpModel, on_solution=None) -> SolveResult:
+        # on_solution(event) is called in this process for every solution that improves on all earlier ones
+        # of the portfolio; the search stops when it returns True
+        size = self.parameters.portfolio
+        context = self.context
+        events = context.Queue()
+        parameters = self.parameters.to_dict()
+        parameters["num_workers"] = self.parameters.effective_num_workers()
+        has_objective = model.HasObjective()
+        start = time.perf_counter()
+
+        fd, model_path = tempfile.mkstemp(prefix="portfolio-", suffix=".pbtxt")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                file.write(str(model.Proto()))
+            processes = [
+                context.Process(target=portfolio_worker, daemon=True,
+                                args=(model_path, worker, parameters, self.generation_type.name, events, self.stop_event))
+                for worker in range(size)
+            ]
+            for process in processes:
+                process.start()
+
+            best = None
+            finals = []
+            while len(finals) < size:
+                try:
+                    event = events.get(timeout=0.5)
+                except queue.Empty:
+                    if not any(process.is_alive() for process in processes):
+                        break # A search died without reporting, e.g. out of memory
+                    continue
+                if event["type"] == "done":
+                    finals.append(event)
+                    if self.parameters.stop_at_optimum and event["status"] in ("OPTIMAL", "INFEASIBLE"):
+                        self.stop_event.set()
+                    continue
+                if best is not None and (not has_objective or event["objective"] >= best["objective"]):
+                    continue
+                best = event
+                best["wall_time"] = time.perf_counter() - start
+                if on_solution is not None and on_solution(best):
+                    self.stop_event.set()
+            self.stop_event.set()
+            for process in processes:
+                process.join()
+        finally:
+            os.unlink(model_path)
+
+        result = SolveResult()
+        result.wall_time = time.perf_counter() - start
+        statuses = [event["status"] for event in finals]
+        if "INFEASIBLE" in statuses:
+            result.status_name = "INFEASIBLE"
+        elif best is not None:
+            result.status_name = "OPTIMAL" if "OPTIMAL" in statuses else "FEASIBLE"
+        elif statuses:
+            result.status_name = statuses[0]
+        result.status = getattr(cp_model, result.status_name)
+        if best is not None and result.status_name != "INFEASIBLE":
+            result.solution = best["solution"]
+            result.objective = best["objective"]
+            result.worker = best["worker"]
+        if has_objective:
+            # Every search proves its own lower bound, the strongest one holds for the portfolio
+            bounds = [event["best_bound"] for event in finals if event["best_bound"] is not None]
+            result.best_bound = result.objective if result.status_name == "OPTIMAL" else max(bounds, default=None)
+        return result
@@ -0,0 +1,56 @@
+import numpy as np
+
+from datastructure import *
+from instance import ProblemInstance
+
+class RoomPool:
+    capacity: int
+    specialties: frozenset[ClassroomSpecialties]
+    room_ids: list[int] # Rooms (instance room IDs) in this pool, in the order they are handed out
+
+    def __init__(self, capacity: int, specialties: frozenset[ClassroomSpecialties]):
+        self.capacity = capacity
+        self.specialties = specialties
+        self.room_ids = []
+
+    @property
+    def name(self) -> str:
+        specialties = "-".join(sorted(s.value for s in self.specialties)) or "general"
+        return f"pool_{self.capacity}_{specialties}"
+
+def build_room_pools(instance: ProblemInstance) -> list[RoomPool]:
+    # Rooms with the same capacity and specialties are interchangeable for the solver,
+    # so they are grouped into one pool that is modelled as a per-slot count
+    pools = {}
+    for room in range(len(instance.room_numbers)):
+        specialties = frozenset(s for s, has in zip(instance.specialties, instance.room_specialty[room]) if has)
+        key = (int(instance.room_capacity[room]), specialties)
+        if key not in pools:
+            pools[key] = RoomPool(*key)
+        pools[key].room_ids.append(room)
+    return list(pools.values())
+
+def pool_slot_capacity(pools: list[RoomPool], instance: ProblemInstance) -> np.ndarray:
+    # int[pool, slot]: number of rooms of the pool that are not blocked by a fixed hour in the slot
+    capacity = np.zeros((len(pools), len(instance.slots)), dtype=np.int32)
+    for p, pool in enumerate(pools):
+        capacity[p] = (~instance.room_slot_blocked[pool.room_ids]).sum(axis=0)
+    return capacity
+
+def assign_rooms(lessons: list[tuple[list[int], int, list[dict]]], pools: list[RoomPool], instance: ProblemInstance) -> None:
+    # Post-pass after the solve: every lesson is a (slots, pool, result dicts) tuple, with one result dict per slot
+    # of the lesson, and gets a concrete room number from its pool. The model guarantees that a pool is never used by
+    # more lessons in a slot than it has free rooms, so this always succeeds. A lesson of several slots keeps one room
+    # when one is free in all of its slots, and otherwise gets a free room per slot.
+    free = {}
+    def free_rooms(slot: int, pool: int) -> list[int]:
+        if (slot, pool) not in free:
+            free[(slot, pool)] = [room for room in pools[pool].room_ids if not instance.room_slot_blocked[room, slot]]
+        return free[(slot, pool)]
+
+    for slots, pool, results in sorted(lessons, key=lambda lesson: lesson[0][0]):
+        shared = [room for room in free_rooms(slots[0], pool) if all(room in free_rooms(slot, pool) for slot in slots[1:])]
+        for slot, result in zip(slots, results):
+            room = shared[0] if shared else free_rooms(slot, pool)[0]
+            free_rooms(slot, pool).remove(room)
+            result["classroom"] = instance.room_numbers[room]
@@ -1,289 +1,565 @@
 import sys
 import os
-import json
+import time
+import argparse
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 from datastructure import *
+from instance import compile_instance
+from loader import DataError, load_data
+from rooms import build_room_pools, pool_slot_capacity, assign_rooms
+from warmstart import load_previous_schedule, previous_lesson_keys
+from cache import ScheduleCache, file_hash
+from streaming import ScheduleSolutionCallback, stop_condition, write_json_atomic
+from compact import compact_file, compact_schedule
+from parameters import SolverParameters
+from portfolio import Portfolio
+from lns import LNSDriver
+from electives import Electives, load_students, student_schedules_file
+from objectives import objective_terms
+from feasibility import check_feasibility, check_fixed_hours
+from explain import ConflictExplainer
+from metrics import RunMetrics, metrics_file
+from symmetry import add_symmetry_breaking
+from formulation import LessonIntervals, add_implied_bounds, add_one_at_a_time, add_required_hours, add_room_capacity
+
+import numpy as np
 
 from ortools.sat.python import cp_model
 
+# Bump when the formulation changes, so cached models built by an older version are not reused
+MODEL_VERSION = 2
+
+# Formulations of the exclusivity constraints, see Run.build_model:
+# - linear: sum(...) <= 1 per teacher, room and class and slot
+# - boolean: native at-most-one / exactly-one constraints, plus implied load bounds
+# - interval: every lesson an optional interval of one slot, with NoOverlap per teacher, class and room
+#   (a cumulative per room pool), plus implied load bounds
+FORMULATIONS = ["linear", "boolean", "interval"]
+
 class Run:
-    def __init__(self) -> None:
+    def __init__(self, room_pools: bool = False, data_folder: str = dataFolder, output_file: str | None = generatedFile,
+                 solver_parameters: dict | None = None, verbose: bool = True, stream: bool = False,
+                 warm_start: str | None = None, minimise_changes: int = 0, cache: ScheduleCache | None = None,
+                 electives: str | None = None, explain: str | None = None, symmetry_breaking: bool = True,
+                 formulation: str = "linear") -> None:
+        if formulation not in FORMULATIONS:
+            raise ValueError(f'Unknown formulation {formulation}, expected one of {", ".join(FORMULATIONS)}')
         self.model = cp_model.CpModel()
         self.solver = cp_model.CpSolver()
+        self.output_file = output_file # None: only return the results, do not write them
+        self.verbose = verbose # Print every scheduled lesson
+        self.stream = stream # Write every improving solution to output_file while solving
+        self.warm_start = warm_start # Previous generated.json to use as solution hint
+        self.minimise_changes = minimise_changes # Objective weight of every previous lesson that is not kept
+        self.cache = cache
+        self.electives_file = electives # students.json for the elective mode, None: only schedule whole classes
+        self.explain = explain # On an infeasible solve: "core" for a conflicting set of constraints, "minimal" to shrink it
+        # Order interchangeable classes and teachers, see symmetry.py. Not with a warm start: the previous schedule
+        # is one particular permutation, which the ordering would usually exclude.
+        self.symmetry_breaking = symmetry_breaking and warm_start is None
+        self.symmetry_groups = None
+        self.formulation = formulation
+        self.conflict = None # The conflicting constraints, see explain.py
+        self.explainer = None
+        self.stopped = False
+        self.portfolio = None
+        self.lns = None
+        self.metrics = RunMetrics() # Wall time, memory and model size per phase, see metrics.py
+        build_start = time.perf_counter()
+
+        # Validated input, from the snapshot of an earlier run with the same files (only in cache mode)
+        with self.metrics.phase("loading"):
+            data = load_data(data_folder, snapshot=cache is not None, snapshot_folder=cache.snapshot_folder if cache is not None else None)
+        self.teachers, self.classes, self.subjects = data.teachers, data.classes, data.subjects
+        self.classrooms, self.fixed_hours, self.common = data.classrooms, data.fixed_hours, data.common
+        # Solver settings: defaults < "solver" section of common.json < DULEAI_* environment variables < solver_parameters
+        self.parameters = SolverParameters.resolve(self.common, solver_parameters)
+
+        with self.metrics.phase("compile"):
+            # Compile the input into integer IDs and lookup tables, everything below only queries those
+            self.instance = compile_instance(self.teachers, self.classes, self.subjects, self.classrooms, self.fixed_hours, self.common)
+            # Room-pool mode: interchangeable rooms are modelled as one pool with a per-slot capacity,
+            # concrete room numbers are assigned after the solve
+            self.room_pools = build_room_pools(self.instance) if room_pools else None
+            # Elective mode: students with the same elective subjects are clustered into elective groups
+            self.electives = Electives(load_students(electives), self.instance) if electives is not None else None
+        # Necessary conditions, checked in milliseconds: input that violates one of them cannot be scheduled,
+        # so no model is built and solve() reports it as infeasible right away
+        with self.metrics.phase("feasibility_check"):
+            self.violations = check_feasibility(self.instance, self.electives)
+            # Input the solver ignores, reported without stopping the run
+            self.warnings = check_fixed_hours(self.instance)
+
+        # With a cache, an identical request reuses the stored schedule and a request that only differs in
+        # solver parameters reuses the stored model
+        self.cached_result = None
+        self.lesson_vars = None
+        cached_model = False
+        if cache is not None and not self.violations:
+            with self.metrics.phase("cache"):
+                self.model_key = cache.model_key(data_folder, self.model_options())
+                self.result_key = cache.result_key(self.model_key, self.solver_options())
+                self.cached_result = cache.load_result(self.result_key)
+                cached_model = self.cached_result is None and cache.load_model(self.model_key, self)
+        if not self.violations and self.cached_result is None and not cached_model:
+            self.build_model()
+            if cache is not None:
+                with self.metrics.phase("cache_store"):
+                    cache.store_model(self.model_key, self)
+
+        self.build_time = time.perf_counter() - build_start
 
-        self.teachers = []
-        for d in load_json_file(teachersFile):
-            t = TeachersDataStructure()
-            t.from_dict(d)
-            self.teachers.append(t)
-        self.classes = []
-        for d in load_json_file(classesFile):
-            c = ClassDataStructure()
-            c.from_dict(d)
-            self.classes.append(c)
-
-        self.subjects = []
-        for d in load_json_file(subjectsFile):
-            s = SubjectDataStructure()
-            s.from_dict(d)
-            self.subjects.append(s)
-
-        self.classrooms = []
-        for d in load_json_file(classroomsFile):
-            cr = ClassroomDataStructure()
-            cr.from_dict(d)
-            self.classrooms.append(cr)
-
-        self.fixed_hours = []
-        for d in load_json_file(fixedHoursFile):
-            fh = FixedHourDataStructure()
-            fh.from_dict(d)
-            self.fixed_hours.append(fh)
-        self.common = CommonDataStructure.from_json(json.dumps(load_json_file(commonFile)))
-
-        self.teacher_names = [t.name for t in self.teachers]
-        self.class_names = [c.name for c in self.classes]
-        self.subject_names = [s.name for s in self.subjects]
-        self.classroom_numbers = [cr.number for cr in self.classrooms]
-        #print(self.classroom_numbers)
-        # Only use lesson slots
-        self.time_slots = [t for t in self.common.hours if t[0] == HourType.LESSON] # tuple[HourType, Days, datetime.time, datetime.time]
-
-
-        # Decision Variables - now including class information
+    def model_options(self) -> dict:
+        # Everything besides the input files that changes the model
+        return {
+            "model_version": MODEL_VERSION,
+            "room_pools": self.room_pools is not None,
+            "warm_start": file_hash(self.warm_start) if self.warm_start is not None else None,
+            "minimise_changes": self.minimise_changes,
+            "electives": file_hash(self.electives_file) if self.electives_file is not None else None,
+            "symmetry_breaking": self.symmetry_breaking,
+            "formulation": self.formulation,
+        }
+
+    def solver_options(self) -> dict:
+        options = self.parameters.to_dict()
+        options["time_limit"] = self.parameters.effective_time_limit(self.common.generationType)
+        options["num_workers"] = self.parameters.effective_num_workers()
+        return options
+
+    def build_model(self) -> None:
+        instance = self.instance
+        metrics = self.metrics
+
+        # The room dimension of the model: either every room, or every room pool.
+        # room_slot_capacity[room, slot] is how many lessons a room (pool) can host in a slot.
+        # room_compatible[class, subject, room] is the compatibility index of the room (pool), see compile_instance.
+        room_compatible = instance.room_compatible
+        group_compatible = self.electives.group_room_compatible() if self.electives is not None else None
+        if self.room_pools is not None:
+            room_slot_capacity = pool_slot_capacity(self.room_pools, instance)
+            # The rooms of a pool share capacity and specialties, so the first one stands for the pool
+            representatives = [pool.room_ids[0] for pool in self.room_pools]
+            room_compatible = room_compatible[:, :, representatives]
+            group_compatible = group_compatible[:, representatives] if group_compatible is not None else None
+        else:
+            room_slot_capacity = (~instance.room_slot_blocked).astype(np.int32)
+        room_slots = [set(np.flatnonzero(row).tolist()) for row in room_slot_capacity]
+
+        # Decision Variables - only for (class, subject, teacher, slot, room) tuples that survive the filters:
+        # a core subject of the class, a qualified teacher, a slot the teacher is available and a room
+        # (pool) with the specialties of the subject, room for the class and not blocked by a fixed hour.
+        # Every other tuple is implicitly 0.
+        subject_teachers = instance.subject_teachers
+        teacher_slots = instance.teacher_slots
         x = {}
-        for class_name in self.class_names:
-            for subject in self.subject_names:
-                for teacher in self.teacher_names:
-                    for time in self.time_slots:
-                        for room in self.classroom_numbers:
-                            x[(class_name, subject, teacher, time, room)] = self.model.NewBoolVar(f'x_{class_name}_{subject}_{teacher}_{time}_{room}')
-
-        # Teacher qualification constraint: only allow teacher to teach subjects they are qualified for
-        teacher_subjects = {t.name: set(t.subjects) for t in self.teachers}
-        for class_name in self.class_names:
-            for subject in self.subject_names:
-                for teacher in self.teacher_names:
-                    if subject not in teacher_subjects.get(teacher, set()):
-                        for time in self.time_slots:
-                            for room in self.classroom_numbers:
-                                self.model.Add(x[(class_name, subject, teacher, time, room)] == 0)
-
-        # Class-subject constraint: each class gets required hours for their core subjects
-        class_subjects = {c.name: set(c.coreSubjects) for c in self.classes}
-        for class_name, class_obj in zip(self.class_names, self.classes):
-            for subject in class_obj.coreSubjects:
-                if subject in self.subject_names:
-                    subject_obj = next((s for s in self.subjects if s.name == subject), None)
-                    if subject_obj:
-                        self.model.Add(sum(x[(class_name, subject, teacher, time, room)]
-                                           for teacher in self.teacher_names
-                                             for time in self.time_slots
-                                               for room in self.classroom_numbers) == subject_obj.requiredHours)
-        
-        # Ensure classes only get subjects that are in their core subjects
-        for class_name in self.class_names:
-            class_core_subjects = class_subjects.get(class_name, set())
-            for subject in self.subject_names:
-                if subject not in class_core_subjects:
-                    for teacher in self.teacher_names:
-                        for time in self.time_slots:
-                            for room in self.classroom_numbers:
-                                self.model.Add(x[(class_name, subject, teacher, time, room)] == 0)
-
-        # Teacher can only teach one class at a time
-        for teacher in self.teacher_names:
-            for time in self.time_slots:
-                self.model.Add(sum(x[(class_name, subject, teacher, time, room)]
-                                   for class_name in self.class_names
-                                     for subject in self.subject_names
-                                       for room in self.classroom_numbers) <= 1)
-
-        # Room can only be used by one class at a time
-        for room in self.classroom_numbers:
-            for time in self.time_slots:
-                self.model.Add(sum(x[(class_name, subject, teacher, time, room)]
-                                   for class_name in self.class_names
-                                     for subject in self.subject_names
-                                       for teacher in self.teacher_names) <= 1)
-
-        # Class can only have one lesson at a time
-        for class_name in self.class_names:
-            for time in self.time_slots:
-                self.model.Add(sum(x[(class_name, subject, teacher, time, room)]
-                                   for subject in self.subject_names
-                                     for teacher in self.teacher_names
-                                       for room in self.classroom_numbers) <= 1)
-
-        # Teacher availability constraint
-        # Build a mapping: for each day, a list of lesson slots (in order)
-        day_to_lesson_slots = {}
-        for t in self.time_slots:
-            day = t[1]
-            if day not in day_to_lesson_slots:
-                day_to_lesson_slots[day] = []
-            day_to_lesson_slots[day].append(t)
-
-        teacher_availability = {t.name: t.availability for t in self.teachers}
-        for teacher in self.teacher_names:
-            availability = teacher_availability.get(teacher, {})
-            for time in self.time_slots:
-                day = time[1]  # e.g., 'monday'
-                lesson_slots_today = day_to_lesson_slots.get(day, [])
-                lesson_index = lesson_slots_today.index(time) + 1 if time in lesson_slots_today else -1
-                if day.value not in availability:
-                    print("not")
-                    # Teacher not available at all on this day
-                    for class_name in self.class_names:
-                        for subject in self.subject_names:
-                            for room in self.classroom_numbers:
-                                self.model.Add(x[(class_name, subject, teacher, time, room)] == 0)
-                else:
-                    available_hours = availability.get(day.value, [])
-                    #print(availability)
-                    if not isinstance(available_hours, list):
-                        available_hours = [available_hours]
-                    if lesson_index not in available_hours:
-                        # Not available: force all x[...] for this teacher, time to 0
-                        for class_name in self.class_names:
-                            for subject in self.subject_names:
-                                for room in self.classroom_numbers:
-                                    self.model.Add(x[(class_name, subject, teacher, time, room)] == 0)
-        
-        # Fixed Hours Constraint: Reserve specific time slots for fixed activities
-        for fixed_hour in self.fixed_hours:
-            # Find the matching time slot
-            fixed_day = Days[fixed_hour.day.upper()]
-            fixed_lesson_index = fixed_hour.hour - 1  # Convert 1-based to 0-based index
-            
-            # Find the time slot that matches this day and lesson index
-            matching_time_slot = None
-            day_slots = day_to_lesson_slots.get(fixed_day, [])
-            if 0 <= fixed_lesson_index < len(day_slots):
-                matching_time_slot = day_slots[fixed_lesson_index]
-            
-            if matching_time_slot:
-                # Block this time slot and classroom from being used by regular classes
-                fixed_classroom = int(fixed_hour.classroomID) if isinstance(fixed_hour.classroomID, str) else fixed_hour.classroomID
-                
-                for class_name in self.class_names:
-                    for subject in self.subject_names:
-                        for teacher in self.teacher_names:
-                            if fixed_classroom in self.classroom_numbers:
-                                # Block the specific classroom
-                                self.model.Add(x[(class_name, subject, teacher, matching_time_slot, fixed_classroom)] == 0)
-                            # Also block this time slot for all classrooms if it's a class-specific fixed hour
-                            # (You can modify this logic based on your specific requirements)
-        
-        # Optimization objective based on generation type
-        if self.common.generationType == Type.LEAST_ODD_HOURS_STUDENTS:
-            # Simplified approach: minimize gaps by encouraging consecutive lessons
-            gap_penalties = []
-            
-            for class_name in self.class_names:
-                for day in Days:
-                    day_slots = day_to_lesson_slots.get(day, [])
-                    if len(day_slots) <= 2:
-                        continue
-                    
-                    # Simple approach: for each day, penalize having lessons at non-consecutive times
-                    # Create boolean variables for whether class has a lesson in each slot
-                    lesson_vars = []
-                    for i, time_slot in enumerate(day_slots):
-                        has_lesson = self.model.NewBoolVar(f'has_lesson_{class_name}_{day.value}_{i}')
-                        self.model.Add(has_lesson == sum(x[(class_name, subject, teacher, time_slot, room)]
-                                                        for subject in self.subject_names
-                                                        for teacher in self.teacher_names
-                                                        for room in self.classroom_numbers))
-                        lesson_vars.append(has_lesson)
-                    
-                    # Add penalty for gaps: if lesson[i] = 1 and lesson[i+2] = 1 but lesson[i+1] = 0
-                    for i in range(len(lesson_vars) - 2):
-                        gap_penalty = self.model.NewBoolVar(f'gap_penalty_{class_name}_{day.value}_{i}')
-                        # gap_penalty = 1 if lesson[i] = 1 AND lesson[i+1] = 0 AND lesson[i+2] = 1
-                        self.model.Add(gap_penalty <= lesson_vars[i])
-                        self.model.Add(gap_penalty <= 1 - lesson_vars[i + 1])
-                        self.model.Add(gap_penalty <= lesson_vars[i + 2])
-                        self.model.Add(gap_penalty >= lesson_vars[i] + (1 - lesson_vars[i + 1]) + lesson_vars[i + 2] - 2)
-                        gap_penalties.append(gap_penalty)
-            
-            # Minimize total gap penalties (keep it simple)
-            if gap_penalties:
-                self.model.Minimize(sum(gap_penalties))
-        
+        class_subject_vars = {}
+        teacher_slot_vars = {}
+        room_slot_vars = {}
+        class_slot_vars = {}
+        cluster_slot_vars = {}
+
+        # Every (class, subject) to schedule, with its compatible rooms and the classes and (class, student cluster)
+        # pairs its lessons block. In elective mode the elective groups follow as classes of their own, see electives.py:
+        # a class lesson blocks the students of the class in every cluster, a group lesson only its own students.
+        lesson_groups = []
+        for c in range(len(instance.class_names)):
+            conflicts = self.electives.class_conflicts(c) if self.electives is not None else []
+            for s in np.flatnonzero(instance.class_subject[c]).tolist():
+                lesson_groups.append((c, s, np.flatnonzero(room_compatible[c, s]).tolist(), [c], conflicts))
+        if self.electives is not None:
+            for g, group in enumerate(self.electives.groups):
+                c = len(instance.class_names) + g
+                lesson_groups.append((c, group.subject, np.flatnonzero(group_compatible[g]).tolist(), [c], sorted(group.conflicts)))
+
+        # A lesson of several slots (a double period) is one variable at its first slot, and only for first slots where
+        # it stays within one run of lesson slots (no recess, no day boundary) with the teacher available and the room
+        # free in all of its slots. It counts as a lesson in every slot it covers.
+        block_starts = {}
+
+        with metrics.phase("variables", self.model):
+            for c, s, rooms, blocked_classes, clusters in lesson_groups:
+                lesson_vars = class_subject_vars.setdefault((c, s), [])
+                length = int(instance.block_length[s])
+                starts = block_starts.setdefault(length, instance.block_starts(length))
+                for t in subject_teachers[s].tolist():
+                    for slot in teacher_slots[t].tolist():
+                        if not starts[slot] or (length > 1 and not instance.teacher_slot[t, slot:slot + length].all()):
+                            continue
+                        covered = range(slot, slot + length)
+                        for room in rooms:
+                            if any(covered_slot not in room_slots[room] for covered_slot in covered):
+                                continue
+                            var = self.model.NewBoolVar(f'x_{c}_{s}_{t}_{slot}_{room}')
+                            x[(c, s, t, slot, room)] = var
+                            lesson_vars.append(var)
+                            for covered_slot in covered:
+                                teacher_slot_vars.setdefault((t, covered_slot), []).append(var)
+                                room_slot_vars.setdefault((room, covered_slot), []).append(var)
+                                for blocked in blocked_classes:
+                                    class_slot_vars.setdefault((blocked, covered_slot), []).append(var)
+                                for cluster in clusters:
+                                    cluster_slot_vars.setdefault((cluster, covered_slot), []).append(var)
+
+            self.lesson_vars = x
+            # Registry of lesson variables for fast extraction: row i of lesson_keys is the (class, subject, teacher,
+            # first slot, room) of the i-th lesson variable, lesson_var_index[i] its index in the model
+            self.lesson_keys = np.array(list(x.keys()), dtype=np.int32).reshape(-1, 5)
+            self.lesson_var_index = np.fromiter((var.Index() for var in x.values()), dtype=np.int64, count=len(x))
+
+        # The same constraints in the chosen formulation, see formulation.py
+        formulation = self.formulation
+        intervals = LessonIntervals(self.model, self.lesson_keys, self.lesson_var_index, instance.block_length) if formulation == "interval" else None
+
+        with metrics.phase("required_hours", self.model):
+            # Class-subject constraint: each class gets required hours for their core subjects, in lessons of block_length hours
+            for (c, s), lesson_vars in class_subject_vars.items():
+                add_required_hours(self.model, lesson_vars, int(instance.required_hours[s] // instance.block_length[s]), formulation)
+
+        with metrics.phase("teacher_conflicts", self.model):
+            # Teacher can only teach one class at a time
+            add_one_at_a_time(self.model, teacher_slot_vars, formulation, intervals)
+
+        with metrics.phase("room_capacity", self.model):
+            # Room can only be used by one class at a time (a pool by as many classes as it has free rooms)
+            add_room_capacity(self.model, room_slot_vars, room_slot_capacity, formulation, intervals)
+
+        with metrics.phase("class_conflicts", self.model):
+            # Class can only have one lesson at a time
+            add_one_at_a_time(self.model, class_slot_vars, formulation, intervals)
+
+        with metrics.phase("cluster_conflicts", self.model):
+            # Students of a class with the same electives have one lesson at a time: of their class or of one elective group
+            add_one_at_a_time(self.model, cluster_slot_vars, formulation, intervals)
+
+        if formulation != "linear":
+            with metrics.phase("implied_bounds", self.model):
+                add_implied_bounds(self.model, instance, teacher_slot_vars, room_slot_vars, room_slot_capacity)
+
+        if self.symmetry_breaking:
+            with metrics.phase("symmetry_breaking", self.model):
+                # Classes in elective groups share their lesson slots with the groups, so they are not interchangeable
+                grouped = {c for group in self.electives.groups for c in group.classes} if self.electives is not None else set()
+                classes = [c for c in range(len(instance.class_names)) if c not in grouped]
+                self.symmetry_groups = add_symmetry_breaking(self.model, self.lesson_keys, list(x.values()), classes,
+                                                             list(range(len(instance.teacher_names))))
+            if self.verbose:
+                print(f'Symmetry breaking: {len(self.symmetry_groups["classes"])} groups of interchangeable classes, '
+                      f'{len(self.symmetry_groups["teachers"])} of interchangeable teachers')
+
+        with metrics.phase("objective", self.model):
+            # Optimization objective based on generation type, as a list of terms that are minimized together,
+            # see objectives.py
+            self.objective_terms = objective_terms(self.model, instance, self.common.generationType, class_slot_vars, teacher_slot_vars)
+
+        # Warm start: the lessons of the previous schedule that are still possible become the solution hint,
+        # optionally with a penalty for every one of them that the new schedule does not keep
+        if self.warm_start is not None:
+            with metrics.phase("warm_start", self.model):
+                self.add_warm_start(load_previous_schedule(self.warm_start))
+
+        if self.objective_terms:
+            self.model.Minimize(sum(self.objective_terms))
+
+    def solve(self, on_solution=None, stop_when=None) -> list[dict]:
+        # on_solution(event, lessons) is called for every improving solution and stop_when(event) can end
+        # the search early, see ScheduleSolutionCallback. Either of them (or stream) enables the callback.
+        instance = self.instance
         # Solve the model and collect results into a list to produce valid JSON
         results = []
 
         # Set solver parameters for better performance
-        self.solver.parameters.max_time_in_seconds = 30  # 30 seconds max for any optimization
-        self.solver.parameters.num_search_workers = 4  # Use multiple threads
-        
-        if self.common.generationType == Type.LEAST_ODD_HOURS_STUDENTS:
-            # For complex optimization, allow slightly more time but with early termination
-            self.solver.parameters.max_time_in_seconds = 45
-            # Stop when we find a reasonably good solution
-            self.solver.parameters.cp_model_presolve = True
-        
-        status = self.solver.Solve(self.model)
+        self.parameters.apply(self.solver, self.common.generationType)
+
+        self.solution_callback = None
+        if self.stream or on_solution is not None or stop_when is not None:
+            self.solution_callback = ScheduleSolutionCallback(self, on_solution, stop_when, write=self.stream)
+        for warning in self.warnings:
+            print(f'Warning: {warning}, it is ignored')
+        if self.violations:
+            return self.reject()
+        if self.cached_result is not None:
+            status = self.status = getattr(cp_model, self.cached_result["status"])
+            self.status_name = self.cached_result["status"]
+            self.objective_value = self.cached_result["objective"]
+            self.best_bound = None
+            self.wall_time = 0.0
+            results = self.cached_result["lessons"]
+            print(f'Using cached schedule {self.result_key}')
+            if status == cp_model.INFEASIBLE:
+                self.explain_infeasibility()
+            self.write_output(results)
+            self.write_metrics()
+            print(f'Solver status: {self.cached_result["status"]}')
+            return results
+
+        with self.metrics.phase("solve"):
+            if self.parameters.lns:
+                solution = self.solve_lns()
+            elif self.parameters.portfolio > 1:
+                solution = self.solve_portfolio()
+            else:
+                # The search log is parsed into the metrics: presolve time, objective / bound timeline, solutions
+                self.metrics.capture_log(self.solver)
+                status = self.status = self.solver.Solve(self.model, self.solution_callback)
+                solution = self.solver.ResponseProto().solution
+                has_objective = self.model.HasObjective()
+                self.objective_value = self.solver.ObjectiveValue() if status in (cp_model.OPTIMAL, cp_model.FEASIBLE) and has_objective else None
+                self.best_bound = self.solver.BestObjectiveBound() if status != cp_model.INFEASIBLE and has_objective else None
+                self.wall_time = self.solver.WallTime()
+        status = self.status
+        self.status_name = self.solver.StatusName(status)
         if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
-            for class_name in self.class_names:
-                for subject in self.subject_names:
-                    for teacher in self.teacher_names:
-                        for time in self.time_slots:
-                            for room in self.classroom_numbers:
-                                if self.solver.Value(x[(class_name, subject, teacher, time, room)]) == 1:
-                                    lesson_index = day_to_lesson_slots.get(time[1], []).index(time)
-                                    print(f' - {subject} with {teacher} for {class_name} at {time[1].value} : {lesson_index} in {room}')
-                                    results.append({
-                                        "subject": subject,
-                                        "teacher": teacher,
-                                        "class": class_name,
-                                        "day": time[1].value,
-                                        "lesson_index": lesson_index,
-                                        "classroom": room
-                                    })
+            with self.metrics.phase("extraction"):
+                results = self.extract_lessons(solution)
+            if self.verbose:
+                for result in results:
+                    print(f' - {result["subject"]} with {result["teacher"]} for {result["class"]} at {result["day"]} : {result["lesson_index"]} in {result["classroom"]}')
         else:
             if status == cp_model.INFEASIBLE:
                 print('No solution found - problem is infeasible.')
+                self.explain_infeasibility()
             elif status == cp_model.MODEL_INVALID:
                 print('No solution found - model is invalid.')
             else:
-                print(f'No solution found - solver status: {self.solver.StatusName(status)}')
+                print(f'No solution found - solver status: {self.status_name}')
 
         # Add fixed hours to the results
-        for fixed_hour in self.fixed_hours:
-            fixed_day = Days[fixed_hour.day.upper()]
-            fixed_lesson_index = fixed_hour.hour - 1  # Convert 1-based to 0-based index
-            
-            # Find the matching day slots to get the correct lesson index
-            day_slots = day_to_lesson_slots.get(fixed_day, [])
-            if 0 <= fixed_lesson_index < len(day_slots):
-                fixed_classroom = int(fixed_hour.classroomID) if isinstance(fixed_hour.classroomID, str) else fixed_hour.classroomID
-                
-                results.append({
-                    "subject": fixed_hour.name,
-                    "teacher": "Fixed Activity",
-                    "class": "All Classes",
-                    "day": fixed_day.value,
-                    "lesson_index": fixed_lesson_index,
-                    "classroom": fixed_classroom
-                })
-                print(f' - {fixed_hour.name} (Fixed) for All Classes at {fixed_day.value} : {fixed_lesson_index} in {fixed_classroom}')
-
-        # Use absolute path for output
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        project_root = os.path.dirname(script_dir)
-        output_dir = os.path.join(project_root, "data", "out")
-        output_file = os.path.join(output_dir, "generated.json")
-        
-        os.makedirs(output_dir, exist_ok=True)
-        with open(output_file, "w", encoding="utf-8") as file:
-            json.dump(results, file, indent=2, ensure_ascii=False)
-
-        print(f'Solver status: {self.solver.StatusName(status)}')
-        print(f'Solve time: {self.solver.WallTime():.2f} seconds')
+        fixed_lessons = self.fixed_hour_lessons()
+        if self.verbose:
+            for result in fixed_lessons:
+                print(f' - {result["subject"]} (Fixed) for All Classes at {result["day"]} : {result["lesson_index"]} in {result["classroom"]}')
+        results += fixed_lessons
+
+        with self.metrics.phase("output"):
+            self.write_output(results)
+        self.write_metrics()
+        if self.solution_callback is not None:
+            self.solution_callback.finish(self.status_name)
+        # Proven results are always cached, a feasible one only when the search ran its full time
+        if self.cache is not None and (status in (cp_model.OPTIMAL, cp_model.INFEASIBLE) or (status == cp_model.FEASIBLE and not self.stopped)):
+            self.cache.store_result(self.result_key, {
+                "status": self.status_name,
+                "objective": self.objective_value,
+                "solve_time": self.wall_time,
+                "lessons": results,
+            })
+
+        print(f'Solver status: {self.status_name}')
+        print(f'Solve time: {self.wall_time:.2f} seconds')
         if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
             print(f'Generated {len(results)} lessons')
-        print(f'Solver status: {self.solver.StatusName(status)}')
+        print(f'Solver status: {self.status_name}')
+        return results
+
+    def reject(self) -> list[dict]:
+        # Result of input that failed the feasibility pre-check: only the fixed hours, without solving
+        self.status, self.status_name = cp_model.INFEASIBLE, "INFEASIBLE"
+        self.objective_value = None
+        self.best_bound = None
+        self.wall_time = 0.0
+        print('No solution found - input is infeasible:')
+        for violation in self.violations:
+            print(f' - {violation}')
+        results = self.fixed_hour_lessons()
+        self.write_output(results)
+        self.write_metrics()
+        if self.solution_callback is not None:
+            self.solution_callback.finish(self.status_name)
+        print(f'Solver status: {self.status_name}')
+        return results
+
+    def explain_infeasibility(self) -> None:
+        # With explain, searches a set of constraints that cannot hold together, see ConflictExplainer
+        if self.explain is None or self.stopped:
+            return
+        with self.metrics.phase("explain"):
+            self.explainer = ConflictExplainer(self)
+            self.conflict = self.explainer.explain(self.parameters.effective_time_limit(self.common.generationType), self.explain == "minimal")
+        if self.conflict is None and self.explainer.status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            # The explanation model keeps only the constraints an admin can change, the others are relaxed
+            print('No conflict found: the explanation model, which relaxes the constraints it cannot name, is feasible')
+        elif self.conflict is None:
+            print('No conflict found within the time limit')
+        else:
+            print(f'{"Minimal conflict" if self.explainer.minimal else "Conflict"}, these constraints cannot all hold:')
+            for assumption in self.conflict:
+                print(f' - {assumption}')
+        self.explainer = None
+
+    def solve_portfolio(self):
+        # Solves the model with parameters.portfolio differently seeded searches in separate processes,
+        # improving solutions of any of them go through the solution callback. Returns the best solution.
+        self.portfolio = Portfolio(self.parameters, self.common.generationType)
+        if self.stopped:
+            self.portfolio.stop()
+        outcome = self.portfolio.solve(self.model, self.record_solution())
+        self.portfolio = None
+        if self.verbose and outcome.worker is not None:
+            print(f'Best schedule found by portfolio search {outcome.worker + 1} of {self.parameters.portfolio}')
+        return self.use_result(outcome)
+
+    def solve_lns(self):
+        # Large Neighbourhood Search within the time limit, improving schedules go through the solution callback
+        self.lns = LNSDriver(self, self.parameters.effective_time_limit(self.common.generationType),
+                             self.parameters.lns_step_time, self.parameters.random_seed)
+        if self.stopped:
+            self.lns.stop()
+        outcome = self.lns.solve(self.record_solution())
+        if self.verbose:
+            accepted = sum(1 for _, _, kept in self.lns.history if kept)
+            print(f'LNS: {len(self.lns.history)} neighbourhood re-solves, {accepted} kept')
+        self.lns = None
+        return self.use_result(outcome)
+
+    def record_solution(self):
+        # on_solution for the portfolio and LNS drivers: adds their solutions to the metrics timeline and
+        # passes them to the solution callback
+        callback = self.solution_callback
+        def record(event: dict) -> bool:
+            self.metrics.solution(event)
+            return callback is not None and callback.record(event["solution"], event["objective"], event["best_bound"], event["wall_time"])
+        return record
+
+    def use_result(self, outcome):
+        self.status = outcome.status
+        self.objective_value = outcome.objective
+        self.best_bound = outcome.best_bound
+        self.wall_time = outcome.wall_time
+        return outcome.solution
+
+    def write_metrics(self) -> None:
+        if self.output_file is not None:
+            write_json_atomic(metrics_file(self.output_file), self.metrics.to_dict(self))
+
+    def write_output(self, results: list[dict]) -> None:
+        if self.output_file is None:
+            return
+        write_json_atomic(self.output_file, results)
+        write_json_atomic(compact_file(self.output_file), compact_schedule(results), indent=None)
+        if self.electives is not None:
+            schedules = self.electives.student_schedules(results)
+            write_json_atomic(student_schedules_file(self.output_file), [schedule.to_dict() for schedule in schedules])
+
+    def stop(self) -> None:
+        # Ends a running solve early, keeping the best solution found so far
+        self.stopped = True
+        self.solver.StopSearch()
+        if self.portfolio is not None:
+            self.portfolio.stop()
+        if self.lns is not None:
+            self.lns.stop()
+        if self.explainer is not None:
+            self.explainer.stop()
+
+    def add_warm_start(self, previous_lessons: list[dict]) -> None:
+        # Hints the previous lessons that are still possible. The other variables of a class or elective group
+        # that had one of them are hinted 0, those of classes and groups the previous schedule did not have stay free.
+        class_ids = dict(self.instance.class_ids, **(self.electives.group_ids if self.electives is not None else {}))
+        keys = list(dict.fromkeys(previous_lesson_keys(self.instance, previous_lessons, self.room_pools, class_ids)))
+        kept = [key for key in keys if key in self.lesson_vars]
+        if self.verbose:
+            print(f'Warm start: {len(kept)} of {len(keys)} previous lessons are still possible')
+        hinted = set(kept)
+        classes = {key[0] for key in kept}
+        for key, var in self.lesson_vars.items():
+            if key[0] in classes:
+                self.model.AddHint(var, int(key in hinted))
+        if self.minimise_changes and kept:
+            self.objective_terms.append(self.minimise_changes * (len(kept) - sum(self.lesson_vars[key] for key in kept)))
+
+    def fixed_hour_lessons(self) -> list[dict]:
+        results = []
+        for fixed_hour, slot, fixed_classroom in self.instance.fixed_hours:
+            if slot < 0:
+                continue
+            day, fixed_lesson_index = self.instance.slot_name(slot)
+            results.append({
+                "subject": fixed_hour.name,
+                "teacher": "Fixed Activity",
+                "class": "All Classes",
+                "day": day,
+                "lesson_index": fixed_lesson_index,
+                "classroom": fixed_classroom
+            })
+        return results
+
+    def extract_lessons(self, solution) -> list[dict]:
+        # Read the solution values of the lesson variables in bulk and only look at the ones set to 1
+        values = np.asarray(solution, dtype=np.int64)[self.lesson_var_index]
+        chosen = self.lesson_keys[values == 1]
+        instance = self.instance
+        class_names = instance.class_names + (self.electives.group_names if self.electives is not None else [])
+
+        results = []
+        lessons = [] # (slots, pool, result dicts) of every lesson for the room assignment
+        for c, s, t, first_slot, room in chosen.tolist():
+            # A lesson of several slots is one lesson dict per slot
+            slots = list(range(first_slot, first_slot + int(instance.block_length[s])))
+            lesson_results = []
+            for slot in slots:
+                day, lesson_index = instance.slot_name(slot)
+                lesson_results.append({
+                    "subject": instance.subject_names[s],
+                    "teacher": instance.teacher_names[t],
+                    "class": class_names[c],
+                    "day": day,
+                    "lesson_index": lesson_index,
+                    "classroom": instance.room_numbers[room] if self.room_pools is None else None
+                })
+            results += lesson_results
+            lessons.append((slots, room, lesson_results))
+        if self.room_pools is not None:
+            assign_rooms(lessons, self.room_pools, instance)
+        return results
 
-run = Run()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a school schedule from the JSON files in data/")
+    parser.add_argument("--room-pools", action="store_true",
+                        help="model interchangeable classrooms (same capacity and specialties) as capacity pools")
+    parser.add_argument("--stream", action="store_true",
+                        help="write every improving solution to data/out/generated.json while solving")
+    parser.add_argument("--stop-after-first", action="store_true", help="stop at the first feasible schedule")
+    parser.add_argument("--stop-at-gap", type=float, default=None,
+                        help="stop once the relative gap between objective and best bound is at most this value")
+    parser.add_argument("--stop-after-seconds", type=float, default=None,
+                        help="stop at the first improving schedule found after this many seconds of search")
+    parser.add_argument("--warm-start", nargs="?", const=generatedFile, default=None, metavar="PREVIOUS_JSON",
+                        help="use a previous schedule (default: data/out/generated.json) as solution hint")
+    parser.add_argument("--minimise-changes", type=int, default=0, metavar="WEIGHT",
+                        help="with --warm-start: objective penalty for every previous lesson that is not kept")
+    parser.add_argument("--no-cache", action="store_true", help="do not reuse or store cached models and schedules")
+    parser.add_argument("--cache-size-mb", type=int, default=256, help="size limit of the cache in data/cache")
+    parser.add_argument("--time-limit", type=float, default=None, help="solver time limit in seconds")
+    parser.add_argument("--workers", type=int, default=None, help="CP-SAT search workers per solve (default: all cores, at least 4)")
+    parser.add_argument("--seed", type=int, default=None, help="random seed of the search")
+    parser.add_argument("--portfolio", type=int, default=None, metavar="N",
+                        help="solve with N differently seeded searches in separate processes and keep the best")
+    parser.add_argument("--no-stop-at-optimum", action="store_true",
+                        help="with --portfolio: let every search run to its time limit")
+    parser.add_argument("--electives", nargs="?", const=studentsFile, default=None, metavar="STUDENTS_JSON",
+                        help="also schedule elective groups for the students in STUDENTS_JSON (default: data/students.json)")
+    parser.add_argument("--lns", action="store_true",
+                        help="improve a first schedule by re-solving one day, year group, teacher or room cluster at a time")
+    parser.add_argument("--explain", nargs="?", const="core", default=None, choices=["core", "minimal"],
+                        help="when the schedule is infeasible, name a set of constraints that cannot all hold (minimal: shrink it to a minimal set)")
+    parser.add_argument("--formulation", default="linear", choices=FORMULATIONS,
+                        help="linear sums (default), native at-most-one constraints or NoOverlap over lesson intervals, see formulation.py")
+    parser.add_argument("--no-symmetry-breaking", action="store_true",
+                        help="do not order interchangeable classes and teachers (identical subjects, rooms and availability)")
+    parser.add_argument("--data-folder", default=dataFolder, help="folder with the input files (default: data)")
+    parser.add_argument("--output", default=generatedFile, help="schedule file to write (default: data/out/generated.json)")
+    parser.add_argument("--lns-step-time", type=float, default=None, help="with --lns: time limit of every re-solve in seconds")
+    args = parser.parse_args()
+    cache = None if args.no_cache else ScheduleCache(max_bytes=args.cache_size_mb * 1024 * 1024)
+    solver_parameters = {"time_limit": args.time_limit, "num_workers": args.workers, "random_seed": args.seed,
+                         "portfolio": args.portfolio, "stop_at_optimum": False if args.no_stop_at_optimum else None,
+                         "lns": True if args.lns else None, "lns_step_time": args.lns_step_time}
+    try:
+        run = Run(room_pools=args.room_pools, data_folder=args.data_folder, output_file=args.output, stream=args.stream, warm_start=args.warm_start, minimise_changes=args.minimise_changes,
+                  solver_parameters=solver_parameters, cache=cache, electives=args.electives,
+                  explain=args.explain, symmetry_breaking=not args.no_symmetry_breaking, formulation=args.formulation)
+    except DataError as e:
+        print(f'Invalid input: {e}', file=sys.stderr)
+        sys.exit(1)
+    run.solve(stop_when=stop_condition(args.stop_after_first, args.stop_at_gap, args.stop_after_seconds))
@@ -0,0 +1,286 @@
+import sys
+import os
+import json
+import time
+import uuid
+import shutil
+import asyncio
+import argparse
+import threading
+from enum import Enum
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+from cache import ScheduleCache
+from loader import DataError
+from streaming import stop_condition
+from datastructure import dataFolder
+from workspace import PREVIOUS_FILE, STUDENTS_FILE, Workspace, create_workspace, job_inputs, jobsFolder, remove_output, remove_workspace
+# Imported once when the service starts, so jobs do not pay the OR-Tools import cost
+from run import Run
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Run options a client may set when submitting a job. electives is a boolean here: true schedules the students of the
+# inputs (or data/students.json) as they were at submit time. warm_start is the ID of a finished job to re-solve from,
+# or true for data/out/generated.json (the latest run.py schedule).
+JOB_OPTIONS = {"room_pools", "warm_start", "minimise_changes", "electives", "explain", "symmetry_breaking", "formulation"}
+# Solver parameters a client may set, see parameters.py
+JOB_SOLVER_OPTIONS = {"time_limit", "num_workers", "random_seed", "portfolio", "stop_at_optimum", "lns", "lns_step_time"}
+# Criteria that end the search early with the best schedule so far, see stop_condition in streaming.py
+JOB_STOP_OPTIONS = {"stop_after_first", "stop_at_gap", "stop_after_seconds"}
+
+class JobStatus(Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+class Job:
+    id: str
+    options: dict
+    status: JobStatus
+    result: list[dict] | None
+    error: str | None
+
+    def __init__(self, job_id: str, options: dict, workspace: Workspace, cache: ScheduleCache | None = None):
+        self.cache = cache
+        self.id = job_id
+        self.options = options
+        self.workspace = workspace # Inputs and outputs of this job only, see workspace.py
+        self.status = JobStatus.QUEUED
+        self.result = None
+        self.error = None
+        self.solver_status = None
+        self.violations = [] # Failed feasibility pre-checks, see feasibility.py
+        self.warnings = [] # Ignored input, like fixed hours that are not on a lesson slot
+        self.conflict = None # Conflicting constraints of an infeasible job with the explain option, see explain.py
+        self.metrics = None # Phase timings and search statistics, see metrics.py
+        self.build_time = None
+        self.solve_time = None
+        self.progress = None # Event of the latest improving solution, see ScheduleSolutionCallback
+        self.best_result = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.run = None
+        self.cancel_requested = False
+        self.lock = threading.Lock()
+
+    @property
+    def finished_status(self) -> bool:
+        return self.status in (JobStatus.DONE, JobStatus.FAILED, JobStatus.CANCELLED)
+
+    def execute(self) -> None:
+        # Runs in a worker thread; CP-SAT releases the GIL while solving
+        with self.lock:
+            if self.cancel_requested:
+                self.status = JobStatus.CANCELLED
+                return
+            self.status = JobStatus.RUNNING
+            self.started = time.time()
+        try:
+            options = {name: value for name, value in self.options.items() if name in JOB_OPTIONS}
+            options["warm_start"] = self.workspace.input_file(PREVIOUS_FILE) if options.get("warm_start") else None
+            options["electives"] = self.workspace.input_file(STUDENTS_FILE) if options.get("electives") else None
+            solver_parameters = {name: value for name, value in self.options.items() if name in JOB_SOLVER_OPTIONS}
+            run = Run(data_folder=self.workspace.input_folder, output_file=self.workspace.output_file, verbose=False,
+                      cache=self.cache, solver_parameters=solver_parameters, **options)
+            with self.lock:
+                self.run = run
+                cancelled = self.cancel_requested
+            if not cancelled:
+                stop_when = stop_condition(bool(self.options.get("stop_after_first")), self.options.get("stop_at_gap"), self.options.get("stop_after_seconds"))
+                self.result = run.solve(on_solution=self.on_solution, stop_when=stop_when)
+                self.solver_status = run.status_name
+                self.violations = [violation.to_dict() for violation in run.violations]
+                self.warnings = [warning.to_dict() for warning in run.warnings]
+                self.conflict = [assumption.to_dict() for assumption in run.conflict] if run.conflict is not None else None
+                self.solve_time = run.wall_time
+            self.build_time = run.build_time
+            self.metrics = run.metrics.to_dict(run)
+            self.status = JobStatus.CANCELLED if self.cancel_requested else JobStatus.DONE
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self.status = JobStatus.FAILED
+        finally:
+            self.finished = time.time()
+            self.run = None
+
+    def on_solution(self, event: dict, lessons: list[dict]) -> None:
+        self.progress = event
+        self.best_result = lessons
+
+    def cancel(self) -> None:
+        with self.lock:
+            self.cancel_requested = True
+            if self.status == JobStatus.QUEUED:
+                self.status = JobStatus.CANCELLED
+                self.finished = time.time()
+            elif self.run is not None:
+                # Stops the running solve; the best solution found so far is kept as the result
+                self.run.stop()
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status.value,
+            "options": self.options,
+            "inputs": self.workspace.key,
+            # Folders of the job relative to data/, the backend serves the job's schedule from its output folder
+            "input_folder": os.path.relpath(self.workspace.input_folder, dataFolder),
+            "output_folder": os.path.relpath(self.workspace.output_folder, dataFolder),
+            "solver_status": self.solver_status,
+            "violations": self.violations,
+            "warnings": self.warnings,
+            "conflict": self.conflict,
+            "build_time": self.build_time,
+            "solve_time": self.solve_time,
+            "lessons": len(self.result) if self.result is not None else None,
+            "progress": self.progress,
+            "error": self.error,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+class SolverService:
+    # Long-lived scheduling service: clients submit jobs over a local socket (one JSON request and
+    # one JSON response per line), at most max_concurrent jobs solve at the same time and at most
+    # queue_size jobs wait for a free worker. Every job has a workspace in jobs_folder, which is removed with the last
+    # job that uses it.
+    def __init__(self, max_concurrent: int = 1, queue_size: int = 16, keep_finished: int = 100, cache: ScheduleCache | None = None,
+                 jobs_folder: str = jobsFolder):
+        self.cache = cache # Shared by all jobs
+        self.jobs_folder = jobs_folder
+        self.max_concurrent = max_concurrent
+        self.keep_finished = keep_finished
+        self.jobs = {}
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="solver")
+
+    async def worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            try:
+                if job.status == JobStatus.QUEUED:
+                    await loop.run_in_executor(self.executor, job.execute)
+            finally:
+                self.queue.task_done()
+                self.forget_finished_jobs()
+
+    def forget_finished_jobs(self) -> None:
+        finished = [job for job in self.jobs.values() if job.finished_status]
+        for job in sorted(finished, key=lambda j: j.finished)[:max(0, len(finished) - self.keep_finished)]:
+            del self.jobs[job.id]
+            self.remove_workspace(job.workspace)
+
+    def remove_workspace(self, workspace: Workspace) -> None:
+        # The output of a job that is forgotten, and its inputs too when no remaining job has the same inputs
+        if any(job.workspace.key == workspace.key for job in self.jobs.values()):
+            remove_output(workspace)
+        else:
+            remove_workspace(workspace)
+
+    def submit(self, request: dict) -> dict:
+        options = request.get("options", {})
+        unknown = set(options) - JOB_OPTIONS - JOB_SOLVER_OPTIONS - JOB_STOP_OPTIONS
+        if unknown:
+            return {"success": False, "error": f"Unknown job options: {', '.join(sorted(unknown))}"}
+        # The inputs are copied into the job's own workspace now, so later changes to data/ do not affect the job
+        job_id = uuid.uuid4().hex
+        previous = None
+        if isinstance(options.get("warm_start"), str):
+            source = self.jobs.get(options["warm_start"])
+            if source is None or source.result is None:
+                return {"success": False, "error": f"No schedule of job {options['warm_start']} to warm start from", "code": "unknown_job"}
+            previous = source.result
+        try:
+            files = job_inputs(request.get("inputs"), electives=bool(options.get("electives")), warm_start=bool(options.get("warm_start")), previous=previous)
+            workspace = create_workspace(files, job_id, self.jobs_folder)
+        except DataError as e:
+            return {"success": False, "error": f"Invalid input: {e}", "code": "invalid_input"}
+        except OSError as e:
+            return {"success": False, "error": f"Cannot create the job workspace: {e}"}
+        job = Job(job_id, options, workspace, self.cache)
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.remove_workspace(workspace)
+            return {"success": False, "error": "Job queue is full, try again later", "code": "queue_full"}
+        self.jobs[job.id] = job
+        return {"success": True, "job_id": job.id, "position": self.queue.qsize()}
+
+    def handle_request(self, request: dict) -> dict:
+        op = request.get("op")
+        if op == "submit":
+            return self.submit(request)
+        if op == "health":
+            return {"success": True, "queued": self.queue.qsize(), "max_concurrent": self.max_concurrent,
+                    "running": sum(1 for job in self.jobs.values() if job.status == JobStatus.RUNNING)}
+        if op not in ("status", "cancel", "result", "metrics"):
+            return {"success": False, "error": f"Unknown operation: {op}"}
+
+        job = self.jobs.get(request.get("job_id"))
+        if job is None:
+            return {"success": False, "error": f"Unknown job: {request.get('job_id')}", "code": "unknown_job"}
+        if op == "cancel":
+            job.cancel()
+        if op == "metrics":
+            if job.metrics is None:
+                return {"success": False, "error": "Job has no metrics yet", "code": "not_finished", **job.to_dict()}
+            return {"success": True, "job_id": job.id, "metrics": job.metrics}
+        response = {"success": True, **job.to_dict()}
+        if op == "result":
+            if not job.finished_status:
+                if job.best_result is None:
+                    return {"success": False, "error": "Job has not found a schedule yet", "code": "not_finished", **job.to_dict()}
+                # Best schedule found so far while the solve is still running
+                response["partial"] = True
+                response["result"] = job.best_result
+            else:
+                response["result"] = job.result
+        return response
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                try:
+                    response = self.handle_request(json.loads(line))
+                except (json.JSONDecodeError, AttributeError) as e:
+                    response = {"success": False, "error": f"Invalid request: {e}"}
+                writer.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+        # Jobs only live as long as the service, so workspaces left by an earlier service have no job any more
+        shutil.rmtree(self.jobs_folder, ignore_errors=True)
+        workers = [asyncio.create_task(self.worker()) for _ in range(self.max_concurrent)]
+        server = await asyncio.start_server(self.handle_client, host, port, limit=2 ** 24)
+        print(f"Solver service listening on {host}:{port} ({self.max_concurrent} concurrent solves, queue of {self.queue.maxsize})")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the schedule generator as a long-lived job service")
+    parser.add_argument("--host", default=os.environ.get("SOLVER_SERVICE_HOST", DEFAULT_HOST))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("SOLVER_SERVICE_PORT", DEFAULT_PORT)))
+    parser.add_argument("--max-concurrent", type=int, default=1, help="maximum number of solves running at the same time, every job has its own inputs and outputs")
+    parser.add_argument("--queue-size", type=int, default=16, help="maximum number of jobs waiting for a free worker")
+    parser.add_argument("--no-cache", action="store_true", help="do not reuse or store cached models and schedules")
+    parser.add_argument("--cache-size-mb", type=int, default=256, help="size limit of the cache in data/cache")
+    args = parser.parse_args()
+    cache = None if args.no_cache else ScheduleCache(max_bytes=args.cache_size_mb * 1024 * 1024)
+    service = SolverService(args.max_concurrent, args.queue_size, cache=cache)
+    asyncio.run(service.serve(args.host, args.port))
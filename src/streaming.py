@@ -0,0 +1,103 @@
+import os
+import json
+import time
+import tempfile
+
+from ortools.sat.python import cp_model
+
+# Mode of the files written here: what open() would give under the umask of the process, where mkstemp gives 0600
+UMASK = os.umask(0)
+os.umask(UMASK)
+FILE_MODE = 0o666 & ~UMASK
+
+def replace_file(temp_path: str, file_path: str) -> None:
+    # Moves a finished temporary file over file_path, readable like a file written in place
+    os.chmod(temp_path, FILE_MODE)
+    os.replace(temp_path, file_path)
+
+def write_json_atomic(file_path: str, data, indent: int | None = 2) -> None:
+    # Write to a temporary file in the same folder and rename it over the target, so readers
+    # (e.g. the schedule page) never see a half-written file. indent=None writes without any whitespace.
+    folder = os.path.dirname(os.path.abspath(file_path))
+    os.makedirs(folder, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=folder, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            json.dump(data, file, indent=indent, separators=None if indent is not None else (",", ":"), ensure_ascii=False)
+        replace_file(temp_path, file_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+def progress_file(output_file: str) -> str:
+    # data/out/generated.json -> data/out/generated.progress.json
+    return os.path.splitext(output_file)[0] + ".progress.json"
+
+def relative_gap(event: dict) -> float | None:
+    if event["objective"] is None or event["best_bound"] is None:
+        return None
+    return abs(event["objective"] - event["best_bound"]) / max(1.0, abs(event["objective"]))
+
+def stop_condition(first: bool = False, gap: float | None = None, after_seconds: float | None = None):
+    # Builds a stop_when predicate for Run.solve from the usual "good enough" criteria, or None. after_seconds
+    # stops at the first improving solution found once that many seconds of search have passed.
+    if not first and gap is None and after_seconds is None:
+        return None
+    def stop_when(event: dict) -> bool:
+        if first:
+            return True
+        if gap is not None and event["gap"] is not None and event["gap"] <= gap:
+            return True
+        return after_seconds is not None and event["wall_time"] >= after_seconds
+    return stop_when
+
+class ScheduleSolutionCallback(cp_model.CpSolverSolutionCallback):
+    # Called by CP-SAT for every improving solution. Each solution is turned into lessons and
+    # - written atomically to run.output_file, with the progress history next to it (write=True)
+    # - passed to on_solution(event, lessons)
+    # and the search stops as soon as stop_when(event) returns True.
+    def __init__(self, run, on_solution=None, stop_when=None, write: bool = True):
+        super().__init__()
+        self.run = run
+        self.on_solution = on_solution
+        self.stop_when = stop_when
+        self.write = write and run.output_file is not None
+        self.history = []
+        self.lessons = None
+        self.start = time.perf_counter()
+
+    def on_solution_callback(self) -> None:
+        has_objective = self.run.model.HasObjective()
+        if self.record(self.Response().solution, self.ObjectiveValue() if has_objective else None,
+                       self.BestObjectiveBound() if has_objective else None, self.WallTime()):
+            self.StopSearch()
+
+    def record(self, solution, objective: float | None, best_bound: float | None, wall_time: float) -> bool:
+        # Handles one improving solution, returns True when the search should stop.
+        # Also called by the portfolio for solutions found in its worker processes.
+        self.lessons = self.run.extract_lessons(solution) + self.run.fixed_hour_lessons()
+        event = {
+            "solution": len(self.history) + 1,
+            "objective": objective,
+            "best_bound": best_bound,
+            "wall_time": wall_time,
+            "elapsed": time.perf_counter() - self.start,
+            "lessons": len(self.lessons),
+        }
+        event["gap"] = relative_gap(event)
+        self.history.append(event)
+
+        if self.write:
+            write_json_atomic(self.run.output_file, self.lessons)
+            write_json_atomic(progress_file(self.run.output_file), {"final": False, "history": self.history})
+        if self.on_solution is not None:
+            self.on_solution(event, self.lessons)
+        if self.stop_when is not None and self.stop_when(event):
+            self.run.stopped = True
+            return True
+        return False
+
+    def finish(self, status_name: str) -> None:
+        # Marks the progress history as complete once the solve has ended
+        if self.write:
+            write_json_atomic(progress_file(self.run.output_file), {"final": True, "status": status_name, "history": self.history})
@@ -0,0 +1,59 @@
+import numpy as np
+
+from ortools.sat.python import cp_model
+
+# Columns of Run.lesson_keys: (class, subject, teacher, slot, room)
+CLASS_COLUMN = 0
+TEACHER_COLUMN = 2
+
+def interchangeable(lesson_keys: np.ndarray, column: int, entities: list[int]) -> list[list[int]]:
+    # Groups of two or more of entities whose lesson variables are the same apart from the entity itself: same
+    # subjects, rooms, qualified teachers / classes and available slots. Swapping two of them maps every schedule
+    # to another one with the same objective value, as every objective treats all classes and teachers alike.
+    others = np.delete(lesson_keys, column, axis=1)
+    groups = {}
+    for entity in entities:
+        rows = others[lesson_keys[:, column] == entity]
+        if not len(rows):
+            continue
+        rows = rows[np.lexsort(rows.T[::-1])]
+        groups.setdefault((len(rows), rows.tobytes()), []).append(entity)
+    return [group for group in groups.values() if len(group) > 1]
+
+def occupation_vectors(lesson_keys: np.ndarray, lesson_vars: list, column: int, entities: list[int]) -> dict[int, list]:
+    # Per entity, its lessons of every subject in every slot as a list of 0/1 expressions, ordered by slot and subject.
+    # The vector of a class does not change when teachers are swapped and the vector of a teacher does not change when
+    # classes are swapped, so ordering both never excludes every schedule of a symmetry class.
+    wanted = set(entities)
+    vectors = {}
+    for (c, s, t, slot, room), var in zip(lesson_keys.tolist(), lesson_vars):
+        entity = (c, s, t, slot, room)[column]
+        if entity in wanted:
+            vectors.setdefault(entity, {}).setdefault((slot, s), []).append(var)
+    return {entity: [cp_model.LinearExpr.Sum(cells[position]) for position in sorted(cells)] for entity, cells in vectors.items()}
+
+def add_lex_greater_equal(model: cp_model.CpModel, first: list, second: list, name: str) -> None:
+    # first >= second lexicographically. equal is 1 while the vectors may still be equal before position i;
+    # it is only bounded from below, the solver can always set it to 0 once they differ.
+    equal = None # Always true at position 0
+    for i, (a, b) in enumerate(zip(first, second)):
+        enforced = [equal] if equal is not None else []
+        model.Add(a >= b).OnlyEnforceIf(enforced)
+        if i == len(first) - 1:
+            break
+        next_equal = model.NewBoolVar(f'{name}_equal_{i}')
+        # a == b at i keeps the vectors equal up to i + 1
+        model.Add(next_equal >= 1 - a + b).OnlyEnforceIf(enforced)
+        equal = next_equal
+
+def add_symmetry_breaking(model: cp_model.CpModel, lesson_keys: np.ndarray, lesson_vars: list, classes: list[int], teachers: list[int]) -> dict:
+    # Orders every group of interchangeable classes and teachers by their lessons, so the search only explores one
+    # of their permutations. Returns the groups, as IDs, by "classes" and "teachers".
+    groups = {}
+    for kind, column, entities in (("classes", CLASS_COLUMN, classes), ("teachers", TEACHER_COLUMN, teachers)):
+        groups[kind] = interchangeable(lesson_keys, column, entities)
+        vectors = occupation_vectors(lesson_keys, lesson_vars, column, [entity for group in groups[kind] for entity in group])
+        for group in groups[kind]:
+            for first, second in zip(group, group[1:]):
+                add_lex_greater_equal(model, vectors[first], vectors[second], f'symmetry_{kind}_{first}_{second}')
+    return groups
@@ -0,0 +1,97 @@
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import datetime
+import contextlib
+import multiprocessing
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+from gendata import DATA_DIR, REFERENCE_DIR, REFERENCE_INSTANCES, write_reference_instances
+
+try:
+	import resource
+except ImportError:  # Not available on Windows
+	resource = None
+
+RESULTS_DIR = os.path.join(DATA_DIR, "results")
+
+def peak_rss_mb():
+	if resource is None:
+		return None
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	# ru_maxrss is in kilobytes on Linux and in bytes on macOS
+	return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run_instance(folder, room_pools=False, time_limit=None, formulation="linear"):
+	# Runs in a fresh process (see benchmark_instance), so the peak RSS belongs to this instance only
+	from run import Run
+
+	with contextlib.redirect_stdout(io.StringIO()):
+		run = Run(room_pools=room_pools, data_folder=folder, output_file=None, solver_parameters={"time_limit": time_limit},
+				  formulation=formulation)
+		proto = run.model.Proto()
+		variables, constraints = len(proto.variables), len(proto.constraints)
+		results = run.solve()
+
+	return {
+		"instance": os.path.basename(os.path.normpath(folder)),
+		"classes": len(run.instance.class_names),
+		"teachers": len(run.instance.teacher_names),
+		"rooms": len(run.instance.room_numbers),
+		"required_lessons": int(sum(run.instance.required_hours[s] for s in run.instance.class_subject.nonzero()[1])),
+		"build_time": run.build_time,
+		"variables": variables,
+		"constraints": constraints,
+		"peak_rss_mb": peak_rss_mb(),
+		"solve_time": run.wall_time,
+		"objective": run.objective_value,
+		"best_bound": run.best_bound,
+		"status": run.status_name,
+		"lessons": len(results),
+	}
+
+def benchmark_instance(folder, room_pools=False, time_limit=None, formulation="linear"):
+	context = multiprocessing.get_context("spawn")
+	with context.Pool(1) as pool:
+		return pool.apply(run_instance, (folder, room_pools, time_limit, formulation))
+
+def main():
+	parser = argparse.ArgumentParser(description="Benchmark Run on the seeded reference instances")
+	parser.add_argument("instances", nargs="*", help="reference instance names or instance folders (default: all reference instances)")
+	parser.add_argument("--room-pools", action="store_true", help="benchmark the room-pool mode")
+	parser.add_argument("--formulation", default="linear", choices=["linear", "boolean", "interval"], help="constraint formulation to benchmark, see src/formulation.py")
+	parser.add_argument("--time-limit", type=float, default=None, help="solver time limit per instance, in seconds")
+	parser.add_argument("--output", default=None, help="results file (default: data/training/results/benchmark-<timestamp>.json)")
+	args = parser.parse_args()
+
+	names = [name for name in args.instances if name in REFERENCE_INSTANCES]
+	folders = [folder for folder in args.instances if folder not in REFERENCE_INSTANCES]
+	if names or not folders:
+		# Reference instances are generated from their seeds, so they are identical on every machine
+		write_reference_instances(names)
+		folders = [os.path.join(REFERENCE_DIR, name) for name in (names or REFERENCE_INSTANCES)] + folders
+
+	results = []
+	for folder in folders:
+		start = time.perf_counter()
+		result = benchmark_instance(folder, args.room_pools, args.time_limit, args.formulation)
+		result["total_time"] = time.perf_counter() - start
+		results.append(result)
+		print(f'{result["instance"]}: {result["status"]}, build {result["build_time"]:.2f}s, solve {result["solve_time"]:.2f}s, '
+			  f'{result["variables"]} variables, {result["constraints"]} constraints, peak RSS {result["peak_rss_mb"]} MB')
+
+	output = args.output or os.path.join(RESULTS_DIR, f"benchmark-{datetime.datetime.now():%Y%m%d-%H%M%S}.json")
+	os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+	with open(output, "w") as file:
+		json.dump({
+			"created": datetime.datetime.now().isoformat(timespec="seconds"),
+			"settings": {"room_pools": args.room_pools, "time_limit": args.time_limit, "formulation": args.formulation},
+			"results": results,
+		}, file, indent=4)
+	print(f"Benchmark results written to {output}")
+
+if __name__ == "__main__":
+	main()
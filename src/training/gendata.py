@@ -3,118 +3,200 @@ import random
 import datetime
 import json
 import sys
+import argparse
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 from src.datastructure import (
 	ClassroomSpecialties, ClassroomDataStructure, SubjectDataStructure,
-	TeachersDataStructure, StudentDataStructure, ClassDataStructure,
-	CommonDataStructure, Days, Level, Profile, Type, HourType,
+	TeachersDataStructure, ClassDataStructure,
+	CommonDataStructure, FixedHourDataStructure, Days, Level, Type, HourType,
 	save_json_file
 )
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), '../../data/training/')
 os.makedirs(DATA_DIR, exist_ok=True)
 
-def random_name(prefix, idx):
-	return f"{prefix}_{idx}"  # Simple name generator
+# Subjects of a Dutch secondary school: (name, abbreviation, hours per week, required classroom specialties)
+SCHOOL_SUBJECTS = [
+	("Nederlands", "NE", 3, []),
+	("Engels", "EN", 3, []),
+	("Wiskunde", "WI", 3, []),
+	("Geschiedenis", "GS", 2, []),
+	("Aardrijkskunde", "AK", 2, []),
+	("Frans", "FA", 2, []),
+	("Duits", "DU", 2, []),
+	("Economie", "EC", 2, []),
+	("Biologie", "BI", 2, [ClassroomSpecialties.SCIENCE]),
+	("Natuurkunde", "NA", 2, [ClassroomSpecialties.SCIENCE]),
+	("Scheikunde", "SK", 2, [ClassroomSpecialties.SCIENCE]),
+	("Informatica", "IF", 2, [ClassroomSpecialties.COMPUTERS]),
+	("Lichamelijke opvoeding", "LO", 2, [ClassroomSpecialties.GYM]),
+	("Kunst", "KU", 1, [ClassroomSpecialties.ART]),
+	("Muziek", "MU", 1, [ClassroomSpecialties.MUSIC]),
+]
+BASE_SUBJECTS = ["Nederlands", "Engels", "Wiskunde", "Lichamelijke opvoeding"]
+LOWER_YEAR_SUBJECTS = ["Geschiedenis", "Aardrijkskunde", "Frans", "Biologie", "Kunst", "Muziek"]
+UPPER_YEAR_ELECTIVES = ["Geschiedenis", "Aardrijkskunde", "Frans", "Duits", "Economie", "Biologie", "Natuurkunde", "Scheikunde", "Informatica"]
+YEARS_PER_LEVEL = {Level.MAVO: 4, Level.HAVO: 5, Level.VWO: 6}
+LESSONS_PER_DAY = 8
+RECESS_AFTER = {2: 15, 5: 30}  # lesson number -> minutes of recess after it
+
+# Fixed set of seeded instances used by the benchmark: name -> generate_school arguments
+REFERENCE_INSTANCES = {
+	"classes_005": {"num_classes": 5, "tightness": 0.6, "seed": 5},
+	"classes_010": {"num_classes": 10, "tightness": 0.7, "seed": 10},
+	"classes_025": {"num_classes": 25, "tightness": 0.7, "seed": 25},
+	"classes_050": {"num_classes": 50, "tightness": 0.75, "seed": 50},
+	"classes_100": {"num_classes": 100, "tightness": 0.75, "seed": 100},
+	"classes_025_tight": {"num_classes": 25, "tightness": 0.9, "seed": 26},
+}
+REFERENCE_DIR = os.path.join(DATA_DIR, "reference")
+
+def generate_school_common(generation_type=Type.BALANCED):
+	# 5 days of LESSONS_PER_DAY lessons of 45 minutes, with the recesses from RECESS_AFTER
+	common = CommonDataStructure()
+	for day in Days:
+		start = datetime.datetime(2000, 1, 1, 8, 30)
+		for lesson in range(1, LESSONS_PER_DAY + 1):
+			end = start + datetime.timedelta(minutes=45)
+			common.hours.append((HourType.LESSON, day, start.time(), end.time()))
+			start = end + datetime.timedelta(minutes=5)
+			if lesson in RECESS_AFTER:
+				end = start + datetime.timedelta(minutes=RECESS_AFTER[lesson])
+				common.hours.append((HourType.RECESS, day, start.time(), end.time()))
+				start = end
+	common.preferredOddHoursEnabled = False
+	common.generationType = generation_type
+	return common.to_dict()
+
+def generate_school(num_classes=10, tightness=0.7, seed=0, generation_type=Type.BALANCED):
+	# Parameterised Dutch-school instance. tightness (0, 1] is the ratio between the lesson demand and
+	# the supply of qualified teacher-hours and (specialty) room-hours: higher is harder to schedule.
+	rng = random.Random(seed)
+	slots_per_week = LESSONS_PER_DAY * len(Days)
+	subject_info = {name: (abbreviation, hours, specialties) for name, abbreviation, hours, specialties in SCHOOL_SUBJECTS}
 
-def generate_classrooms(n=5):
-	classrooms = []
-	for i in range(n):
-		c = ClassroomDataStructure()
-		c.number = i + 1
-		c.capacity = random.randint(20, 35)
-		c.specialties = random.sample(list(ClassroomSpecialties), k=random.randint(1, 3))
-		classrooms.append(c.to_dict())
-	return classrooms
-
-def generate_subjects(n=8):
-	subject_names = ["Math", "English", "Biology", "Chemistry", "History", "Art", "Music", "PE"]
 	subjects = []
-	for i in range(n):
+	for name, abbreviation, hours, specialties in SCHOOL_SUBJECTS:
 		s = SubjectDataStructure()
-		s.name = subject_names[i % len(subject_names)]
-		s.abbreviation = s.name[:3].upper()
-		s.requiredHours = random.randint(2, 5)
-		s.coreSubject = i < 4
-		s.requiredClassroomParameters = [random.choice(list(ClassroomSpecialties)).value]
-		subjects.append(s.to_dict())
-	return subjects
-
-def generate_teachers(n=6, subject_abbrs=None):
-	if subject_abbrs is None:
-		subject_abbrs = ["MAT", "ENG", "BIO", "CHE", "HIS", "ART", "MUS", "PE"]
-	teachers = []
-	for i in range(n):
-		t = TeachersDataStructure()
-		t.name = random_name("Teacher", i)
-		t.abbreviation = f"T{i+1}"
-		t.availability = {d: random.randint(4, 8) for d in Days}
-		t.subjects = random.sample(subject_abbrs, k=min(len(subject_abbrs), random.randint(1, 3)))
-		teachers.append(t.to_dict())
-	return teachers
-
-def generate_students(n=30, class_names=None, subject_abbrs=None):
-	if class_names is None:
-		class_names = ["Class_A", "Class_B", "Class_C"]
-	if subject_abbrs is None:
-		subject_abbrs = ["MAT", "ENG", "BIO", "CHE", "HIS", "ART", "MUS", "PE"]
-	students = []
-	for i in range(n):
-		s = {
-			"name": random_name("Student", i),
-			"className": random.choice(class_names),
-			"profile": random.choice(list(Profile)).value,
-			"studentNumber": f"S{i+1:03d}",
-			"preferredOddHours": random.sample(range(1, 8), k=random.randint(0, 3)),
-			"subjects": random.sample(subject_abbrs, k=min(len(subject_abbrs), random.randint(3, 6)))
-		}
-		students.append(s)
-	return students
-
-def generate_classes(n=3, students=None, subject_abbrs=None):
-	if subject_abbrs is None:
-		subject_abbrs = ["MAT", "ENG", "BIO", "CHE"]
+		s.name = name
+		s.abbreviation = abbreviation
+		s.requiredHours = hours
+		s.coreSubject = name in BASE_SUBJECTS
+		s.requiredClassroomParameters = [specialty.value for specialty in specialties]
+		subjects.append(s)
+
+	combos = [(level, year) for level in Level for year in range(1, YEARS_PER_LEVEL[level] + 1)]
 	classes = []
-	for i in range(n):
+	for i in range(num_classes):
+		level, year = combos[i % len(combos)]
 		c = ClassDataStructure()
-		c.name = f"Class_{chr(65+i)}"
-		c.year = (random.choice(list(Level)), random.randint(1, 6), i+1)
-		c.tutor = f"T{i+1}"
-		c.coreSubjects = subject_abbrs[:4]
-		# Assign students to class (not used in dict)
-		c.students = [StudentDataStructure() for _ in range(0)]
-		classes.append(c.to_dict())
-	return classes
-
-def generate_common():
-	common = CommonDataStructure()
-	# Generate 7 hours per day, 5 days
-	for day in Days:
-		for h in range(8, 15):
-			start = datetime.time(h, 0)
-			end = datetime.time(h+1, 0)
-			common.hours.append((HourType.LESSON, day, start, end))
-	common.preferredOddHoursEnabled = True
-	common.generationType = Type.BALANCED
-	return common.to_dict()
+		c.year = (level, year, i // len(combos) + 1)
+		c.name = f"{year}{level.value[0].upper()}{c.year[2]}"
+		if year <= 2:
+			c.coreSubjects = BASE_SUBJECTS + LOWER_YEAR_SUBJECTS
+		else:
+			c.coreSubjects = BASE_SUBJECTS + rng.sample(UPPER_YEAR_ELECTIVES, 5)
+		classes.append(c)
+
+	demand = {name: 0 for name in subject_info}
+	for c in classes:
+		for subject in c.coreSubjects:
+			demand[subject] += subject_info[subject][1]
+
+	# Hire teachers per subject until the available teacher-hours cover demand / tightness
+	teachers = []
+	for name, (abbreviation, _, _) in subject_info.items():
+		supply = 0
+		while supply < demand[name] / tightness:
+			t = TeachersDataStructure()
+			index = sum(1 for other in teachers if other.subjects[0] == name) + 1
+			t.name = f"Docent {abbreviation} {index}"
+			t.abbreviation = f"{abbreviation}{index}"
+			t.subjects = [name]
+			if rng.random() < 0.2:
+				t.subjects.append(rng.choice([other for other in subject_info if other != name]))
+			working_days = rng.sample(list(Days), k=rng.randint(3, len(Days)))
+			t.availability = {day: list(range(1, LESSONS_PER_DAY + 1)) for day in Days if day in working_days}
+			supply += len(working_days) * LESSONS_PER_DAY
+			teachers.append(t)
+	for c in classes:
+		c.tutor = rng.choice(teachers).abbreviation
+
+	# Rooms per specialty (general rooms have none) so that the room-hours cover demand / tightness
+	room_demand = {}
+	for name, (_, _, specialties) in subject_info.items():
+		key = specialties[0] if specialties else None
+		room_demand[key] = room_demand.get(key, 0) + demand[name]
+	classrooms = []
+	for key, hours in room_demand.items():
+		for _ in range(max(1, -(-hours // int(slots_per_week * tightness)))):
+			cr = ClassroomDataStructure()
+			cr.number = 100 * (len(classrooms) // 20 + 1) + len(classrooms) % 20 + 1
+			cr.capacity = rng.choice([28, 30, 32])
+			cr.specialties = [key] if key is not None else []
+			classrooms.append(cr)
+
+	fixed_hours = []
+	general_rooms = [cr.number for cr in classrooms if not cr.specialties]
+	for i in range(max(1, num_classes // 10)):
+		fh = FixedHourDataStructure()
+		fh.day = rng.choice(list(Days)).value.capitalize()
+		fh.hour = rng.randint(1, LESSONS_PER_DAY)
+		fh.name = f"Teamoverleg {i + 1}"
+		fh.classroomID = rng.choice(general_rooms)
+		fixed_hours.append(fh)
+
+	# Drawn last so the rest of an instance does not change with the class sizes. A class fits every room it can need:
+	# its size is at most the smallest capacity among the rooms of the specialties of its subjects
+	smallest_room = {}
+	for cr in classrooms:
+		key = cr.specialties[0] if cr.specialties else None
+		smallest_room[key] = min(smallest_room.get(key, cr.capacity), cr.capacity)
+	for c in classes:
+		keys = {subject_info[subject][2][0] if subject_info[subject][2] else None for subject in c.coreSubjects}
+		c.size = rng.randint(20, min(smallest_room[key] for key in keys))
+
+	return {
+		"teachers": [t.to_dict() for t in teachers],
+		"classes": [c.to_dict() for c in classes],
+		"subjects": [s.to_dict() for s in subjects],
+		"classrooms": [cr.to_dict() for cr in classrooms],
+		"fixed_hours": [fh.to_dict() for fh in fixed_hours],
+		"common": generate_school_common(generation_type),
+	}
+
+def write_instance(folder, instance):
+	# Writes the files run.py reads (teachers.json, classes.json, ...) to folder
+	os.makedirs(folder, exist_ok=True)
+	for name, data in instance.items():
+		save_json_file(os.path.join(folder, f"{name}.json"), data)
+
+def write_reference_instances(names=None, folder=REFERENCE_DIR):
+	folders = []
+	for name, arguments in REFERENCE_INSTANCES.items():
+		if names and name not in names:
+			continue
+		folders.append(os.path.join(folder, name))
+		write_instance(folders[-1], generate_school(**arguments))
+	return folders
 
 def main():
-	classrooms = generate_classrooms()
-	subjects = generate_subjects()
-	subject_abbrs = [s["abbreviation"] for s in subjects]
-	teachers = generate_teachers(subject_abbrs=subject_abbrs)
-	class_names = [f"Class_{chr(65+i)}" for i in range(3)]
-	students = generate_students(class_names=class_names, subject_abbrs=subject_abbrs)
-	classes = generate_classes(students=students, subject_abbrs=subject_abbrs)
-	common = generate_common()
-
-	save_json_file(os.path.join(DATA_DIR, "classrooms.json"), classrooms)
-	save_json_file(os.path.join(DATA_DIR, "subjects.json"), subjects)
-	save_json_file(os.path.join(DATA_DIR, "teachers.json"), teachers)
-	save_json_file(os.path.join(DATA_DIR, "students.json"), students)
-	save_json_file(os.path.join(DATA_DIR, "classes.json"), classes)
-	save_json_file(os.path.join(DATA_DIR, "common.json"), common)
-	print(f"Synthetic data generated in {DATA_DIR}")
+	parser = argparse.ArgumentParser(description="Generate synthetic school instances")
+	parser.add_argument("--classes", type=int, default=10, help="number of classes")
+	parser.add_argument("--tightness", type=float, default=0.7, help="lesson demand / teacher and room supply, in (0, 1]")
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--generation-type", default=Type.BALANCED.value, choices=[t.value for t in Type])
+	parser.add_argument("--output", default=DATA_DIR, help="folder to write the instance to")
+	parser.add_argument("--reference", action="store_true", help="write the seeded reference instances instead")
+	args = parser.parse_args()
+
+	if args.reference:
+		for folder in write_reference_instances():
+			print(f"Reference instance generated in {folder}")
+		return
+	instance = generate_school(args.classes, args.tightness, args.seed, Type(args.generation_type))
+	write_instance(args.output, instance)
+	print(f"Synthetic data generated in {args.output}")
 
 if __name__ == "__main__":
 	main()
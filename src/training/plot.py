@@ -1,5 +1,60 @@
 import matplotlib.pyplot as plt
 import sys
 import os
+import json
+import argparse
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-import src.datastructure as ds
\ No newline at end of file
+import src.datastructure as ds
+
+# (results key, axis label) of every scaling curve, plotted against the number of required lessons
+CURVES = [
+	("build_time", "Model build time (s)"),
+	("solve_time", "Solve time (s)"),
+	("variables", "Variables"),
+	("constraints", "Constraints"),
+	("peak_rss_mb", "Peak RSS (MB)"),
+	("objective", "Objective"),
+]
+
+def load_results(path):
+	with open(path, "r") as file:
+		return json.load(file)
+
+def plot_results(paths, output):
+	fig, axes = plt.subplots(2, 3, figsize=(15, 8))
+	for path in paths:
+		data = load_results(path)
+		label = os.path.splitext(os.path.basename(path))[0]
+		if data.get("settings", {}).get("room_pools"):
+			label += " (room pools)"
+		if data.get("settings", {}).get("formulation", "linear") != "linear":
+			label += f' ({data["settings"]["formulation"]})'
+		results = sorted(data["results"], key=lambda r: r["required_lessons"])
+		for ax, (key, title) in zip(axes.flat, CURVES):
+			points = [(r["required_lessons"], r[key]) for r in results if r.get(key) is not None]
+			if points:
+				ax.plot(*zip(*points), marker="o", label=label)
+	for ax, (key, title) in zip(axes.flat, CURVES):
+		ax.set_title(title)
+		ax.set_xlabel("Required lessons")
+		ax.grid(True, alpha=0.3)
+	axes.flat[0].legend()
+	fig.tight_layout()
+	fig.savefig(output)
+	return fig
+
+def main():
+	parser = argparse.ArgumentParser(description="Plot scaling curves from benchmark.py results")
+	parser.add_argument("results", nargs="+", help="benchmark results files, one curve per file")
+	parser.add_argument("--output", default=None, help="image file (default: next to the first results file)")
+	parser.add_argument("--show", action="store_true", help="also open the plot in a window")
+	args = parser.parse_args()
+
+	output = args.output or os.path.splitext(args.results[0])[0] + ".png"
+	plot_results(args.results, output)
+	print(f"Plot written to {output}")
+	if args.show:
+		plt.show()
+
+if __name__ == "__main__":
+	main()
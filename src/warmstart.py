@@ -0,0 +1,60 @@
+import os
+
+from datastructure import *
+from instance import ProblemInstance
+from rooms import RoomPool
+
+def load_previous_schedule(file_path: str) -> list[dict]:
+    # The lessons of an earlier generated.json, or nothing when there is no (readable) previous schedule
+    if not os.path.exists(file_path):
+        return []
+    try:
+        lessons = load_json_file(file_path)
+    except (OSError, ValueError):
+        return []
+    return lessons if isinstance(lessons, list) else []
+
+def previous_lesson_keys(instance: ProblemInstance, lessons: list[dict], room_pools: list[RoomPool] | None,
+                         class_ids: dict[str, int] | None = None) -> list[tuple]:
+    # Maps the lessons of a previous schedule to (class, subject, teacher, slot, room) keys of the new instance.
+    # class_ids maps the class names of the schedule to class IDs of the model (default: instance.class_ids; in
+    # elective mode also the elective groups). Lessons that refer to a class, subject, teacher, slot or room that
+    # no longer exists are dropped; whether the key still has a variable (e.g. the teacher is still available then)
+    # is up to the caller. A lesson of several slots is one lesson per slot in the schedule and one key at its first slot.
+    class_ids = instance.class_ids if class_ids is None else class_ids
+    pool_of_room = {}
+    for p, pool in enumerate(room_pools or []):
+        for room in pool.room_ids:
+            pool_of_room[room] = p
+    day_ids = {day.value: i for i, day in enumerate(instance.days)}
+
+    keys = []
+    blocks = {} # (class, subject, teacher, room) -> slots of the lessons of subjects with a block length
+    for lesson in lessons:
+        try:
+            c = class_ids[lesson["class"]]
+            s = instance.subject_ids[lesson["subject"]]
+            t = instance.teacher_ids[lesson["teacher"]]
+            slot = instance.day_slots[day_ids[lesson["day"]]][lesson["lesson_index"]]
+            room = instance.room_ids[lesson["classroom"]]
+        except (KeyError, IndexError, TypeError):
+            continue
+        room = pool_of_room[room] if room_pools is not None else room
+        if instance.block_length[s] > 1:
+            blocks.setdefault((c, s, t, room), []).append(slot)
+        else:
+            keys.append((c, s, t, slot, room))
+
+    # Consecutive slots in one segment are cut into lessons of block_length slots from the first one on
+    for (c, s, t, room), slots in blocks.items():
+        length = int(instance.block_length[s])
+        previous = None
+        for slot in sorted(set(slots)):
+            if previous is not None and slot == previous + 1 and instance.slot_segment[slot] == instance.slot_segment[previous]:
+                position += 1
+            else:
+                position = 0
+            if position % length == 0:
+                keys.append((c, s, t, slot, room))
+            previous = slot
+    return keys
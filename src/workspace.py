@@ -0,0 +1,87 @@
+import os
+import shutil
+import tempfile
+
+from datastructure import *
+from cache import canonical_hash
+from loader import DATA_FILES, parse_file, profile_data, read_json
+from streaming import write_json_atomic
+
+jobsFolder = os.path.join(dataFolder, "jobs")
+
+# Optional inputs of a job next to the six data files
+STUDENTS_FILE = "students.json"
+PREVIOUS_FILE = "previous.json" # Schedule to warm start from
+
+class Workspace:
+    # Folders of one job: its inputs in data/jobs/<hash of the inputs>/input, written once, read-only and shared by
+    # every job with the same inputs, and its outputs in data/jobs/<hash of the inputs>/runs/<job id>. Nothing is
+    # copied elsewhere: the backend reads the schedule of a job from its output folder.
+    key: str
+    folder: str
+    input_folder: str
+    output_folder: str
+
+    def __init__(self, key: str, job_id: str, folder: str = jobsFolder):
+        self.key = key
+        self.folder = os.path.join(folder, key)
+        self.input_folder = os.path.join(self.folder, "input")
+        self.output_folder = os.path.join(self.folder, "runs", job_id)
+
+    @property
+    def output_file(self) -> str:
+        return os.path.join(self.output_folder, "generated.json")
+
+    def input_file(self, name: str) -> str | None:
+        path = os.path.join(self.input_folder, name)
+        return path if os.path.exists(path) else None
+
+def job_inputs(inputs: dict | None = None, electives: bool = False, warm_start: bool = False, data_folder: str = dataFolder,
+               previous: list[dict] | None = None) -> dict:
+    # The input files of a job by file name: the validated "inputs" of the request (keys like a settings profile,
+    # plus "students" in elective mode), or else the current files of data_folder, read once at submit time.
+    # With warm_start, the previous schedule is previous (the result of an earlier job) or data/out/generated.json.
+    if inputs is not None:
+        files = profile_data(inputs, "inputs")
+    else:
+        files = {name: read_json(os.path.join(data_folder, name), name) for name in DATA_FILES}
+    if electives:
+        if inputs is not None and "students" in inputs:
+            files[STUDENTS_FILE] = inputs["students"]
+        else:
+            files[STUDENTS_FILE] = read_json(os.path.join(data_folder, STUDENTS_FILE), STUDENTS_FILE)
+        parse_file(files[STUDENTS_FILE], "inputs.students", STUDENTS_FILE)
+    previous_file = os.path.join(data_folder, "out", "generated.json")
+    if warm_start and previous is not None:
+        files[PREVIOUS_FILE] = previous
+    elif warm_start and os.path.exists(previous_file):
+        files[PREVIOUS_FILE] = read_json(previous_file, "generated.json")
+    return files
+
+def create_workspace(files: dict, job_id: str, folder: str = jobsFolder) -> Workspace:
+    # Identical inputs share one input folder; it is written to a temporary folder first and renamed into place,
+    # so a job never reads a half-written input and two jobs submitting the same inputs do not clash
+    workspace = Workspace(canonical_hash(files), job_id, folder)
+    if not os.path.isdir(workspace.input_folder):
+        parent = os.path.dirname(workspace.input_folder)
+        os.makedirs(parent, exist_ok=True)
+        temp_folder = tempfile.mkdtemp(dir=parent, prefix=".tmp-")
+        try:
+            for name, data in files.items():
+                write_json_atomic(os.path.join(temp_folder, name), data)
+                os.chmod(os.path.join(temp_folder, name), 0o444)
+            os.rename(temp_folder, workspace.input_folder)
+        except OSError:
+            shutil.rmtree(temp_folder, ignore_errors=True)
+            if not os.path.isdir(workspace.input_folder):
+                raise
+    os.makedirs(workspace.output_folder, exist_ok=True)
+    return workspace
+
+def remove_output(workspace: Workspace) -> None:
+    # The inputs stay, another job may use them
+    shutil.rmtree(workspace.output_folder, ignore_errors=True)
+
+def remove_workspace(workspace: Workspace) -> None:
+    # The inputs and every output of workspace.key, once no job uses them any more
+    shutil.rmtree(workspace.folder, ignore_errors=True)
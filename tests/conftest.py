@@ -0,0 +1,88 @@
+import os
+import sys
+import json
+import shutil
+
+import pytest
+
+# The modules in src/ import each other by name, like when run.py is started from there
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+import loader
+from run import Run
+
+DATA_FOLDER = os.path.join(os.path.dirname(__file__), "data")
+
+# One worker keeps the solves deterministic; the test school solves to optimality well within the limit
+SOLVER_PARAMETERS = {"time_limit": 20, "num_workers": 1}
+
+@pytest.fixture
+def school(tmp_path):
+    # A copy of tests/data that a test may change: 3 classes, 6 teachers and 4 rooms over 2 days of 4 lessons with
+    # a recess after the second one, a double-period subject (Biology), two elective subjects and a fixed hour
+    folder = tmp_path / "data"
+    shutil.copytree(DATA_FOLDER, folder)
+    return folder
+
+@pytest.fixture(autouse=True)
+def snapshots(tmp_path, monkeypatch):
+    # Loader snapshots of the test runs stay out of data/cache
+    monkeypatch.setattr(loader, "snapshotFolder", str(tmp_path / "snapshots"))
+    return tmp_path / "snapshots"
+
+def read(folder, name: str):
+    with open(os.path.join(folder, name), encoding="utf-8") as file:
+        return json.load(file)
+
+def write(folder, name: str, data) -> None:
+    with open(os.path.join(folder, name), "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=2)
+
+def solve(folder, **options) -> tuple[Run, list[dict]]:
+    options = dict({"output_file": str(folder / "out" / "generated.json"), "solver_parameters": SOLVER_PARAMETERS, "verbose": False}, **options)
+    run = Run(data_folder=str(folder), **options)
+    return run, run.solve()
+
+def check_schedule(run: Run, lessons: list[dict]) -> None:
+    # Every requirement of the input against the schedule as written to generated.json
+    instance = run.instance
+    day_ids = {day.value: d for d, day in enumerate(instance.days)}
+    teachers = {teacher.name: teacher for teacher in run.teachers}
+    subjects = {subject.name: subject for subject in run.subjects}
+
+    taken = {}
+    for lesson in lessons:
+        position = (lesson["day"], lesson["lesson_index"])
+        assert lesson["lesson_index"] < len(instance.day_slots[day_ids[lesson["day"]]])
+        assert taken.setdefault(("room", lesson["classroom"]) + position, lesson) is lesson, f'room {lesson["classroom"]} used twice at {position}'
+        if lesson["class"] == "All Classes":
+            continue
+        assert taken.setdefault(("teacher", lesson["teacher"]) + position, lesson) is lesson, f'{lesson["teacher"]} teaches twice at {position}'
+        assert taken.setdefault(("class", lesson["class"]) + position, lesson) is lesson, f'{lesson["class"]} has two lessons at {position}'
+        assert lesson["lesson_index"] + 1 in teachers[lesson["teacher"]].availability.get(lesson["day"], [])
+        assert lesson["subject"] in teachers[lesson["teacher"]].subjects
+
+    for class_obj in run.classes:
+        for name in class_obj.coreSubjects:
+            count = sum(1 for lesson in lessons if lesson["class"] == class_obj.name and lesson["subject"] == name)
+            assert count == subjects[name].requiredHours, f'{class_obj.name} has {count} hours of {name}'
+    if run.electives is not None:
+        for group in run.electives.groups:
+            count = sum(1 for lesson in lessons if lesson["class"] == group.name)
+            assert count == int(instance.required_hours[group.subject])
+
+    # A lesson of several slots is consecutive within one run of lesson slots, with one teacher and room
+    for subject in run.subjects:
+        if subject.blockLength == 1:
+            continue
+        runs = {}
+        for lesson in lessons:
+            if lesson["subject"] == subject.name:
+                slot = instance.day_slots[day_ids[lesson["day"]]][lesson["lesson_index"]]
+                runs.setdefault((lesson["class"], lesson["teacher"], lesson["classroom"]), []).append(slot)
+        for slots in runs.values():
+            slots.sort()
+            for first in range(0, len(slots), subject.blockLength):
+                block = slots[first:first + subject.blockLength]
+                assert block == list(range(block[0], block[0] + subject.blockLength))
+                assert len({int(instance.slot_segment[slot]) for slot in block}) == 1
@@ -0,0 +1,49 @@
+import os
+import json
+
+from batch import profile_files, profile_folders, solve_batch, solve_files, solve_profile, summary_table
+from conftest import SOLVER_PARAMETERS, read
+from loader import PROFILE_KEYS
+
+def profile(folder) -> dict:
+    # The files of folder as a settings profile, like the settings page exports them
+    return {"data": {key: read(folder, name) for name, key in PROFILE_KEYS.items()}}
+
+def test_solve_files(school, tmp_path):
+    files = {name: read(school, name) for name in PROFILE_KEYS}
+    result = solve_files("school", files, str(tmp_path / "school"), SOLVER_PARAMETERS)
+    assert result["status"] == "OPTIMAL" and result["error"] is None
+    assert result["lessons"] == 17 and result["variables"] > 0
+    # The inputs, the schedule, the metrics and the solver output end up in the profile's folder
+    for name in list(PROFILE_KEYS) + ["generated.json", "metrics.json", "run.log"]:
+        assert (tmp_path / "school" / name).exists()
+    assert len(json.loads((tmp_path / "school" / "generated.json").read_text())) == 17
+
+def test_invalid_profile(school, tmp_path):
+    data = profile(school)
+    del data["data"]["classes"]
+    (tmp_path / "broken.json").write_text(json.dumps(data))
+    result = solve_profile(str(tmp_path / "broken.json"), str(tmp_path / "out"), SOLVER_PARAMETERS)
+    assert result["status"] == "INVALID" and "classes" in result["error"]
+
+def test_profile_files_and_folders(tmp_path):
+    (tmp_path / "a").mkdir()
+    for name in ("a/one.json", "a/two.json", "one.json"):
+        (tmp_path / name).write_text("{}")
+    files = profile_files([str(tmp_path / "a"), str(tmp_path / "one.json")])
+    assert [os.path.relpath(path, tmp_path) for path in files] == [os.path.join("a", "one.json"), os.path.join("a", "two.json"), "one.json"]
+    assert [os.path.basename(folder) for folder in profile_folders(files, str(tmp_path / "out"))] == ["one", "two", "one-2"]
+
+def test_solve_batch(school, tmp_path):
+    paths = []
+    for name in ("first", "second"):
+        paths.append(str(tmp_path / f"{name}.json"))
+        (tmp_path / f"{name}.json").write_text(json.dumps(profile(school)))
+    results = solve_batch(paths, str(tmp_path / "batch"), 2, 1, {"time_limit": 20})
+    assert [(result["profile"], result["status"]) for result in results] == [("first.json", "OPTIMAL"), ("second.json", "OPTIMAL")]
+    assert results[0]["objective"] == results[1]["objective"]
+    summary = json.loads((tmp_path / "batch" / "summary.json").read_text())
+    assert summary["settings"]["jobs"] == 2 and summary["settings"]["num_workers"] == 1
+    assert len(summary["results"]) == 2
+    table = summary_table(results).splitlines()
+    assert table[0].split()[:2] == ["Profile", "Status"] and len(table) == 4
@@ -0,0 +1,42 @@
+from ortools.sat.python import cp_model
+
+from conftest import check_schedule, read, solve, write
+
+def test_block_lessons(school):
+    # Biology is a double period: its two hours are consecutive, on one side of the recess
+    run, lessons = solve(school)
+    assert run.status == cp_model.OPTIMAL
+    assert [subject.blockLength for subject in run.subjects if subject.name == "Biology"] == [2]
+    assert any(lesson["subject"] == "Biology" for lesson in lessons)
+    check_schedule(run, lessons)
+
+def test_block_lessons_need_consecutive_slots(school):
+    # Biology only fits as two single hours around the recess, which a double period cannot use
+    teachers = read(school, "teachers.json")
+    for teacher in teachers:
+        if teacher["subjects"] == ["Biology"]:
+            teacher["availability"] = {"monday": [2, 3], "tuesday": [2, 3]}
+    write(school, "teachers.json", teachers)
+    run, _ = solve(school)
+    assert run.status == cp_model.INFEASIBLE
+    assert [violation.check for violation in run.violations] == ["blocks", "blocks"]
+
+def test_explain_block_lessons(school):
+    # Biology fits only in the double period Tuesday hour 1 and 2, and one of the two Math hours only on Tuesday
+    # hour 2. Every pre-check passes, counting the slots per subject and per class; the explainer finds the clash.
+    subjects = read(school, "subjects.json")
+    write(school, "subjects.json", [subject for subject in subjects if subject["name"] in ("Math", "Biology")])
+    classes = read(school, "classes.json")[:1]
+    classes[0]["coreSubjects"] = ["Math", "Biology"]
+    write(school, "classes.json", classes)
+    teachers = read(school, "teachers.json")
+    for teacher in teachers:
+        if teacher["subjects"] == ["Math"]:
+            teacher["availability"] = {"monday": [4], "tuesday": [2]}
+        elif teacher["subjects"] == ["Biology"]:
+            teacher["availability"] = {"tuesday": [1, 2, 3]}
+    write(school, "teachers.json", teachers)
+    run, _ = solve(school, explain="minimal")
+    assert run.violations == []
+    assert run.status == cp_model.INFEASIBLE
+    assert sorted(assumption.kind for assumption in run.conflict) == ["required_hours"] * 2 + ["teacher_availability"] * 3
@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+
+from ortools.sat import cp_model_pb2
+from ortools.sat.python import cp_model
+
+from cache import ScheduleCache
+from conftest import SOLVER_PARAMETERS, check_schedule, solve
+from run import Run
+
+def test_cache(school, tmp_path):
+    cache = ScheduleCache(str(tmp_path / "cache"))
+    first, lessons = solve(school, cache=cache)
+    assert first.cached_result is None
+
+    # Same input and options: the stored schedule
+    hit, cached = solve(school, cache=cache)
+    assert hit.cached_result is not None
+    assert cached == lessons
+    assert hit.status == cp_model.OPTIMAL
+
+    # Other solver parameters: the stored model, solved again
+    run = Run(data_folder=str(school), output_file=None, solver_parameters=dict(SOLVER_PARAMETERS, random_seed=1), verbose=False, cache=cache)
+    assert run.cached_result is None and run.lesson_vars is None
+    lessons = run.solve()
+    assert run.status == cp_model.OPTIMAL
+    assert run.objective_value == first.objective_value
+    check_schedule(run, lessons)
+
+def test_models_are_stored_as_binary_protos(school, tmp_path):
+    cache = ScheduleCache(str(tmp_path / "cache"))
+    run, _ = solve(school, cache=cache)
+    stored = {path.suffix: path for path in (tmp_path / "cache" / "models").iterdir()}
+    assert sorted(stored) == [".npz", ".pb"]
+
+    # Loading gives the built model back, apart from the variable names
+    restored = SimpleNamespace(model=cp_model.CpModel())
+    assert cache.load_model(stored[".pb"].stem, restored)
+    assert (restored.lesson_keys == run.lesson_keys).all()
+    built, loaded = (cp_model_pb2.CpModelProto.FromString(exported(model, tmp_path)) for model in (run.model, restored.model))
+    for variable in built.variables:
+        variable.ClearField("name")
+    assert loaded == built
+
+def exported(model: cp_model.CpModel, folder) -> bytes:
+    model.export_to_file(str(folder / "model.pb"))
+    return (folder / "model.pb").read_bytes()
@@ -0,0 +1,44 @@
+import json
+
+from compact import COMPACT_COLUMNS, compact_file, compact_schedule
+from conftest import solve
+
+def lesson(compact: dict, row: int) -> dict:
+    # One lesson dict back from the columns, as compactScheduleSlice in backend-server.js reads it
+    return {column: compact["columns"][column][row] if column == "lesson_index" else compact["strings"][column][compact["columns"][column][row]]
+            for column in COMPACT_COLUMNS}
+
+def key(lesson: dict) -> tuple:
+    return tuple(lesson[column] for column in COMPACT_COLUMNS)
+
+def test_compact_file_holds_the_schedule(school):
+    _, lessons = solve(school)
+    output_file = str(school / "out" / "generated.json")
+    assert compact_file(output_file) == str(school / "out" / "generated.compact.json")
+    compact = json.loads((school / "out" / "generated.compact.json").read_text())
+    assert compact == compact_schedule(lessons)
+    assert compact["lessons"] == len(lessons)
+    assert sorted(key(lesson(compact, row)) for row in range(compact["lessons"])) == sorted(map(key, lessons))
+
+def test_index_slices(school):
+    _, lessons = solve(school)
+    compact = compact_schedule(lessons)
+    for column in ("class", "teacher", "classroom"):
+        order, offsets = compact["index"][column]["order"], compact["index"][column]["offsets"]
+        assert sorted(order) == list(range(len(lessons))) and offsets[-1] == len(lessons)
+        for i, name in enumerate(compact["strings"][column]):
+            rows = order[offsets[i]:offsets[i + 1]]
+            assert sorted(map(key, (lesson(compact, row) for row in rows))) == sorted(key(item) for item in lessons if item[column] == name)
+
+def test_rows_are_sorted_by_class_day_and_hour():
+    lessons = [
+        {"subject": "Math", "teacher": "Ada", "class": "1B", "day": "monday", "lesson_index": 1, "classroom": 101},
+        {"subject": "Art", "teacher": "Eli", "class": "1A", "day": "tuesday", "lesson_index": 0, "classroom": 102},
+        {"subject": "Math", "teacher": "Ada", "class": "1B", "day": "monday", "lesson_index": 0, "classroom": 101},
+    ]
+    compact = compact_schedule(lessons)
+    # String tables in order of first appearance, rows by the class, day and hour of those tables
+    assert compact["strings"]["class"] == ["1B", "1A"] and compact["strings"]["classroom"] == [101, 102]
+    assert [key(lesson(compact, row)) for row in range(3)] == [key(lessons[2]), key(lessons[0]), key(lessons[1])]
+    assert compact["index"]["teacher"] == {"order": [0, 1, 2], "offsets": [0, 2, 3]}
+    assert compact_schedule([])["lessons"] == 0
@@ -0,0 +1,51 @@
+import json
+
+from ortools.sat.python import cp_model
+
+from conftest import SOLVER_PARAMETERS, check_schedule, read, solve, write
+from decompose import decompose, solve_decomposed
+from instance import compile_instance
+from loader import load_data
+
+def two_schools(folder) -> None:
+    # A second school with its own subjects and teachers is an independent component when the rooms suffice for
+    # both: every room is a science room, and each school can have three lessons at a time
+    for name, key in (("subjects.json", "name"), ("teachers.json", "name"), ("classes.json", "name")):
+        records = read(folder, name)
+        copies = json.loads(json.dumps(records))
+        for record in copies:
+            record[key] += " B"
+            for field in ("subjects", "coreSubjects"):
+                if field in record:
+                    record[field] = [subject + " B" for subject in record[field]]
+        write(folder, name, records + copies)
+    write(folder, "classrooms.json", [{"number": number, "capacity": 30, "specialties": ["science"]}
+                                      for number in (101, 102, 103, 201, 202, 203, 204)])
+
+def test_decompose(school):
+    two_schools(school)
+    data = load_data(str(school), snapshot=False)
+    instance = compile_instance(data.teachers, data.classes, data.subjects, data.classrooms, data.fixed_hours, data.common)
+    components = decompose(instance)
+    assert sorted(len(component.classes) for component in components) == [3, 3]
+    assert not set(components[0].rooms) & set(components[1].rooms)
+
+def test_solve_decomposed(school):
+    two_schools(school)
+    output_file = school / "out" / "generated.json"
+    merged = solve_decomposed(str(school), str(output_file), jobs=2, cores_per_job=1, solver_parameters=SOLVER_PARAMETERS)
+    assert merged["status"] == "OPTIMAL"
+    assert [result["status"] for result in merged["results"]] == ["OPTIMAL", "OPTIMAL"]
+    # The merged schedule is every component's schedule, and its objective the sum of theirs
+    assert len(merged["lessons"]) == sum(result["lessons"] for result in merged["results"])
+    assert merged["objective"] == sum(result["objective"] for result in merged["results"])
+    assert json.loads(output_file.read_text()) == merged["lessons"]
+    summary = json.loads((school / "out" / "components" / "summary.json").read_text())
+    assert summary["status"] == "OPTIMAL" and summary["objective"] == merged["objective"]
+    assert len(summary["components"]) == 2
+
+    # It is a valid schedule of the whole school, as good as solving it as one model
+    whole, _ = solve(school, output_file=None)
+    assert whole.status == cp_model.OPTIMAL
+    assert merged["objective"] == whole.objective_value
+    check_schedule(whole, merged["lessons"])
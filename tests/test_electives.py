@@ -0,0 +1,40 @@
+from ortools.sat.python import cp_model
+
+from conftest import check_schedule, read, solve, write
+
+def test_electives(school):
+    run, lessons = solve(school, electives=str(school / "students.json"))
+    assert run.status == cp_model.OPTIMAL
+    check_schedule(run, lessons)
+    # Every student has each of their electives once and never two lessons at a time; a fixed hour only blocks its room
+    fixed = {fixed_hour.name for fixed_hour in run.fixed_hours}
+    for student, schedule in zip(run.electives.students, run.electives.student_schedules(lessons)):
+        subjects = [item.subjectName for item in schedule.schedule]
+        for name in student.subjects:
+            assert subjects.count(name) == 1
+        times = [item.timeSlot for item in schedule.schedule if item.subjectName not in fixed]
+        assert len(times) == len(set(times)), f'{student.name} has two lessons at a time'
+
+def test_clusters_and_groups(school):
+    # Students with the same electives form one cluster, the clusters of a subject share a group when the room allows
+    run, _ = solve(school, electives=str(school / "students.json"))
+    electives, instance = run.electives, run.instance
+    clusters = {frozenset(instance.subject_names[s] for s in cluster.subjects): sorted(student.name for student in cluster.students)
+                for cluster in electives.clusters}
+    assert clusters == {frozenset({"Art"}): ["Max", "Sam"], frozenset({"Music"}): ["Kim"], frozenset({"Art", "Music"}): ["Lou"]}
+    assert {group.name: group.size for group in electives.groups} == {"Art group 1": 3, "Music group 1": 2}
+    assert {group.name: sorted(instance.class_names[c] for c in group.classes) for group in electives.groups} == {
+        "Art group 1": ["1A", "1B", "2A"], "Music group 1": ["1A", "2A"]}
+
+def test_elective_groups_of_one_class_without_shared_students(school):
+    # Art and Music are only taught on Tuesday hour 1: their groups only share class 1A, not students
+    teachers = read(school, "teachers.json")
+    for teacher in teachers:
+        if teacher["subjects"] in (["Art"], ["Music"]):
+            teacher["availability"] = {"tuesday": [1]}
+    write(school, "teachers.json", teachers)
+    write(school, "students.json", [student for student in read(school, "students.json") if student["className"] == "1A"])
+    run, lessons = solve(school, electives=str(school / "students.json"))
+    assert run.violations == []
+    assert run.status == cp_model.OPTIMAL
+    check_schedule(run, lessons)
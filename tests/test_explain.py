@@ -0,0 +1,41 @@
+import pytest
+
+from ortools.sat.python import cp_model
+
+import run as run_module
+from conftest import read, solve, write
+
+@pytest.fixture
+def unchecked(monkeypatch):
+    # Input the feasibility pre-check would already reject, solved anyway, so the solver has to prove it infeasible
+    monkeypatch.setattr(run_module, "check_feasibility", lambda instance, electives=None: [])
+
+def math_teachers_on_monday_morning(school) -> None:
+    # Math needs 6 lessons, its teachers are available for 4 slots
+    teachers = read(school, "teachers.json")
+    for teacher in teachers:
+        if teacher["subjects"] == ["Math"]:
+            teacher["availability"] = {"monday": [1, 2]}
+    write(school, "teachers.json", teachers)
+
+def test_minimal_conflict(school, unchecked):
+    math_teachers_on_monday_morning(school)
+    run, _ = solve(school, explain="minimal")
+    assert run.status == cp_model.INFEASIBLE
+    assert sorted(map(str, run.conflict)) == [
+        "1A has 2 hours of Math", "1B has 2 hours of Math", "2A has 2 hours of Math",
+        "Ada Math only teaches in their available hours", "Ben Math only teaches in their available hours"]
+    assert run.conflict[0].to_dict()["kind"] in ("required_hours", "teacher_availability")
+
+def test_conflict_core(school, unchecked):
+    # Without minimal the set is CP-SAT's core, which still contains every constraint of the minimal conflict here
+    math_teachers_on_monday_morning(school)
+    run, _ = solve(school, explain="core")
+    assert run.status == cp_model.INFEASIBLE
+    kinds = [assumption.kind for assumption in run.conflict]
+    assert kinds.count("teacher_availability") >= 2 and kinds.count("required_hours") >= 3
+
+def test_no_conflict_for_a_feasible_schedule(school):
+    run, _ = solve(school, explain="minimal")
+    assert run.status == cp_model.OPTIMAL
+    assert run.conflict is None
@@ -0,0 +1,39 @@
+from ortools.sat.python import cp_model
+
+from conftest import read, solve, write
+
+def test_fixed_hour_outside_the_lesson_slots_is_a_warning(school):
+    fixed_hours = read(school, "fixed_hours.json")
+    fixed_hours.append({"day": "Friday", "hour": 9, "name": "Gone", "classroomID": "102"})
+    write(school, "fixed_hours.json", fixed_hours)
+    run, _ = solve(school)
+    assert [warning.check for warning in run.warnings] == ["fixed_hours"]
+    assert run.warnings[0].entities == {"fixed_hours": ["Gone"]}
+    assert run.violations == []
+    assert run.status == cp_model.OPTIMAL
+
+def test_too_few_teacher_hours(school):
+    # Math needs 6 lessons, its teachers are available for 4 slots
+    teachers = read(school, "teachers.json")
+    for teacher in teachers:
+        if teacher["subjects"] == ["Math"]:
+            teacher["availability"] = {"monday": [1, 2]}
+    write(school, "teachers.json", teachers)
+    run, lessons = solve(school)
+    assert run.status == cp_model.INFEASIBLE
+    assert {lesson["class"] for lesson in lessons} == {"All Classes"}
+    assert [violation.to_dict() for violation in run.violations] == [{
+        "check": "teachers",
+        "message": "Math need 6 lessons, their qualified teachers (Ada Math, Ben Math) are available for 4 of them",
+        "entities": {"subjects": ["Math"], "teachers": ["Ada Math", "Ben Math"]},
+    }]
+    # No model is built for input that cannot be scheduled
+    assert run.lesson_vars is None
+
+def test_no_compatible_room(school):
+    write(school, "classrooms.json", [room for room in read(school, "classrooms.json") if "science" not in room["specialties"]])
+    run, _ = solve(school)
+    assert run.status == cp_model.INFEASIBLE
+    rooms = [violation for violation in run.violations if violation.check == "rooms"]
+    assert [violation.message for violation in rooms] == [
+        "No room for Biology of 1A (specialties: science, students: 25)", "No room for Biology of 1B (specialties: science, students: 25)"]
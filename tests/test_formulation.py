@@ -0,0 +1,23 @@
+import json
+
+import pytest
+
+from ortools.sat.python import cp_model
+
+from conftest import check_schedule, solve
+from run import FORMULATIONS
+
+@pytest.mark.parametrize("formulation", FORMULATIONS)
+def test_formulations(school, formulation):
+    reference, _ = solve(school)
+    run, lessons = solve(school, formulation=formulation)
+    assert run.status == cp_model.OPTIMAL
+    assert run.objective_value == reference.objective_value
+    check_schedule(run, lessons)
+    assert json.loads((school / "out" / "generated.json").read_text()) == lessons
+
+@pytest.mark.parametrize("formulation", FORMULATIONS)
+def test_formulations_with_room_pools(school, formulation):
+    run, lessons = solve(school, room_pools=True, formulation=formulation)
+    assert run.status == cp_model.OPTIMAL
+    check_schedule(run, lessons)
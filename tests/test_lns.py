@@ -0,0 +1,31 @@
+import numpy as np
+
+from ortools.sat.python import cp_model
+
+from conftest import SOLVER_PARAMETERS, check_schedule, solve
+from lns import LNSDriver
+from run import Run
+
+LNS_PARAMETERS = dict(SOLVER_PARAMETERS, lns=True, time_limit=3, lns_step_time=0.2)
+
+def test_lns(school):
+    optimal, _ = solve(school)
+    run = Run(data_folder=str(school), output_file=None, solver_parameters=LNS_PARAMETERS, verbose=False)
+    events = []
+    lessons = run.solve(on_solution=lambda event, _: events.append(event))
+    assert run.status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    assert run.objective_value >= optimal.objective_value
+    check_schedule(run, lessons)
+    # Only improving schedules are reported
+    objectives = [event["objective"] for event in events]
+    assert objectives and objectives == sorted(objectives, reverse=True)
+    assert objectives[-1] == run.objective_value
+
+def test_neighbourhoods(school):
+    run, _ = solve(school, solver_parameters=LNS_PARAMETERS)
+    neighbourhoods = LNSDriver(run, 1, 0.1).neighbourhoods()
+    assert sorted(neighbourhoods) == ["day", "rooms", "teacher", "year"]
+    # The days, the teachers and the room clusters each free every lesson variable exactly once
+    for kind in ("day", "teacher", "rooms"):
+        assert (np.sum([mask for _, mask in neighbourhoods[kind]], axis=0) == 1).all()
+    assert [name for name, _ in neighbourhoods["day"]] == ["day monday", "day tuesday"]
@@ -0,0 +1,73 @@
+import os
+import shutil
+
+import pytest
+
+import loader
+from cache import ScheduleCache
+from conftest import read, solve, write
+from loader import DataError, load_data
+
+@pytest.fixture
+def parsed(monkeypatch):
+    # Names of the files parsed by load_file, i.e. not taken from a snapshot
+    names = []
+    load_file = loader.load_file
+    def counting_load_file(file_path, schema=None):
+        names.append(os.path.basename(file_path))
+        return load_file(file_path, schema)
+    monkeypatch.setattr(loader, "load_file", counting_load_file)
+    return names
+
+def test_snapshot_is_reused(school, snapshots, parsed):
+    data = load_data(str(school))
+    assert len(parsed) == 6 and len(list(snapshots.glob("*.pickle"))) == 1
+    again = load_data(str(school))
+    assert len(parsed) == 6
+    assert [teacher.name for teacher in again.teachers] == [teacher.name for teacher in data.teachers]
+
+def test_snapshot_of_changed_files_is_not_used(school, snapshots, parsed):
+    load_data(str(school))
+    teachers = read(school, "teachers.json")
+    teachers[0]["name"] = "Ada Lovelace"
+    write(school, "teachers.json", teachers)
+    data = load_data(str(school))
+    assert len(parsed) == 12
+    assert data.teachers[0].name == "Ada Lovelace"
+    assert len(list(snapshots.glob("*.pickle"))) == 2
+
+def test_snapshot_is_shared_by_folders_with_the_same_files(school, tmp_path, snapshots, parsed):
+    # Like job workspaces with identical inputs
+    copy = tmp_path / "copy"
+    shutil.copytree(school, copy)
+    load_data(str(school))
+    load_data(str(copy))
+    assert len(parsed) == 6 and len(list(snapshots.glob("*.pickle"))) == 1
+
+def test_snapshots_are_evicted_with_the_cache(school, tmp_path):
+    cache = ScheduleCache(str(tmp_path / "cache"))
+    solve(school, cache=cache)
+    snapshots = list((tmp_path / "cache" / "snapshots").glob("*.pickle"))
+    assert len(snapshots) == 1
+    cache.max_bytes = 0
+    cache.evict()
+    assert not snapshots[0].exists()
+
+def test_invalid_input(school):
+    subjects = read(school, "subjects.json")
+    subjects[0]["blockLength"] = 3
+    write(school, "subjects.json", subjects)
+    with pytest.raises(DataError, match="subjects.json"):
+        solve(school)
+
+def test_invalid_value_is_located(school):
+    teachers = read(school, "teachers.json")
+    teachers[3]["subjects"][0] = 5
+    write(school, "teachers.json", teachers)
+    with pytest.raises(DataError, match=r"teachers.json\[3\].subjects\[0\]: expected a string, got 5"):
+        load_data(str(school))
+
+def test_missing_file(school):
+    (school / "classes.json").unlink()
+    with pytest.raises(DataError, match="classes.json: file not found"):
+        load_data(str(school))
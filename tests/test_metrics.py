@@ -0,0 +1,49 @@
+import json
+
+import numpy as np
+
+from conftest import solve
+from metrics import RunMetrics, current_rss_mb, parse_search_log
+
+def test_metrics_file(school):
+    run, _ = solve(school)
+    metrics = json.loads((school / "out" / "metrics.json").read_text())
+    names = [phase["name"] for phase in metrics["phases"]]
+    for name in ("loading", "compile", "feasibility_check", "solve"):
+        assert name in names
+    assert metrics["status"] == "OPTIMAL" and metrics["objective"] == run.objective_value
+    assert metrics["model"]["variables"] == len(run.model.Proto().variables)
+    # The model phases add up to the whole model
+    assert sum(phase.get("variables", 0) for phase in metrics["phases"]) == metrics["model"]["variables"]
+    assert sum(phase.get("constraints", 0) for phase in metrics["phases"]) == metrics["model"]["constraints"]
+    assert metrics["search"]["solutions"] >= 1 and metrics["search"]["summary"]["status"] == "OPTIMAL"
+
+def test_phase_memory_is_measured_per_phase():
+    # A phase reports the memory it adds, not the peak of the process so far
+    metrics = RunMetrics()
+    with metrics.phase("allocate"):
+        data = np.ones(64 * 1024 * 1024 // 8)
+    with metrics.phase("nothing"):
+        pass
+    allocate, nothing = metrics.phases
+    if current_rss_mb() is None:
+        assert allocate["rss_added_mb"] is None
+        return
+    assert 60 <= allocate["rss_added_mb"] <= 70
+    assert abs(nothing["rss_added_mb"]) < 5
+    del data
+
+def test_parse_search_log():
+    log = [
+        "Starting presolve at 0.01s",
+        "Starting search at 0.25s with 1 workers.",
+        "#1       0.30s best:7     next:[0,6]      fixed_bools:0/40",
+        "#2       0.40s best:3     next:[0,2]      no_lp",
+        "#Done    0.50s no_lp",
+        "CpSolverResponse summary:\nstatus: OPTIMAL\nobjective: 3\nwalltime: 0.5",
+    ]
+    search = parse_search_log(log)
+    assert search["presolve_time"] == 0.24 and search["search_time"] == 0.25
+    assert search["solutions"] == 2
+    assert [(event["objective"], event["best_bound"]) for event in search["timeline"]] == [(7, 0), (3, 0)]
+    assert search["summary"] == {"status": "OPTIMAL", "objective": "3", "walltime": "0.5"}
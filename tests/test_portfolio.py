@@ -0,0 +1,40 @@
+import pytest
+
+from ortools.sat.python import cp_model
+
+import parameters
+from conftest import SOLVER_PARAMETERS, check_schedule, solve
+from parameters import MIN_AUTO_WORKERS, SolverParameters, split_cores
+
+def test_portfolio(school):
+    single, _ = solve(school)
+    run, lessons = solve(school, solver_parameters=dict(SOLVER_PARAMETERS, portfolio=2))
+    assert run.status == cp_model.OPTIMAL
+    assert run.objective_value == single.objective_value
+    check_schedule(run, lessons)
+
+@pytest.mark.parametrize("cores, portfolio, num_workers, expected", [
+    (1, 0, None, MIN_AUTO_WORKERS), # Never fewer automatic workers than MIN_AUTO_WORKERS
+    (16, 0, None, 16),
+    (16, 2, None, 8), # The cores are split over the portfolio
+    (16, 8, None, MIN_AUTO_WORKERS),
+    (1, 0, 1, 1), # An explicit worker count is kept
+    (16, 2, 2, 2),
+])
+def test_num_workers(monkeypatch, cores, portfolio, num_workers, expected):
+    monkeypatch.setattr(parameters, "available_cores", lambda: cores)
+    solver_parameters = SolverParameters()
+    solver_parameters.from_dict({"portfolio": portfolio, "num_workers": num_workers})
+    assert solver_parameters.effective_num_workers() == expected
+
+@pytest.mark.parametrize("cores, tasks, jobs, workers, expected", [
+    (1, 10, None, None, (1, MIN_AUTO_WORKERS)),
+    (16, 2, None, None, (2, 8)),
+    (16, 10, None, None, (4, MIN_AUTO_WORKERS)),
+    (16, 10, 8, None, (8, MIN_AUTO_WORKERS)),
+    (8, 3, None, 2, (3, 2)), # Explicit values are kept
+    (8, 10, 10, 1, (10, 1)),
+])
+def test_split_cores(monkeypatch, cores, tasks, jobs, workers, expected):
+    monkeypatch.setattr(parameters, "available_cores", lambda: cores)
+    assert split_cores(tasks, jobs, workers) == expected
@@ -0,0 +1,17 @@
+from ortools.sat.python import cp_model
+
+from conftest import check_schedule, solve
+
+def test_room_pools(school):
+    run, lessons = solve(school, room_pools=True)
+    assert run.status == cp_model.OPTIMAL
+    check_schedule(run, lessons)
+    # Rooms 101 to 103 are interchangeable, the science room is a pool of its own
+    assert sorted(sorted(run.instance.room_numbers[room] for room in pool.room_ids) for pool in run.room_pools) == [[101, 102, 103], [201]]
+    assert {lesson["classroom"] for lesson in lessons if lesson["subject"] == "Biology"} == {201}
+
+def test_room_pools_keep_the_objective(school):
+    run, _ = solve(school)
+    pooled, _ = solve(school, room_pools=True)
+    assert pooled.status == cp_model.OPTIMAL
+    assert pooled.objective_value == run.objective_value
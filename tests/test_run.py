@@ -0,0 +1,21 @@
+import json
+
+from ortools.sat.python import cp_model
+
+from conftest import check_schedule, solve
+
+def test_solve(school):
+    run, lessons = solve(school)
+    assert run.status == cp_model.OPTIMAL
+    check_schedule(run, lessons)
+    assert json.loads((school / "out" / "generated.json").read_text()) == lessons
+
+def test_only_feasible_lesson_variables(school):
+    # A lesson variable only exists for a qualified and available teacher: Ben Math does not teach on Tuesday
+    run, _ = solve(school)
+    ben = run.instance.teacher_ids["Ben Math"]
+    tuesday = [slot for slot, (_, day, _, _) in enumerate(run.instance.slots) if day.value == "tuesday"]
+    keys = run.lesson_keys.tolist()
+    assert keys
+    assert not [key for key in keys if key[2] == ben and key[3] in tuesday]
+    assert {run.instance.subject_names[key[1]] for key in keys if key[2] == ben} == {"Math"}
@@ -0,0 +1,218 @@
+import os
+import json
+import asyncio
+
+import pytest
+
+from conftest import read
+from datastructure import dataFolder
+from loader import PROFILE_KEYS
+from service import JobStatus, SolverService
+
+OPTIONS = {"time_limit": 20, "num_workers": 1}
+
+def inputs(folder) -> dict:
+    # The files of folder as the "inputs" of a submit request, like the settings page sends them
+    return {key: read(folder, name) for name, key in PROFILE_KEYS.items()}
+
+@pytest.fixture
+def jobs(tmp_path):
+    # Folder of the job workspaces
+    return tmp_path / "jobs"
+
+async def finished(solver: SolverService, job_id: str) -> dict:
+    while True:
+        response = solver.handle_request({"op": "status", "job_id": job_id})
+        if response["status"] not in ("queued", "running"):
+            return response
+        await asyncio.sleep(0.05)
+
+def test_submit_status_result(school, jobs):
+    async def scenario():
+        solver = SolverService(jobs_folder=str(jobs))
+        worker = asyncio.create_task(solver.worker())
+        submitted = solver.handle_request({"op": "submit", "options": OPTIONS, "inputs": inputs(school)})
+        assert submitted["success"] and submitted["position"] == 1
+        status = await finished(solver, submitted["job_id"])
+        result = solver.handle_request({"op": "result", "job_id": submitted["job_id"]})
+        metrics = solver.handle_request({"op": "metrics", "job_id": submitted["job_id"]})
+        worker.cancel()
+        return status, result, metrics
+
+    status, result, metrics = asyncio.run(scenario())
+    assert status["status"] == "done" and status["solver_status"] == "OPTIMAL" and status["error"] is None
+    assert status["lessons"] == len(result["result"]) == 17
+    assert status["violations"] == [] and status["warnings"] == []
+    assert metrics["success"] and metrics["metrics"]["status"] == "OPTIMAL"
+
+def test_result_before_the_job_runs(school, jobs):
+    async def scenario():
+        solver = SolverService(jobs_folder=str(jobs))
+        job_id = solver.handle_request({"op": "submit", "options": OPTIONS, "inputs": inputs(school)})["job_id"]
+        return solver.handle_request({"op": "result", "job_id": job_id}), solver.handle_request({"op": "metrics", "job_id": job_id})
+
+    result, metrics = asyncio.run(scenario())
+    assert not result["success"] and result["code"] == "not_finished" and result["status"] == "queued"
+    assert not metrics["success"] and metrics["code"] == "not_finished"
+
+def test_cancel_queued_job(school, jobs):
+    async def scenario():
+        solver = SolverService(jobs_folder=str(jobs))
+        job_id = solver.handle_request({"op": "submit", "options": OPTIONS, "inputs": inputs(school)})["job_id"]
+        cancelled = solver.handle_request({"op": "cancel", "job_id": job_id})
+        # The worker skips the cancelled job
+        worker = asyncio.create_task(solver.worker())
+        await solver.queue.join()
+        worker.cancel()
+        return cancelled, solver.jobs[job_id]
+
+    cancelled, job = asyncio.run(scenario())
+    assert cancelled["success"] and cancelled["status"] == "cancelled"
+    assert job.status == JobStatus.CANCELLED and job.started is None and job.result is None
+
+def test_cancel_running_job(school, jobs):
+    async def scenario():
+        solver = SolverService(jobs_folder=str(jobs))
+        job_id = solver.handle_request({"op": "submit", "options": OPTIONS, "inputs": inputs(school)})["job_id"]
+        job = solver.jobs[job_id]
+        # Cancelled while the model is built, the solve does not start
+        execute = job.execute
+        def execute_and_cancel():
+            job.cancel_requested = True
+            execute()
+        job.execute = execute_and_cancel
+        worker = asyncio.create_task(solver.worker())
+        status = await finished(solver, job_id)
+        worker.cancel()
+        return status
+
+    status = asyncio.run(scenario())
+    assert status["status"] == "cancelled" and status["solver_status"] is None and status["lessons"] is None
+
+def test_rejected_requests(school, jobs):
+    async def scenario():
+        solver = SolverService(queue_size=1, jobs_folder=str(jobs))
+        broken = inputs(school)
+        del broken["classes"]
+        return [
+            solver.handle_request({"op": "submit", "options": {"workers": 4}, "inputs": inputs(school)}),
+            solver.handle_request({"op": "submit", "inputs": broken}),
+            solver.handle_request({"op": "submit", "options": OPTIONS, "inputs": inputs(school)}),
+            solver.handle_request({"op": "submit", "options": OPTIONS, "inputs": inputs(school)}),
+            solver.handle_request({"op": "status", "job_id": "missing"}),
+            solver.handle_request({"op": "restart"}),
+        ]
+
+    unknown_option, invalid, accepted, full, unknown_job, unknown_op = asyncio.run(scenario())
+    assert not unknown_option["success"] and "workers" in unknown_option["error"]
+    assert invalid["code"] == "invalid_input" and "classes" in invalid["error"]
+    assert accepted["success"]
+    assert full["code"] == "queue_full"
+    assert unknown_job["code"] == "unknown_job"
+    assert not unknown_op["success"]
+
+def test_socket_protocol(school, jobs):
+    # One JSON request and one JSON response per line
+    async def scenario():
+        solver = SolverService(jobs_folder=str(jobs))
+        server = await asyncio.start_server(solver.handle_client, "127.0.0.1", 0)
+        reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+        responses = []
+        for line in (json.dumps({"op": "health"}), "not json"):
+            writer.write(line.encode("utf-8") + b"\n")
+            await writer.drain()
+            responses.append(json.loads(await reader.readline()))
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return responses
+
+    health, invalid = asyncio.run(scenario())
+    assert health == {"success": True, "queued": 0, "max_concurrent": 1, "running": 0}
+    assert not invalid["success"] and invalid["error"].startswith("Invalid request")
+
+def test_stop_options(school, jobs):
+    async def scenario():
+        solver = SolverService(jobs_folder=str(jobs))
+        worker = asyncio.create_task(solver.worker())
+        job_id = solver.handle_request({"op": "submit", "options": dict(OPTIONS, stop_after_first=True), "inputs": inputs(school)})["job_id"]
+        status = await finished(solver, job_id)
+        worker.cancel()
+        return status
+
+    status = asyncio.run(scenario())
+    assert status["status"] == "done" and status["progress"]["solution"] == 1
+    assert status["lessons"] == 17
+
+def test_job_serves_its_own_outputs(school, jobs):
+    async def scenario():
+        solver = SolverService(jobs_folder=str(jobs))
+        worker = asyncio.create_task(solver.worker())
+        first = solver.handle_request({"op": "submit", "options": OPTIONS, "inputs": inputs(school)})["job_id"]
+        await finished(solver, first)
+        # A second job on other inputs does not replace the schedule of the first one
+        changed = inputs(school)
+        changed["classes"] = changed["classes"][:1]
+        second = solver.handle_request({"op": "submit", "options": OPTIONS, "inputs": changed})["job_id"]
+        await finished(solver, second)
+        worker.cancel()
+        return solver.handle_request({"op": "status", "job_id": first}), solver.handle_request({"op": "status", "job_id": second})
+
+    first, second = asyncio.run(scenario())
+    for status, lessons in ((first, 17), (second, 7)):
+        # output_folder is relative to data/, where the backend reads the schedule of the job
+        folder = jobs / status["inputs"] / "runs" / status["job_id"]
+        assert os.path.normpath(os.path.join(dataFolder, status["output_folder"])) == str(folder)
+        assert len(json.loads((folder / "generated.json").read_text())) == lessons
+        assert (folder / "generated.compact.json").exists() and (folder / "metrics.json").exists()
+
+def test_forgotten_jobs_remove_their_workspace(school, jobs):
+    async def scenario():
+        solver = SolverService(keep_finished=1, jobs_folder=str(jobs))
+        worker = asyncio.create_task(solver.worker())
+        changed = inputs(school)
+        changed["classes"] = changed["classes"][:1]
+        job_ids = []
+        for job_inputs in (changed, inputs(school), inputs(school)):
+            job_ids.append(solver.handle_request({"op": "submit", "options": OPTIONS, "inputs": job_inputs})["job_id"])
+            await finished(solver, job_ids[-1])
+        worker.cancel()
+        return solver, job_ids
+
+    solver, (other, shared, latest) = asyncio.run(scenario())
+    assert list(solver.jobs) == [latest]
+    key = solver.jobs[latest].workspace.key
+    # The inputs no job refers to any more are removed, the shared ones stay with the job that uses them
+    assert [path.name for path in jobs.iterdir()] == [key]
+    assert [path.name for path in (jobs / key / "runs").iterdir()] == [latest]
+    assert (jobs / key / "input" / "classes.json").exists()
+
+def test_rejected_job_removes_its_workspace(school, jobs):
+    async def scenario():
+        solver = SolverService(queue_size=1, jobs_folder=str(jobs))
+        solver.handle_request({"op": "submit", "options": OPTIONS, "inputs": inputs(school)})
+        changed = inputs(school)
+        changed["classes"] = changed["classes"][:1]
+        return solver, solver.handle_request({"op": "submit", "options": OPTIONS, "inputs": changed})
+
+    solver, full = asyncio.run(scenario())
+    assert full["code"] == "queue_full"
+    assert [path.name for path in jobs.iterdir()] == [job.workspace.key for job in solver.jobs.values()]
+
+def test_warm_start_from_a_job(school, jobs):
+    async def scenario():
+        solver = SolverService(jobs_folder=str(jobs))
+        worker = asyncio.create_task(solver.worker())
+        first = solver.handle_request({"op": "submit", "options": OPTIONS, "inputs": inputs(school)})["job_id"]
+        unknown = solver.handle_request({"op": "submit", "options": dict(OPTIONS, warm_start="missing"), "inputs": inputs(school)})
+        await finished(solver, first)
+        second = solver.handle_request({"op": "submit", "options": dict(OPTIONS, warm_start=first, minimise_changes=1), "inputs": inputs(school)})["job_id"]
+        await finished(solver, second)
+        worker.cancel()
+        return solver.jobs[first], solver.jobs[second], unknown
+
+    first, second, unknown = asyncio.run(scenario())
+    assert unknown["code"] == "unknown_job"
+    assert second.status == JobStatus.DONE
+    assert json.loads((jobs / second.workspace.key / "input" / "previous.json").read_text()) == first.result
+    assert sorted(map(json.dumps, second.result)) == sorted(map(json.dumps, first.result))
@@ -0,0 +1,60 @@
+import os
+import sys
+import json
+import stat
+import subprocess
+
+from ortools.sat.python import cp_model
+
+from run import Run
+from conftest import SOLVER_PARAMETERS, check_schedule
+from streaming import progress_file, stop_condition, write_json_atomic
+
+def test_written_files_are_readable_by_others(tmp_path):
+    umask = os.umask(0o022)
+    os.umask(umask)
+    write_json_atomic(str(tmp_path / "generated.json"), [])
+    assert stat.S_IMODE(os.stat(tmp_path / "generated.json").st_mode) == 0o666 & ~umask
+    assert json.loads((tmp_path / "generated.json").read_text()) == []
+    assert os.listdir(tmp_path) == ["generated.json"]
+
+def test_stop_condition():
+    event = {"objective": 10.0, "best_bound": 9.0, "gap": 0.1, "wall_time": 5.0}
+    assert stop_condition() is None
+    assert stop_condition(first=True)(event)
+    assert stop_condition(gap=0.1)(event) and not stop_condition(gap=0.05)(event)
+    assert not stop_condition(gap=0.1)(dict(event, gap=None))
+    assert stop_condition(after_seconds=5)(event) and not stop_condition(after_seconds=6)(event)
+
+def test_stream(school):
+    # Every improving schedule is written while solving, the progress history is final at the end
+    events = []
+    run = Run(data_folder=str(school), output_file=str(school / "out" / "generated.json"), solver_parameters=SOLVER_PARAMETERS,
+              verbose=False, stream=True)
+    lessons = run.solve(on_solution=lambda event, solution: events.append((event, solution)))
+    assert run.status == cp_model.OPTIMAL
+    check_schedule(run, lessons)
+    progress = json.loads(open(progress_file(run.output_file)).read())
+    assert progress["final"] and progress["status"] == "OPTIMAL"
+    assert [event for event, _ in events] == progress["history"]
+    assert [event["solution"] for event, _ in events] == list(range(1, len(events) + 1))
+    objectives = [event["objective"] for event, _ in events]
+    assert objectives == sorted(objectives, reverse=True)
+    assert events[-1][1] == lessons == json.loads(open(run.output_file).read())
+
+def test_stop_after_first(school):
+    run = Run(data_folder=str(school), output_file=None, solver_parameters=SOLVER_PARAMETERS, verbose=False)
+    lessons = run.solve(stop_when=stop_condition(first=True))
+    assert run.stopped and len(run.solution_callback.history) == 1
+    assert run.status in (cp_model.FEASIBLE, cp_model.OPTIMAL)
+    check_schedule(run, lessons)
+
+def test_stop_after_seconds_from_the_command_line(school):
+    output = school / "out" / "generated.json"
+    completed = subprocess.run([sys.executable, os.path.join(os.path.dirname(__file__), "..", "src", "run.py"), "--data-folder", str(school),
+                                "--output", str(output), "--no-cache", "--workers", "1", "--stream", "--stop-after-seconds", "0"],
+                               capture_output=True, text=True, timeout=120)
+    assert completed.returncode == 0, completed.stderr
+    progress = json.loads(open(progress_file(str(output))).read())
+    assert progress["final"] and len(progress["history"]) == 1
+    assert json.loads(output.read_text())
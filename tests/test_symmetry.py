@@ -0,0 +1,10 @@
+from ortools.sat.python import cp_model
+
+from conftest import check_schedule, solve
+
+def test_same_objective_without_symmetry_breaking(school):
+    run, _ = solve(school)
+    unbroken, lessons = solve(school, symmetry_breaking=False)
+    assert unbroken.status == cp_model.OPTIMAL
+    assert unbroken.objective_value == run.objective_value
+    check_schedule(unbroken, lessons)
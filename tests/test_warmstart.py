@@ -0,0 +1,45 @@
+import json
+
+from ortools.sat.python import cp_model
+
+from conftest import check_schedule, solve
+
+def lesson_key(lesson: dict) -> tuple:
+    return lesson["class"], lesson["subject"], lesson["teacher"], lesson["day"], lesson["lesson_index"]
+
+def test_warm_start(school):
+    _, previous = solve(school)
+    run, lessons = solve(school, warm_start=str(school / "out" / "generated.json"), minimise_changes=100)
+    assert run.status == cp_model.OPTIMAL
+    check_schedule(run, lessons)
+    # Keeping every previous lesson is possible and cheaper than any change
+    assert sorted(map(lesson_key, lessons)) == sorted(map(lesson_key, previous))
+    assert len(run.model.Proto().solution_hint.vars) == len(run.lesson_vars)
+
+def test_warm_start_with_electives(school):
+    students = str(school / "students.json")
+    _, previous = solve(school, electives=students)
+    run, lessons = solve(school, electives=students, warm_start=str(school / "out" / "generated.json"), minimise_changes=100)
+    assert run.status == cp_model.OPTIMAL
+    check_schedule(run, lessons)
+    # The lessons of the elective groups are hinted and kept like those of the classes
+    groups = set(run.electives.group_names)
+    assert sorted(lesson_key(lesson) for lesson in lessons if lesson["class"] in groups) == \
+           sorted(lesson_key(lesson) for lesson in previous if lesson["class"] in groups)
+    assert sorted(map(lesson_key, lessons)) == sorted(map(lesson_key, previous))
+    hint = run.model.Proto().solution_hint
+    hinted = dict(zip(hint.vars, hint.values))
+    assert len(hinted) == len(run.lesson_vars)
+    # 14 class lessons, a Biology double period counts once, and the Art and Music group lessons
+    groups_hinted = [hinted[var.Index()] for key, var in run.lesson_vars.items() if key[0] >= len(run.instance.class_names)]
+    assert sum(hinted.values()) == 16 and sum(groups_hinted) == 2
+
+def test_classes_without_previous_lessons_get_no_hint(school):
+    _, previous = solve(school)
+    (school / "previous.json").write_text(json.dumps([lesson for lesson in previous if lesson["class"] != "2A"]))
+    run, lessons = solve(school, warm_start=str(school / "previous.json"))
+    assert run.status == cp_model.OPTIMAL
+    check_schedule(run, lessons)
+    hinted = set(run.model.Proto().solution_hint.vars)
+    new_class = run.instance.class_ids["2A"]
+    assert hinted == {var.Index() for key, var in run.lesson_vars.items() if key[0] != new_class}
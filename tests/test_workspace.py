@@ -0,0 +1,29 @@
+import os
+import stat
+
+from conftest import read
+from loader import DATA_FILES
+from workspace import PREVIOUS_FILE, STUDENTS_FILE, create_workspace, job_inputs, remove_output, remove_workspace
+
+def test_job_inputs(school):
+    files = job_inputs(data_folder=str(school))
+    assert sorted(files) == sorted(DATA_FILES)
+    files = job_inputs(data_folder=str(school), electives=True, warm_start=True, previous=[])
+    assert files[STUDENTS_FILE] == read(school, "students.json") and files[PREVIOUS_FILE] == []
+    # Without a previous schedule or data/out/generated.json there is nothing to warm start from
+    assert PREVIOUS_FILE not in job_inputs(data_folder=str(school), warm_start=True)
+
+def test_identical_inputs_share_a_workspace(school, tmp_path):
+    files = job_inputs(data_folder=str(school))
+    first = create_workspace(files, "first", str(tmp_path / "jobs"))
+    second = create_workspace(files, "second", str(tmp_path / "jobs"))
+    assert first.input_folder == second.input_folder and first.output_folder != second.output_folder
+    assert first.input_file("teachers.json") and first.input_file(STUDENTS_FILE) is None
+    # The inputs are read-only, jobs only write to their own output folder
+    assert not os.stat(first.input_file("teachers.json")).st_mode & stat.S_IWUSR
+    assert os.path.isdir(first.output_folder) and os.path.isdir(second.output_folder)
+
+    remove_output(first)
+    assert not os.path.exists(first.output_folder) and os.path.isdir(second.input_folder)
+    remove_workspace(second)
+    assert os.listdir(tmp_path / "jobs") == []